@@ -0,0 +1,49 @@
+"""Encode throughput and file size for the image encoder options.
+
+Run from the repository root:
+
+    python benchmarks/bench_image_encoding.py
+"""
+import time
+from io import BytesIO
+from context import sample_document
+
+SETTINGS = [
+    ("png", {}),
+    ("png", {"compress_level": 1}),
+    ("png", {"compress_level": 9, "optimize": True}),
+    ("png", {"colors": 16}),
+    ("jpeg", {}),
+    ("jpeg", {"quality": 60}),
+    ("jpeg", {"quality": 85, "optimize": True, "progressive": True}),
+    ("gif", {}),
+    ("gif", {"colors": 16}),
+]
+
+
+def bench(document, image_format, options, size, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        f = BytesIO()
+        document.generate_image(
+            "bench", image_format, size=size, file_object=f, **options)
+    elapsed = (time.perf_counter() - start) / repeat
+    return elapsed, len(f.getvalue())
+
+
+def main(repeat=3):
+    document = sample_document()
+    for size in [None, (1000, 1000)]:
+        print("size: {}".format(size or "native"))
+        print("{:<7}{:<58}{:>10}{:>12}".format("format", "options",
+                                               "ms/page", "bytes"))
+        for image_format, options in SETTINGS:
+            elapsed, length = bench(document, image_format, options, size,
+                                    repeat)
+            print("{:<7}{:<58}{:>10.1f}{:>12,}".format(
+                image_format, str(options), elapsed * 1000, length))
+        print()
+
+
+if __name__ == "__main__":
+    main()
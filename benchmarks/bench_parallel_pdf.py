@@ -0,0 +1,32 @@
+"""PDF generation time by number of worker processes.
+
+Run from the repository root:
+
+    python benchmarks/bench_parallel_pdf.py
+"""
+import os
+import time
+from io import BytesIO
+from context import sample_document
+
+
+def bench(document, workers, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        f = BytesIO()
+        document.generate_pdf("bench", file_object=f, workers=workers)
+    return (time.perf_counter() - start) / repeat, len(f.getvalue())
+
+
+def main(pages=500, repeat=1):
+    document = sample_document(pages=pages)
+    counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    print("{} pages".format(pages))
+    print("{:<10}{:>10}{:>14}".format("workers", "s/doc", "bytes"))
+    for workers in counts:
+        elapsed, length = bench(document, workers, repeat)
+        print("{:<10}{:>10.2f}{:>14,}".format(workers, elapsed, length))
+
+
+if __name__ == "__main__":
+    main()
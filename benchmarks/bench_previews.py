@@ -0,0 +1,51 @@
+"""Multi-resolution previews from one render versus one render per size.
+
+Run from the repository root:
+
+    python benchmarks/bench_previews.py
+"""
+import time
+from io import BytesIO
+from context import sample_document
+
+SIZE_SETS = [
+    [(200, 200), (1000, 1000)],
+    [(100, 100), (400, 400), (1000, 1000)],
+    [(200, 200), (800, 800), (2000, 2000)],
+]
+
+
+def separate(document, sizes):
+    images = []
+    for size in sizes:
+        f = BytesIO()
+        document.generate_image("bench", "png", size=size, file_object=f)
+        images.append(f.getvalue())
+    return images
+
+
+def previews(document, sizes):
+    return document.generate_previews(sizes)
+
+
+def bench(function, document, sizes, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(document, sizes)
+    return (time.perf_counter() - start) / repeat
+
+
+def main(repeat=5):
+    document = sample_document()
+    print("{:<42}{:>14}{:>14}{:>10}".format("sizes", "separate ms",
+                                            "previews ms", "speedup"))
+    for sizes in SIZE_SETS:
+        separate_time = bench(separate, document, sizes, repeat)
+        previews_time = bench(previews, document, sizes, repeat)
+        print("{:<42}{:>14.1f}{:>14.1f}{:>9.1f}x".format(
+            str(sizes), separate_time * 1000, previews_time * 1000,
+            separate_time / previews_time))
+
+
+if __name__ == "__main__":
+    main()
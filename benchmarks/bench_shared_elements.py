@@ -0,0 +1,43 @@
+"""Time to share a large document with worker processes.
+
+Compares attaching to the shared element store with unpickling a copy of
+the document. Run from the repository root:
+
+    python benchmarks/bench_shared_elements.py
+"""
+import pickle
+import time
+from context import sample_document
+from multiformat.multiformat import Document
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main(pages=8000, rows=40):
+    # About 125 elements per page, 1M elements in total.
+    document = sample_document(pages=pages, rows=rows)
+    elements = sum(len(page) for page in document._pages)
+    print("{:,} elements on {:,} pages".format(elements, pages))
+    data, pickle_ms = timed(pickle.dumps, document, pickle.HIGHEST_PROTOCOL)
+    _, unpickle_ms = timed(pickle.loads, data)
+    store, share_ms = timed(document.share_elements)
+    with store:
+        attached, attach_ms = timed(Document.attach_elements, store.name)
+        _, page_ms = timed(lambda: attached._pages[pages // 2].elements)
+        print("{:<28}{:>12}{:>14}".format("", "ms", "bytes"))
+        print("{:<28}{:>12.1f}{:>14,}".format("pickle document", pickle_ms,
+                                              len(data)))
+        print("{:<28}{:>12.1f}".format("unpickle in worker", unpickle_ms))
+        print("{:<28}{:>12.1f}{:>14,}".format(
+            "create shared store", share_ms, store.memory.size))
+        print("{:<28}{:>12.1f}".format("attach in worker", attach_ms))
+        print("{:<28}{:>12.3f}".format("decode one page", page_ms))
+        attached._pages[0].store.close()
+
+
+if __name__ == "__main__":
+    main()
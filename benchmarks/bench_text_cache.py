@@ -0,0 +1,32 @@
+"""Image rendering time with and without the text run cache.
+
+Run from the repository root:
+
+    python benchmarks/bench_text_cache.py
+"""
+import time
+from context import sample_document
+from multiformat.glyphs import _run_cache, set_text_cache_limit
+
+
+def bench(document, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        document.generate_raster()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(repeat=3):
+    document = sample_document(pages=4, rows=40)
+    print("{:<12}{:>12}{:>10}{:>10}".format("cache", "ms/doc", "hits",
+                                            "misses"))
+    for name, limit in [("disabled", 0), ("32 MB", 32 * 2**20)]:
+        set_text_cache_limit(limit)
+        _run_cache.clear()
+        elapsed = bench(document, repeat)
+        print("{:<12}{:>12.1f}{:>10,}{:>10,}".format(
+            name, elapsed * 1000, _run_cache.hits, _run_cache.misses))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Documents rendered per second by number of threads.
+
+Image encoding, resizing and quantizing release the GIL in Pillow, drawing
+and PDF generation don't. Run from the repository root:
+
+    python benchmarks/bench_threads.py
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from context import sample_document
+
+
+def render_pdf(document):
+    document.generate_pdf("bench", file_object=BytesIO())
+
+
+def render_png(document):
+    document.generate_image("bench", "png", file_object=BytesIO())
+
+
+def render_jpeg(document):
+    document.generate_image(
+        "bench", "jpeg", size=(1000, 1000), file_object=BytesIO())
+
+
+def bench(function, documents, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(function, documents))
+    return len(documents) / (time.perf_counter() - start)
+
+
+def main(count=16):
+    documents = [sample_document() for _ in range(count)]
+    counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    print("{:<10}".format("threads") + "".join(
+        "{:>10}".format(name) for name in ["pdf/s", "png/s", "jpeg/s"]))
+    for threads in counts:
+        rates = [
+            bench(function, documents, threads)
+            for function in [render_pdf, render_png, render_jpeg]
+        ]
+        print("{:<10}".format(threads) + "".join("{:>10.1f}".format(rate)
+                                                 for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
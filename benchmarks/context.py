@@ -0,0 +1,35 @@
+import os
+import sys
+sys.path.insert(0,
+                os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from multiformat.multiformat import Document
+
+
+def sample_document(pages=1, rows=40):
+    # A statement style document: header band, table rows and a chart.
+    document = Document("a4", "portrait")
+    for page in range(pages):
+        if page:
+            document.insert_page_break()
+        document.draw_rectangle(0, 0, document.w, 300, "#2c3e50")
+        document.draw_string("Statement", 100, 200, "left", "OpenSans-Bold",
+                             120, "#ffffff")
+        for row in range(rows):
+            y = 450 + row * 55
+            if row % 2:
+                document.draw_rectangle(100, y - 45, document.w - 200, 55,
+                                        "#ecf0f1")
+            document.draw_string("Item {}".format(row), 150, y, "left",
+                                 "OpenSans-Regular", 40, "#2c3e50")
+            document.draw_string("{:,.2f}".format(row * 1234.5),
+                                 document.w - 150, y, "right",
+                                 "OpenSans-Regular", 40, "#2c3e50")
+        for i in range(20):
+            document.draw_circle(200 + i * 90, 2800 - (i * 37) % 300, 20,
+                                 "#2980b9")
+        document.draw_line(100, 2850, document.w - 100, 2850, 10, "#7f8c8d")
+        document.draw_string("Page {}".format(page + 1), document.w - 100,
+                             document.h - 50, "right", "OpenSans-Regular", 40,
+                             "#000")
+    return document
@@ -0,0 +1,280 @@
+# Copyright 2018 Adam Moller
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import json
+import os
+import sys
+import time
+from PIL import Image as ImagePIL
+from .multiformat import Document
+from .parallel import _process_context
+
+# Element types of a description and the Document methods that draw them.
+_DRAW_METHODS = {
+    "string": "draw_string",
+    "line": "draw_line",
+    "rectangle": "draw_rectangle",
+    "circle": "draw_circle",
+    "polyline": "draw_polyline",
+    "polygon": "draw_polygon",
+    "image": "draw_image",
+    "paragraph": "draw_paragraph",
+    "table": "draw_table",
+}
+_FORMATS = ("pdf", "png", "jpeg", "gif")
+
+
+def build_document(description):
+    """Create a document from a description.
+
+    A description is a dictionary with the optional keys document_size,
+    layout, author, title and subject, and a list of elements. Each element
+    has a type, e.g. "string" or "table", and the arguments of the matching
+    draw method. Elements of type "page_break" start a new page.
+
+    Args:
+        description: Document description (Dictionary)
+
+    Returns:
+        Document with the described elements.
+    """
+    document = Document(
+        description.get("document_size", "a4"),
+        description.get("layout", "portrait"))
+    for field in ("author", "title", "subject"):
+        setattr(document, field, description.get(field))
+    for number, element in enumerate(description.get("elements", []), 1):
+        arguments = dict(element)
+        element_type = arguments.pop("type", None)
+        if element_type == "page_break":
+            document.insert_page_break()
+            continue
+        if element_type not in _DRAW_METHODS:
+            raise ValueError("Element {}: invalid type: '{}'".format(
+                number, element_type))
+        try:
+            getattr(document, _DRAW_METHODS[element_type])(**arguments)
+        except (KeyError, RuntimeError, TypeError, ValueError,
+                ImagePIL.DecompressionBombError) as error:
+            raise ValueError("Element {}: {}".format(number, error))
+    return document
+
+
+def _render(task):
+    # Build and write one document line, returns (pages, error).
+    number, line, options = task
+    try:
+        description = json.loads(line)
+        if not isinstance(description, dict):
+            raise ValueError("Description should be a JSON object.")
+        name = _file_name(
+            description.get("name", "document_{}".format(number)))
+        document = build_document(description)
+        first, last = options["pages"] or (1, document.pages)
+        if last is None or last > document.pages:
+            last = document.pages
+        if first > last:
+            raise ValueError("Page {} not in document of {} pages.".format(
+                first, document.pages))
+        path = os.path.join(options["output"], name)
+        for output_format in options["formats"]:
+            if output_format == "pdf":
+                if (first, last) != (1, document.pages):
+                    document_range = document.slice_pages(first, last)
+                else:
+                    document_range = document
+                document_range.generate_pdf(
+                    path, invariant=options["invariant"])
+                continue
+            for page in range(first, last + 1):
+                file_name = path if first == last else "{}_{}".format(
+                    path, page)
+                document.generate_image(
+                    file_name,
+                    output_format,
+                    size=options["size"],
+                    page=page,
+                    dpi=options["dpi"],
+                    memory_limit=options["memory_limit"])
+        return last - first + 1, None
+    except (OSError, KeyError, RuntimeError, TypeError, ValueError,
+            ImagePIL.DecompressionBombError) as error:
+        return 0, "Document {}: {}".format(number, error)
+
+
+def _file_name(name):
+    # Confirm a document name is a file name within the output directory.
+    name = str(name)
+    separators = [os.sep] + ([os.altsep] if os.altsep else [])
+    if (not name or name in (".", "..") or os.path.isabs(name)
+            or os.path.splitdrive(name)[0]
+            or any(separator in name for separator in separators)):
+        raise ValueError("Invalid name: '{}', Names can't contain a "
+                         "directory.".format(name))
+    return name
+
+
+def _read_lines(inputs):
+    # Non-empty lines of the input files, "-" reads standard input.
+    for path in inputs:
+        if path == "-":
+            lines = sys.stdin
+        else:
+            lines = open(path, encoding="utf-8")
+        with lines:
+            for line in lines:
+                if line.strip():
+                    yield line
+
+
+def _page_range(text):
+    # Parse FIRST or FIRST-LAST, LAST may be left out for the last page.
+    first, separator, last = text.partition("-")
+    try:
+        first = int(first)
+        last = int(last) if last else (None if separator else first)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "invalid page range: '{}'".format(text))
+    if first < 1 or (last is not None and last < first):
+        raise argparse.ArgumentTypeError(
+            "invalid page range: '{}'".format(text))
+    return first, last
+
+
+def _image_size(text):
+    # Parse WIDTHxHEIGHT.
+    try:
+        w, h = [int(value) for value in text.lower().split("x")]
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid size: '{}'".format(text))
+    return w, h
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog="multiformat",
+        description="Render JSON lines document descriptions.")
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        default=["-"],
+        help="JSON lines files, standard input by default")
+    parser.add_argument(
+        "-o", "--output", default=".", help="output directory")
+    parser.add_argument(
+        "-f",
+        "--format",
+        dest="formats",
+        action="append",
+        choices=_FORMATS,
+        help="output format, may be repeated (default: pdf)")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="processes rendering documents")
+    parser.add_argument(
+        "-p",
+        "--pages",
+        type=_page_range,
+        help="pages to render: N, FIRST-LAST or FIRST-")
+    parser.add_argument(
+        "-s", "--size", type=_image_size, help="image size, WIDTHxHEIGHT")
+    parser.add_argument("--dpi", type=float, help="image resolution")
+    parser.add_argument(
+        "--memory-limit",
+        type=float,
+        metavar="MB",
+        help="pixel memory limit of an image page")
+    parser.add_argument(
+        "--invariant",
+        action="store_true",
+        help="reproducible PDFs with a fixed date and identifier")
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="don't report throughput")
+    return parser
+
+
+def main(argv=None):
+    """Render document descriptions from the command line.
+
+    Reads one JSON document description per line, see build_document(),
+    and writes each document to the output directory in every requested
+    format. Documents that fail are reported and skipped.
+
+    Args:
+        argv: Command line arguments, sys.argv by default (List)
+
+    Returns:
+        Exit status, 1 if any document failed.
+    """
+    parser = _parser()
+    arguments = parser.parse_args(argv)
+    if arguments.workers < 1:
+        parser.error("workers should be 1 or more")
+    if arguments.size and arguments.dpi:
+        parser.error("size and dpi can't both be defined")
+    if arguments.memory_limit is not None and arguments.memory_limit <= 0:
+        parser.error("memory limit should be more than 0")
+    for path in arguments.inputs:
+        if path != "-":
+            try:
+                open(path, encoding="utf-8").close()
+            except OSError as e:
+                parser.error("can't open '{}': {}".format(path, e.strerror))
+    os.makedirs(arguments.output, exist_ok=True)
+    options = {
+        "output": arguments.output,
+        "formats": arguments.formats or ["pdf"],
+        "pages": arguments.pages,
+        "size": arguments.size,
+        "dpi": arguments.dpi,
+        "invariant": arguments.invariant,
+        "memory_limit": None if arguments.memory_limit is None else max(
+            1, int(arguments.memory_limit * 2**20)),
+    }
+    tasks = ((number, line, options)
+             for number, line in enumerate(_read_lines(arguments.inputs), 1))
+    start = time.perf_counter()
+    documents = pages = failed = 0
+    if arguments.workers == 1:
+        results = map(_render, tasks)
+    else:
+        pool = _process_context().Pool(arguments.workers)
+        results = pool.imap(_render, tasks, chunksize=4)
+    try:
+        for page_count, error in results:
+            if error:
+                failed += 1
+                print(error, file=sys.stderr)
+            else:
+                documents += 1
+                pages += page_count
+    finally:
+        if arguments.workers > 1:
+            pool.terminate()
+            pool.join()
+    elapsed = time.perf_counter() - start
+    if not arguments.quiet:
+        print(
+            "{} documents, {} pages in {:.2f} s: {:.1f} documents/s, "
+            "{:.1f} pages/s{}".format(
+                documents, pages, elapsed, documents / elapsed,
+                pages / elapsed,
+                ", {} failed".format(failed) if failed else ""),
+            file=sys.stderr)
+    return 1 if failed else 0
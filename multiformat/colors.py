@@ -0,0 +1,93 @@
+# Copyright 2018 Adam Moller
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from functools import lru_cache
+
+
+class _ColorTable:
+    # Interned colors of a document.
+    #
+    # Each distinct RGB color is stored once and numbered in the order it
+    # was first used, elements share the stored tuple.
+    def __init__(self):
+        self.colors = []
+        self.index = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.colors)
+
+    def __getstate__(self):
+        return {"colors": self.colors, "index": self.index}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def intern(self, color):
+        # Return the stored tuple for a validated RGB color.
+        position = self.index.get(color)
+        if position is None:
+            with self.lock:
+                position = self.index.get(color)
+                if position is None:
+                    position = len(self.colors)
+                    self.colors.append(color)
+                    self.index[color] = position
+        return self.colors[position]
+
+    def lookup(self, color):
+        # Stored tuple for a color that was already interned, else None.
+        position = self.index.get(color)
+        if position is None:
+            return None
+        return self.colors[position]
+
+
+@lru_cache(maxsize=4096)
+def _parse_hex(color):
+    # Convert #RGB, RGB, #RRGGBB, RRGGBB to rgb() colors.
+    color = color.strip().strip("#")
+    length = len(color)
+    if length == 3:
+        return (int(color[0] * 2, 16), int(color[1] * 2, 16),
+                int(color[2] * 2, 16))
+    elif length == 6:
+        return (int(color[0:2], 16), int(color[2:4], 16),
+                int(color[4:6], 16))
+    raise ValueError(
+        "Color '{}' is not in #RRGGBB or #RGB format".format(color))
+
+
+def parse_colors(colors):
+    """Convert many hexadecimal colors to RGB.
+
+    Each distinct color string is parsed once, however often it repeats.
+
+    Args:
+        colors: Iterable of colors in #RRGGBB or #RGB format (Strings)
+
+    Returns:
+        List of RGB colors (3-Tuples)
+    """
+    parsed = {}
+    result = []
+    for color in colors:
+        rgb = parsed.get(color)
+        if rgb is None:
+            rgb = _parse_hex(color)
+            parsed[color] = rgb
+        result.append(rgb)
+    return result
@@ -0,0 +1,145 @@
+# Copyright 2018 Adam Moller
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import threading
+
+# Extra font directories, separated like PATH, scanned with the package fonts.
+_FONT_PATH_VARIABLE = "MULTIFORMAT_FONT_PATH"
+
+
+class _FontRegistry:
+    # TrueType font files by name, shared by documents and renderers.
+    #
+    # Names are matched without regard to case and map to the spelling they
+    # were registered with, which is the name stored in elements. The fonts
+    # of the package and of the directories in MULTIFORMAT_FONT_PATH are
+    # scanned once, the first time a font is looked up. A name keeps the
+    # file it was first registered with, since fonts are cached by name.
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.paths = {}
+        self.names = {}
+        self.loaded = False
+
+    def _load(self):
+        with self.lock:
+            if self.loaded:
+                return
+            self.add_directory(
+                os.path.join(os.path.dirname(__file__), 'fonts'))
+            # Entries that aren't directories, e.g. removed ones, are
+            # skipped so they don't make every font lookup fail.
+            for directory in os.environ.get(_FONT_PATH_VARIABLE,
+                                            "").split(os.pathsep):
+                if directory and os.path.isdir(directory):
+                    self.add_directory(directory)
+            self.loaded = True
+
+    def add(self, path, name):
+        # Register a font file, returns False if the name is taken.
+        path = os.path.abspath(path)
+        with self.lock:
+            existing = self.names.get(name.lower())
+            if existing:
+                return self.paths[existing] == path
+            self.names[name.lower()] = name
+            self.paths[name] = path
+            return True
+
+    def add_directory(self, directory):
+        # Register the fonts in a directory, keeping names already in use.
+        added = []
+        for file in sorted(os.listdir(directory)):
+            name, extension = os.path.splitext(file)
+            path = os.path.join(directory, file)
+            if extension.lower() == ".ttf" and os.path.isfile(path):
+                if self.add(path, name):
+                    added.append(self.names[name.lower()])
+        return added
+
+    def name(self, font):
+        # Registered spelling of a font name, None if it isn't registered.
+        if not self.loaded:
+            self._load()
+        return self.names.get(str(font).lower())
+
+    def path(self, font):
+        # File of a registered font.
+        if not self.loaded:
+            self._load()
+        try:
+            return self.paths[font]
+        except KeyError:
+            raise KeyError("Font not registered: '{}'".format(font))
+
+
+_fonts = _FontRegistry()
+
+
+def register_font(path, name=None):
+    """Register a TrueType font file.
+
+    Registered fonts can be used by every document in the process. Names are
+    not case sensitive.
+
+    Args:
+        path: Path of a TTF file (String)
+        name: Font name, the file name without extension by default (String)
+
+    Returns:
+        The registered font name.
+    """
+    if not os.path.isfile(path):
+        raise ValueError("Font file not found: '{}'".format(path))
+    if name is None:
+        name = os.path.splitext(os.path.basename(path))[0]
+    name = str(name)
+    _fonts._load()
+    if not _fonts.add(path, name):
+        raise ValueError("Font name already registered: '{}'".format(name))
+    return _fonts.name(name)
+
+
+def add_font_directory(directory):
+    """Register the TrueType fonts in a directory.
+
+    The directory is scanned once. Fonts with a name that is already
+    registered are skipped.
+
+    Args:
+        directory: Directory containing TTF files (String)
+
+    Returns:
+        List of the font names registered.
+    """
+    if not os.path.isdir(directory):
+        raise ValueError("Font directory not found: '{}'".format(directory))
+    _fonts._load()
+    return _fonts.add_directory(directory)
+
+
+def font_names():
+    """Get the names of all registered fonts.
+
+    Returns:
+        Sorted list of font names.
+    """
+    _fonts._load()
+    return sorted(_fonts.paths)
+
+
+def _font_path(font):
+    # File of a font name as stored in elements.
+    return _fonts.path(font)
@@ -12,19 +12,101 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import os
+import math
+from functools import partial
+from io import BytesIO
 from PIL import Image as ImagePIL
-from PIL import ImageFont, ImageDraw
+from PIL import ImageDraw
+from .geometry import _bounds
+from .glyphs import _draw_text, _text_size, _truetype
+from .images import _decoded_image
+from .renderer import _ELEMENT_FIELDS, Renderer, register_backend
 
+# Document units are tenths of a millimetre.
+_UNITS_PER_INCH = 254
 
-class _Image:
+# Largest pixel memory a page render may hold, None for no limit.
+_memory_limit = None
+
+# Fewest canvas rows worth drawing as a band of a downscaled page.
+_MIN_BAND_HEIGHT = 16
+
+
+def set_memory_limit(max_bytes):
+    """Limit the pixel memory used to render an image page.
+
+    Pages are drawn on a canvas, resized and quantized before they are
+    encoded. Renders whose canvases would exceed the limit are drawn in
+    horizontal bands when the page is downscaled to the requested size, and
+    rejected with a RuntimeError otherwise. The limit applies to every
+    document in the process that doesn't set its own memory_limit when
+    generating an image.
+
+    Args:
+        max_bytes: Largest pixel memory of a page, None for no limit
+            (Integer)
+
+    Returns:
+        None
+    """
+    global _memory_limit
+    _memory_limit = _validate_memory_limit(max_bytes)
+
+
+def _validate_memory_limit(max_bytes):
+    # Confirm a memory limit is None or a positive number of bytes.
+    if max_bytes is None or (isinstance(max_bytes, int)
+                             and not isinstance(max_bytes, bool)
+                             and max_bytes > 0):
+        return max_bytes
+    raise RuntimeError(
+        "Invalid memory limit: {}, Value should be a positive integer of "
+        "bytes or None.".format(max_bytes))
+
+
+class _Image(Renderer):
     # Generate the document as image(s)
-    def __init__(self, file_name, image_format, document_wh, image_wh=None):
+    def __init__(self,
+                 file_name,
+                 image_format,
+                 document_wh,
+                 image_wh=None,
+                 file_object=None,
+                 mode="RGB",
+                 encoder_options=None,
+                 colors=None,
+                 palette=None,
+                 has_text=True,
+                 scale=None,
+                 pixel_origin=(0, 0),
+                 images=None,
+                 has_images=False,
+                 memory_limit=None):
         self.scale = 1
+        self.pixel_origin = pixel_origin
+        self.mode = mode
+        self.images = images
+        # Palette mode canvases index colors, white is always index 0.
+        self.palette = [(255, 255, 255)] + sorted(
+            set(palette or []) - {(255, 255, 255)})
+        self.palette_index = {
+            color: index
+            for index, color in enumerate(self.palette)
+        }
+        self.encoder_options = encoder_options or {}
+        self.colors = colors
+        self.base_file_name = file_name
         self.file_name = file_name
         self.image_format = image_format
+        self.file_object = file_object
+        self.image_count = 1
         self.output_dimensions = None
-        if image_wh:
+        if scale:
+            # Draw directly at a fixed scale, e.g. for page regions.
+            self.scale = scale
+            output_w = max(1, int(round(document_wh[0] * scale)))
+            output_h = max(1, int(round(document_wh[1] * scale)))
+        elif image_wh:
             scaleW = image_wh[0] / document_wh[0]
             scaleH = image_wh[1] / document_wh[1]
             if scaleW < scaleH:
@@ -52,38 +134,277 @@ class _Image:
         else:
             output_w = document_wh[0]
             output_h = document_wh[1]
-        self.image = ImagePIL.new("RGB", (output_w, output_h), (255, 255, 255))
+        self.canvas_size = (output_w, output_h)
+        if self.mode == "auto":
+            self.mode = self._auto_color_mode(has_text, has_images)
+        if self.mode == "P" and len(self.palette) > 256:
+            raise RuntimeError(
+                "Palette mode supports up to 255 colors, document uses {}.".
+                format(len(self.palette) - 1))
+        self.band_height = None
+        self.bands = 0
+        self.peak_bytes = 0
+        self.estimated_bytes = self._estimate_bytes()
+        if memory_limit is None:
+            memory_limit = _memory_limit
+        if memory_limit is not None and self.estimated_bytes > memory_limit:
+            self._plan_bands(memory_limit)
+        if self.band_height:
+            # Elements are kept and drawn band by band when the page ends.
+            self.elements = []
+            for element_type in _ELEMENT_FIELDS:
+                setattr(self, "draw_" + element_type,
+                        partial(self._keep, element_type))
+        self._new_canvas()
+
+    @classmethod
+    def from_document(cls,
+                      document,
+                      file_name,
+                      file_object=None,
+                      image_format="png",
+                      size=None,
+                      compress_level=None,
+                      quality=None,
+                      optimize=False,
+                      progressive=False,
+                      colors=None,
+                      color_mode="RGB",
+                      dpi=None,
+                      memory_limit=None):
+        # Create an image renderer sized for a document, or drawn directly
+        # at a resolution when dpi is defined.
+        palette = None
+        has_text = True
+        has_images = False
+        if color_mode != "RGB":
+            palette, has_text, has_images = _document_colors(document)
+        return cls(
+            file_name,
+            image_format, (document.w, document.h),
+            size,
+            file_object=file_object,
+            mode=color_mode,
+            encoder_options=_encoder_options(image_format, compress_level,
+                                             quality, optimize, progressive,
+                                             dpi),
+            colors=colors,
+            palette=palette,
+            has_text=has_text,
+            scale=_dpi_scale(dpi),
+            images=document._images,
+            has_images=has_images,
+            memory_limit=memory_limit)
+
+    def _auto_color_mode(self, has_text, has_images):
+        # Pick the smallest canvas mode that renders the colors exactly.
+        if has_images:
+            return "RGB"
+        if all(r == g == b for r, g, b in self.palette):
+            return "L"
+        # Palette canvases draw aliased text and can't be resampled smoothly.
+        if (self.image_format in ["png", "gif"] and not has_text
+                and not self.output_dimensions and len(self.palette) <= 256):
+            return "P"
+        return "RGB"
+
+    def _ink(self, color):
+        # Convert an RGB color to a pixel value for the canvas mode.
+        if color is None or self.mode in ["RGB", "RGBA"]:
+            return color
+        if self.mode == "L":
+            return _luminance(color)
+        return self.palette_index[color]
+
+    def _estimate_bytes(self):
+        # Most pixel memory held at once while drawing and saving a page.
+        canvas = _pixel_bytes(self.mode, self.canvas_size)
+        output_size = self.output_dimensions or self.canvas_size
+        output = _pixel_bytes(self.mode, output_size)
+        estimate = canvas
+        if self.output_dimensions:
+            if self.mode == "P":
+                estimate += _pixel_bytes("RGB", self.canvas_size)
+                estimate += _pixel_bytes("RGB", output_size)
+            else:
+                estimate += output
+        if self.colors:
+            estimate = max(estimate, output + _pixel_bytes("P", output_size))
+        return estimate
+
+    def _plan_bands(self, limit):
+        # Pick the tallest band that keeps a downscaled page within the
+        # limit, or reject a render that can't be split.
+        if self.output_dimensions:
+            output_w, output_h = self.output_dimensions
+            canvas_w, canvas_h = self.canvas_size
+            # Resampling reads up to 3 source pixels per output pixel around
+            # each band, Lanczos has a support of 3.
+            self.band_margin = int(3 * canvas_h / output_h) + 2
+            fixed = self._band_bytes(0)
+            row = self._band_bytes(1) - fixed
+            height = (limit - fixed) // row - 2 * self.band_margin
+            if height >= _MIN_BAND_HEIGHT:
+                self.band_height = min(height, canvas_h)
+                self.estimated_bytes = self._band_bytes(
+                    self.band_height + 2 * self.band_margin)
+                return
+        raise RuntimeError(
+            "Image needs {:.1f} MB of pixel memory, the memory limit is "
+            "{:.1f} MB.".format(self.estimated_bytes / 2**20,
+                                limit / 2**20))
+
+    def _band_bytes(self, rows):
+        # Pixel memory of a banded page with bands of this many canvas rows.
+        output_size = self.output_dimensions
+        output_rows = int(math.ceil(
+            rows * output_size[1] / self.canvas_size[1])) + 1
+        band_size = (self.canvas_size[0], rows)
+        resized_size = (output_size[0], output_rows)
+        total = _pixel_bytes(self.mode, output_size)
+        total += _pixel_bytes(self.mode, band_size)
+        if self.mode == "P":
+            total += _pixel_bytes("RGB", band_size)
+            total += _pixel_bytes("RGB", resized_size)
+        total += _pixel_bytes(self.mode, resized_size)
+        if self.colors:
+            total += _pixel_bytes("P", output_size)
+        return total
+
+    def _track(self, *images):
+        # Record the pixel memory held by the images.
+        held = sum(
+            _pixel_bytes(image.mode, image.size)
+            for image in {id(image): image
+                          for image in images if image is not None}.values())
+        self.peak_bytes = max(self.peak_bytes, held)
+
+    def _blank(self, size):
+        # New white image in the canvas mode.
+        if self.mode == "P":
+            image = ImagePIL.new("P", size, 0)
+            image.putpalette(
+                [value for color in self.palette for value in color])
+        else:
+            image = ImagePIL.new(self.mode, size, "white")
+        return image
+
+    def _new_canvas(self):
+        # Start a blank white page, banded pages are drawn when they end.
+        if self.band_height:
+            self.image = None
+            self.draw = None
+            return
+        self.image = self._blank(self.canvas_size)
         self.draw = ImageDraw.Draw(self.image)
+        self._track(self.image)
+
+    def _keep(self, element_type, *args, **options):
+        # Keep an element of a banded page with the rows it reaches.
+        item = dict(zip(_ELEMENT_FIELDS[element_type], args))
+        item["type"] = element_type
+        bounds = _bounds(item)
+        self.elements.append((bounds[1], bounds[3],
+                              getattr(type(self), "draw_" + element_type),
+                              args, options))
 
-    def draw_string(self, string, x, y, alignment, font, size, color):
+    def _draw_bands(self):
+        # Draw the kept elements in horizontal bands of the full page and
+        # resample each band into its rows of the output image.
+        canvas_w, canvas_h = self.canvas_size
+        output_w, output_h = self.output_dimensions
+        row_scale = output_h / canvas_h
+        output = self._blank(self.output_dimensions)
+        elements = self.elements
+        self.elements = []
+        step = max(1, int(self.band_height * row_scale))
+        for row in range(0, output_h, step):
+            end = min(row + step, output_h)
+            top = row / row_scale
+            bottom = end / row_scale
+            band_top = max(0, int(top) - self.band_margin)
+            band_bottom = min(canvas_h,
+                              int(math.ceil(bottom)) + self.band_margin)
+            self.image = self._blank((canvas_w, band_bottom - band_top))
+            self.draw = ImageDraw.Draw(self.image)
+            self.pixel_origin = (0, band_top)
+            for y0, y1, method, args, options in elements:
+                if y0 <= band_bottom and band_top <= y1:
+                    method(self, *args, **options)
+            band = self.image
+            if self.mode == "P":
+                band = band.convert("RGB")
+            rows = band.resize((output_w, end - row),
+                               resample=ImagePIL.LANCZOS,
+                               box=(0, top - band_top, canvas_w,
+                                    bottom - band_top))
+            if self.mode == "P":
+                rows = rows.quantize(palette=self.image,
+                                     dither=ImagePIL.NONE)
+            self._track(output, self.image, band, rows)
+            output.paste(rows, (0, row))
+            self.bands += 1
+            self.image = self.draw = band = rows = None
+        self.pixel_origin = (0, 0)
+        self.image = output
+        self.draw = ImageDraw.Draw(output)
+
+    def _point(self, x, y):
+        # Convert document coordinates to canvas pixels.
+        #
+        # Points are rounded on the whole page before the canvas origin is
+        # subtracted, so regions of a page line up with each other.
+        return (math.floor(x * self.scale) - self.pixel_origin[0],
+                math.floor(y * self.scale) - self.pixel_origin[1])
+
+    def _points(self, points):
+        # Convert a flat array of document coordinates to canvas pixels,
+        # rounded as by _point.
+        origin_x, origin_y = self.pixel_origin
+        scale = self.scale
+        floor = math.floor
+        return [(floor(x * scale) - origin_x, floor(y * scale) - origin_y)
+                for x, y in zip(points[0::2], points[1::2])]
+
+    def draw_string(self, string, x, y, alignment, font, size, color,
+                    baseline=False):
         # Add a string to the image at the defined coordinates.
-        font_file = os.path.join(
-            os.path.dirname(__file__), 'fonts', '{}.ttf'.format(font))
-        font = ImageFont.truetype(font_file, size)
-        w, h = self.draw.textsize(str(string), font)
+        #
+        # Strings are drawn above y by their own height, strings of laid out
+        # text have their baseline at y so words of a line stay level.
+        string = str(string)
+        pixel_size = max(1, int(size * self.scale))
+        if "\n" in string:
+            w, h = self.draw.textsize(string, _truetype(font, pixel_size))
+        else:
+            w, h = _text_size(font, pixel_size, string)
+        if baseline:
+            h = _truetype(font, pixel_size).getmetrics()[0]
+        x, y = self._point(x, y)
         y = y - h
         if alignment.lower() == "middle":
             x = x - w / 2
         elif alignment.lower() == "right":
             x = x - w
-        self.draw.text((x, y), str(string), fill=color, font=font)
+        _draw_text(self.draw, (x, y), string, font, pixel_size,
+                   self._ink(color))
 
     def draw_line(self, x, y, x1, y1, width, color):
         # Add a line to the image between (x,y) and (x1,y1).
         self.draw.line(
-            [(int(x * self.scale), int(y * self.scale)),
-             (int(x1 * self.scale), int(y1 * self.scale))],
-            fill=color,
+            [self._point(x, y), self._point(x1, y1)],
+            fill=self._ink(color),
             width=int(width * self.scale))
 
     def draw_rectangle(self, x, y, w, h, fill_color, border_color,
                        border_width):
         # Draw a rectangle on the image with the upper left corner at (x,y).
-        x = int(x * self.scale)
-        y = int(y * self.scale)
+        x, y = self._point(x, y)
         w = int(w * self.scale)
         h = int(h * self.scale)
         border_width = int(border_width * self.scale)
+        fill_color = self._ink(fill_color)
+        border_color = self._ink(border_color)
         x1 = x + w
         y1 = y
         x2 = x + w
@@ -111,8 +432,7 @@ class _Image:
     def draw_circle(self, x, y, radius, fill_color, border_color,
                     border_width):
         # Draw a circle on the image with a center at (x,y).
-        x = int(x * self.scale)
-        y = int(y * self.scale)
+        x, y = self._point(x, y)
         radius = int(radius * self.scale)
         border_width = int(border_width * self.scale)
         x1 = x - radius
@@ -123,7 +443,9 @@ class _Image:
         # Draw circle fill if present
         if fill_color:
             self.draw.ellipse(
-                [(x1, y1), (x2, y2)], fill=fill_color, outline=fill_color)
+                [(x1, y1), (x2, y2)],
+                fill=self._ink(fill_color),
+                outline=self._ink(fill_color))
 
         # Draw circle border with mask
         if border_color and border_width > 0:
@@ -140,15 +462,432 @@ class _Image:
             draw.ellipse(outside_border, fill='white', outline='white')
             draw.ellipse(inside_border, fill='black', outline='black')
             # Paste circle element on document
-            self.image.paste(border_color, box=box, mask=mask)
+            self.image.paste(self._ink(border_color), box=box, mask=mask)
 
-    def save(self, file_object=None):
-        # Save the image to a file
-        if self.output_dimensions:
-            self.image = self.image.resize(
-                self.output_dimensions, resample=ImagePIL.ANTIALIAS)
-        if file_object:
-            self.image.save(fp=file_object, format=self.image_format)
+    def draw_polyline(self, points, width, color):
+        # Stroke a line through the points with a single draw call.
+        self.draw.line(
+            self._points(points),
+            fill=self._ink(color),
+            width=int(width * self.scale),
+            joint="curve")
+
+    def draw_polygon(self, points, fill_color, border_color, border_width):
+        # Fill a closed shape through the points and stroke its border.
+        points = self._points(points)
+        border_width = int(border_width * self.scale)
+        if fill_color:
+            self.draw.polygon(points, fill=self._ink(fill_color))
+        if border_color and border_width > 0:
+            self.draw.line(
+                points + points[:1],
+                fill=self._ink(border_color),
+                width=border_width,
+                joint="curve")
+
+    def draw_image(self, image, x, y, w, h):
+        # Paste an image resampled to its box with the upper left at (x,y).
+        x1, y1 = self._point(x + w, y + h)
+        x, y = self._point(x, y)
+        size = (max(1, x1 - x), max(1, y1 - y))
+        picture = _decoded_image(image, self.images.data(image), size)
+        mask = picture if picture.mode in ("LA", "RGBA") else None
+        if self.mode == "P":
+            picture = picture.convert("RGB").quantize(
+                palette=self.image, dither=ImagePIL.NONE)
+        self.image.paste(picture, (x, y), mask)
+
+    def new_page(self):
+        # Save the current page and continue on a new numbered image.
+        if self.file_object:
+            raise RuntimeError(
+                "Only one page can be written to a file object.")
+        self.save()
+        self.image_count += 1
+        self.file_name = "{}_{}".format(self.base_file_name, self.image_count)
+        self._new_canvas()
+
+    def stats(self):
+        # Estimated and measured pixel memory of the largest page.
+        return {
+            "memory_estimate": self.estimated_bytes,
+            "memory_peak": self.peak_bytes,
+            "bands": self.bands
+        }
+
+    def _finish_page(self):
+        # Resize the page to the requested output dimensions.
+        if self.band_height:
+            self._draw_bands()
+        elif self.output_dimensions:
+            if self.mode == "P":
+                # Resample in RGB and map back onto the document palette.
+                palette_image = self.image
+                rgb = self.image.convert("RGB")
+                resized = rgb.resize(
+                    self.output_dimensions, resample=ImagePIL.LANCZOS)
+                self._track(palette_image, rgb, resized)
+                rgb = None
+                self.image = resized.quantize(
+                    palette=palette_image, dither=ImagePIL.NONE)
+            else:
+                resized = self.image.resize(
+                    self.output_dimensions, resample=ImagePIL.LANCZOS)
+                self._track(self.image, resized)
+                self.image = resized
+            self.draw = None
+
+    def save(self):
+        # Save the image to a file and release the page.
+        self._finish_page()
+        if self.colors and (self.mode != "P"
+                            or len(self.palette) > self.colors):
+            if self.mode == "P":
+                self.image = self.image.convert("RGB")
+            # Fast octree palette instead of the encoder's median cut.
+            quantized = self.image.quantize(
+                self.colors, method=ImagePIL.FASTOCTREE)
+            self._track(self.image, quantized)
+            self.image = quantized
+        if self.file_object:
+            self.image.save(
+                fp=self.file_object,
+                format=self.image_format,
+                **self.encoder_options)
         else:
             self.image.save("{}.{}".format(self.file_name, self.image_format),
-                            self.image_format)
+                            self.image_format, **self.encoder_options)
+        # Free the page before the next one is allocated.
+        self.image = None
+        self.draw = None
+
+
+class _Raster(_Image):
+    # Render the document to raw pixel buffers instead of encoded files.
+    def __init__(self,
+                 document_wh,
+                 image_wh=None,
+                 mode="RGB",
+                 images=None,
+                 scale=None,
+                 memory_limit=None):
+        _Image.__init__(
+            self,
+            None,
+            None,
+            document_wh,
+            image_wh,
+            mode=mode,
+            images=images,
+            scale=scale,
+            memory_limit=memory_limit)
+        self.pages = []
+
+    @classmethod
+    def from_document(cls,
+                      document,
+                      file_name=None,
+                      file_object=None,
+                      mode="RGB",
+                      size=None,
+                      dpi=None,
+                      memory_limit=None):
+        # Create a raster renderer sized for a document.
+        return cls((document.w, document.h),
+                   size,
+                   mode=mode,
+                   images=document._images,
+                   scale=_dpi_scale(dpi),
+                   memory_limit=memory_limit)
+
+    def _buffer(self):
+        # Export the finished page as a memoryview shaped (h, w, channels).
+        self._finish_page()
+        w, h = self.image.size
+        data = self.image.tobytes()
+        self.image = None
+        self.draw = None
+        return memoryview(data).cast("B", (h, w, len(self.mode)))
+
+    def new_page(self):
+        # Keep the current page buffer and continue on a blank page.
+        self.pages.append(self._buffer())
+        self._new_canvas()
+
+    def save(self):
+        # Return the buffers of all generated pages.
+        self.pages.append(self._buffer())
+        return self.pages
+
+
+class _Animation(_Image):
+    # Render the pages as the frames of one animated or multi-page image.
+    #
+    # Pillow writes GIF, TIFF and WebP frames from the whole sequence, so
+    # each finished page is kept as a frame and its canvas is released. GIF
+    # frames share one palette, the document colors and the most common
+    # other colors of the first page, so it is computed once.
+    def __init__(self,
+                 file_name,
+                 image_format,
+                 document_wh,
+                 image_wh=None,
+                 file_object=None,
+                 encoder_options=None,
+                 colors=None,
+                 palette=None,
+                 scale=None,
+                 images=None,
+                 memory_limit=None):
+        _Image.__init__(
+            self,
+            file_name,
+            image_format,
+            document_wh,
+            image_wh,
+            file_object=file_object,
+            encoder_options=encoder_options,
+            colors=colors,
+            palette=palette,
+            scale=scale,
+            images=images,
+            memory_limit=memory_limit)
+        self.frames = []
+        self.shared_palette = None
+
+    @classmethod
+    def from_document(cls,
+                      document,
+                      file_name,
+                      file_object=None,
+                      image_format="gif",
+                      size=None,
+                      duration=1000,
+                      loop=0,
+                      colors=None,
+                      quality=None,
+                      dpi=None,
+                      memory_limit=None):
+        # Create an animation renderer sized for a document.
+        options = {"duration": duration, "loop": loop}
+        if image_format == "gif":
+            # Keep the shared palette instead of one per frame.
+            options["optimize"] = False
+        elif image_format == "tiff":
+            options = {"compression": "tiff_deflate"}
+        elif quality is None:
+            options["lossless"] = True
+        else:
+            options["quality"] = quality
+        if dpi and image_format != "gif":
+            options["dpi"] = (dpi, dpi)
+        palette = None
+        if image_format == "gif" or colors:
+            palette = _document_colors(document)[0]
+        return cls(
+            file_name,
+            image_format, (document.w, document.h),
+            size,
+            file_object=file_object,
+            encoder_options=options,
+            colors=colors,
+            palette=palette,
+            scale=_dpi_scale(dpi),
+            images=document._images,
+            memory_limit=memory_limit)
+
+    def _keep_frame(self):
+        # Keep the finished page, mapped to the shared palette if needed.
+        self._finish_page()
+        frame = self.image
+        self.image = None
+        self.draw = None
+        if self.image_format == "gif" or self.colors:
+            frame = frame.quantize(
+                palette=self._shared_palette(frame), dither=ImagePIL.NONE)
+        self.frames.append(frame)
+        self._track(*self.frames)
+
+    def _shared_palette(self, frame):
+        # Palette image of all frames, made from the first one.
+        if self.shared_palette is None:
+            colors = self.colors or 256
+            palette = self.palette[:colors]
+            if len(palette) < colors:
+                common = frame.quantize(colors, method=ImagePIL.FASTOCTREE)
+                values = common.getpalette()[:3 * colors]
+                known = set(palette)
+                for color in zip(values[0::3], values[1::3], values[2::3]):
+                    if len(palette) < colors and color not in known:
+                        palette.append(color)
+                        known.add(color)
+            self.shared_palette = ImagePIL.new("P", (1, 1))
+            self.shared_palette.putpalette(
+                [value for color in palette for value in color])
+        return self.shared_palette
+
+    def new_page(self):
+        # Keep the current page as a frame and continue on a blank page.
+        self._keep_frame()
+        self._new_canvas()
+
+    def save(self):
+        # Write every frame to one image.
+        self._keep_frame()
+        first, rest = self.frames[0], self.frames[1:]
+        self.frames = []
+        options = dict(self.encoder_options)
+        if self.image_format == "gif":
+            # Frames refer to one global color table.
+            options["palette"] = bytes(self.shared_palette.getpalette())
+        if self.file_object:
+            output = self.file_object
+        else:
+            output = "{}.{}".format(self.file_name, self.image_format)
+        first.save(
+            output,
+            format=self.image_format,
+            save_all=True,
+            append_images=rest,
+            **options)
+
+
+class _Previews(_Image):
+    # Render one page once at the largest of several sizes.
+    #
+    # Each smaller size is resampled from the next larger one instead of the
+    # full page, so every step reads fewer pixels than the one before.
+    def __init__(self,
+                 document_wh,
+                 sizes,
+                 image_format="png",
+                 encoder_options=None,
+                 images=None,
+                 memory_limit=None):
+        self.sizes = [_fitted_size(document_wh, size) for size in sizes]
+        largest = max(range(len(sizes)), key=lambda index: _area(
+            self.sizes[index]))
+        _Image.__init__(
+            self,
+            None,
+            image_format,
+            document_wh,
+            sizes[largest],
+            encoder_options=encoder_options,
+            images=images,
+            memory_limit=memory_limit)
+
+    @classmethod
+    def from_document(cls,
+                      document,
+                      file_name=None,
+                      file_object=None,
+                      sizes=(),
+                      image_format="png",
+                      compress_level=None,
+                      quality=None,
+                      optimize=False,
+                      progressive=False,
+                      memory_limit=None):
+        # Create a preview renderer for a document.
+        return cls((document.w, document.h),
+                   sizes,
+                   image_format,
+                   encoder_options=_encoder_options(
+                       image_format, compress_level, quality, optimize,
+                       progressive),
+                   images=document._images,
+                   memory_limit=memory_limit)
+
+    def new_page(self):
+        raise RuntimeError("Previews are generated for a single page.")
+
+    def save(self):
+        # Encoded images in the order of the requested sizes.
+        self._finish_page()
+        image = self.image
+        self.image = None
+        self.draw = None
+        encoded = {}
+        for size in sorted(set(self.sizes), key=_area, reverse=True):
+            if image.size != size:
+                # Box reduce by whole factors, then resample the rest.
+                image = image.resize(
+                    size, resample=ImagePIL.LANCZOS, reducing_gap=3.0)
+            output = BytesIO()
+            image.save(output, self.image_format, **self.encoder_options)
+            encoded[size] = output.getvalue()
+        return [encoded[size] for size in self.sizes]
+
+
+def _document_colors(document):
+    # Colors used by the elements of a document and whether it has text and
+    # images.
+    colors = set()
+    has_text = False
+    has_images = False
+    for page in document._page_elements():
+        for item in page:
+            if item["type"] == "string":
+                has_text = True
+            elif item["type"] == "image":
+                has_images = True
+            for field, value in item.items():
+                if field.endswith("color") and value:
+                    colors.add(value)
+    return colors, has_text, has_images
+
+
+def _luminance(color):
+    # ITU-R 601-2 luma transform, as used by Pillow's RGB to L conversion.
+    return (color[0] * 299 + color[1] * 587 + color[2] * 114 + 500) // 1000
+
+
+def _pixel_bytes(mode, size):
+    # Memory Pillow allocates for an image, RGB pixels are stored in 4 bytes.
+    return size[0] * size[1] * (1 if mode in ["L", "P"] else 4)
+
+
+def _fitted_size(document_wh, image_wh):
+    # Largest image of the document's proportions within a width and
+    # height, as drawn by _Image.
+    scale_w = image_wh[0] / document_wh[0]
+    scale_h = image_wh[1] / document_wh[1]
+    if scale_w < scale_h:
+        return image_wh[0], int(document_wh[1] * scale_w)
+    return int(document_wh[0] * scale_h), image_wh[1]
+
+
+def _area(size):
+    return size[0] * size[1]
+
+
+def _dpi_scale(dpi):
+    # Pixels per document unit at a resolution, None for the default.
+    if not dpi:
+        return None
+    return dpi / _UNITS_PER_INCH
+
+
+def _encoder_options(image_format, compress_level, quality, optimize,
+                     progressive, dpi=None):
+    # Pillow save parameters supported by the image format.
+    options = {}
+    if optimize:
+        options["optimize"] = True
+    if dpi and image_format in ["png", "jpeg"]:
+        options["dpi"] = (dpi, dpi)
+    if image_format == "png" and compress_level is not None:
+        options["compress_level"] = compress_level
+    elif image_format == "jpeg":
+        if quality is not None:
+            options["quality"] = quality
+        if progressive:
+            options["progressive"] = True
+    return options
+
+
+register_backend("image", _Image)
+register_backend("raster", _Raster)
+register_backend("animation", _Animation)
+register_backend("previews", _Previews)
@@ -12,30 +12,47 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import os
+import threading
 from reportlab.pdfgen import canvas
+from reportlab.pdfgen.canvas import FILL_EVEN_ODD
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+from .font_registry import _font_path
+from .images import _decoded_image
+from .renderer import Renderer, register_backend
 
+# TrueType fonts registered with reportlab by this process.
+_registered_fonts = set()
+_font_lock = threading.Lock()
 
-class _PDF:
+
+class _PDF(Renderer):
     # Generate a PDF with the reportlab open source toolkit.
     def __init__(self, file_name, document_size, orientation,
-                 file_object=None):
+                 file_object=None, images=None, invariant=False):
         if document_size == "letter":
             standard_doc_size = letter
         elif document_size == "a4":
             standard_doc_size = A4
+        # Invariant PDFs have a fixed creation date and file identifier.
         if file_object:
             self.pdf = canvas.Canvas(
-                file_object, pagesize=standard_doc_size, bottomup=0)
+                file_object,
+                pagesize=standard_doc_size,
+                bottomup=0,
+                invariant=int(invariant))
         else:
             self.pdf = canvas.Canvas(
                 "{}.pdf".format(file_name),
                 pagesize=standard_doc_size,
-                bottomup=0)
+                bottomup=0,
+                invariant=int(invariant))
+        self.images = images
+        # Image readers by key, reportlab embeds each reader's data once.
+        self.image_readers = {}
         self.loaded_fonts = [
             "Courier",
             "Courier-Bold",
@@ -51,6 +68,23 @@ class _PDF:
             "Times-Roman",
         ]
 
+    @classmethod
+    def from_document(cls, document, file_name, file_object=None,
+                      invariant=False):
+        # Create a PDF with the size, layout and metadata of a document.
+        pdf = cls(
+            file_name,
+            document.document_size,
+            document.layout,
+            file_object=file_object,
+            images=document._images,
+            invariant=invariant)
+        pdf.set_metadata(
+            author=document.author,
+            title=document.title,
+            subject=document.subject)
+        return pdf
+
     def set_metadata(self, author, title, subject):
         # Set metadata for a document.
         if author:
@@ -60,8 +94,9 @@ class _PDF:
         if subject:
             self.pdf.setSubject(subject)
 
-    def draw_string(self, string, x, y, alignment, font, size, color):
-        # Add a string to a document at the defined coordinates.
+    def draw_string(self, string, x, y, alignment, font, size, color,
+                    baseline=False):
+        # Add a string to a document with its baseline at y.
         size = (size / 100) * cm
         x = (x / 100) * cm
         y = (y / 100) * cm
@@ -131,6 +166,64 @@ class _PDF:
                                      fill_color[2] / 255)
             self.pdf.circle(x_cen=x, y_cen=y, r=radius, stroke=1, fill=1)
 
+    def draw_polyline(self, points, width, color):
+        # Stroke a line through the points as one path with round joins.
+        self.pdf.saveState()
+        self.pdf.setLineWidth((width / 100) * cm)
+        self.pdf.setLineJoin(1)
+        self.pdf.setStrokeColorRGB(color[0] / 255, color[1] / 255,
+                                   color[2] / 255)
+        self.pdf.drawPath(self._path(points), stroke=1, fill=0)
+        self.pdf.restoreState()
+
+    def draw_polygon(self, points, fill_color, border_color, border_width):
+        # Draw a closed path through the points with fill and border.
+        path = self._path(points)
+        path.close()
+        self.pdf.saveState()
+        self.pdf.setLineJoin(1)
+        if border_width > 0:
+            self.pdf.setStrokeColorRGB(border_color[0] / 255,
+                                       border_color[1] / 255,
+                                       border_color[2] / 255)
+            self.pdf.setLineWidth((border_width / 100) * cm)
+        if fill_color:
+            self.pdf.setFillColorRGB(fill_color[0] / 255, fill_color[1] / 255,
+                                     fill_color[2] / 255)
+        self.pdf.drawPath(
+            path,
+            stroke=1 if border_width > 0 else 0,
+            fill=1 if fill_color else 0,
+            fillMode=FILL_EVEN_ODD)
+        self.pdf.restoreState()
+
+    def _path(self, points):
+        # Path through a flat array of points in document units.
+        scale = cm / 100
+        path = self.pdf.beginPath()
+        path.moveTo(points[0] * scale, points[1] * scale)
+        for x, y in zip(points[2::2], points[3::2]):
+            path.lineTo(x * scale, y * scale)
+        return path
+
+    def draw_image(self, image, x, y, w, h):
+        # Draw an image with the upper left corner at (x,y).
+        reader = self.image_readers.get(image)
+        if reader is None:
+            reader = ImageReader(
+                _decoded_image(image, self.images.data(image)))
+            self.image_readers[image] = reader
+        x = (x / 100) * cm
+        y = (y / 100) * cm
+        w = (w / 100) * cm
+        h = (h / 100) * cm
+        # Images are drawn bottom up, flip them back on the top down page.
+        self.pdf.saveState()
+        self.pdf.translate(x, y + h)
+        self.pdf.scale(1, -1)
+        self.pdf.drawImage(reader, 0, 0, w, h, mask="auto")
+        self.pdf.restoreState()
+
     def save(self):
         # Save the document to a file.
         self.pdf.save()
@@ -139,13 +232,54 @@ class _PDF:
         # Start a new page in the document
         self.pdf.showPage()
 
+    def preload_fonts(self, characters):
+        # Register fonts and their characters in a fixed order.
+        #
+        # Documents rendered separately, e.g. page ranges in worker processes,
+        # then give each font the same name and embed identical subsets.
+        for font in sorted(characters):
+            self.use_font(font, 10)
+            face = pdfmetrics.getFont(font)
+            if isinstance(face, TTFont):
+                face.splitString("".join(sorted(characters[font])),
+                                 self.pdf._doc)
+
+    def continue_fonts(self, fonts, subsets):
+        # Give fonts the codes they have in an existing PDF.
+        #
+        # Codes are assigned in the order characters are first used, so
+        # replaying the codes of each subset in order assigns the same codes
+        # again and unchanged subsets embed identical font objects. Subsets
+        # are {PostScript name: [codes of subset 0, ...]}.
+        for font in sorted(fonts):
+            self.use_font(font, 10)
+            face = pdfmetrics.getFont(font)
+            if not isinstance(face, TTFont):
+                continue
+            name = (face.face.name + face.face.subfontNameX).decode("latin-1")
+            for codes in subsets.get(name, []):
+                face.splitString("".join(map(chr, codes)), self.pdf._doc)
+
     def use_font(self, font, size):
         # Register a font if it is not registered
         if font not in self.loaded_fonts:
-            font_file = os.path.join(
-                os.path.dirname(__file__), 'fonts', '{}.ttf'.format(font))
-            pdfmetrics.registerFont(TTFont(font, font_file))
+            _register_font(font)
             self.loaded_fonts.append(font)
-            self.pdf.setFont(font, size)
-        else:
-            self.pdf.setFont(font, size)
+        self.pdf.setFont(font, size)
+
+
+def _register_font(font):
+    # Register a TrueType font with reportlab once per process.
+    #
+    # The registry is global. Registering a font again would replace the
+    # font object that PDFs being generated in other threads keep their
+    # subset state in.
+    if font in _registered_fonts:
+        return
+    with _font_lock:
+        if font not in _registered_fonts:
+            pdfmetrics.registerFont(TTFont(font, _font_path(font)))
+            _registered_fonts.add(font)
+
+
+register_backend("pdf", _PDF)
@@ -0,0 +1,213 @@
+# Copyright 2018 Adam Moller
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+from io import BytesIO
+from xml.sax.saxutils import escape, quoteattr
+from .font_registry import _font_path
+from .images import _decoded_image
+from .renderer import Renderer, register_backend
+
+# Media types of the image formats embedded without conversion.
+_SVG_IMAGE_FORMATS = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "GIF": "image/gif",
+}
+
+
+class _SVG(Renderer):
+    # Stream the document as SVG image(s), one element per draw call.
+    def __init__(self,
+                 file_name,
+                 document_wh,
+                 file_object=None,
+                 embed_fonts=False,
+                 images=None):
+        self.base_file_name = file_name
+        self.document_wh = document_wh
+        self.file_object = file_object
+        self.embed_fonts = embed_fonts
+        self.images = images
+        self.image_count = 1
+        self._start_page("{}.svg".format(file_name))
+
+    @classmethod
+    def from_document(cls, document, file_name, file_object=None,
+                      embed_fonts=False):
+        # Create an SVG writer sized for a document.
+        return cls(
+            file_name, (document.w, document.h),
+            file_object=file_object,
+            embed_fonts=embed_fonts,
+            images=document._images)
+
+    def _start_page(self, path):
+        # Open the output and write the SVG header for a page.
+        if self.file_object:
+            self.output = self.file_object
+        else:
+            self.output = open(path, "wb")
+        self.embedded_fonts = set()
+        self.embedded_images = set()
+        w, h = self.document_wh
+        self._write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<svg xmlns="http://www.w3.org/2000/svg" '
+            'xmlns:xlink="http://www.w3.org/1999/xlink" version="1.1" '
+            'width="{}mm" height="{}mm" viewBox="0 0 {} {}">\n'
+            '<rect width="{}" height="{}" fill="#ffffff"/>\n'.format(
+                w / 10, h / 10, w, h, w, h))
+
+    def _end_page(self):
+        # Close the SVG element and the output file.
+        self._write("</svg>\n")
+        if not self.file_object:
+            self.output.close()
+
+    def _write(self, text):
+        self.output.write(text.encode("utf-8"))
+
+    def draw_string(self, string, x, y, alignment, font, size, color,
+                    baseline=False):
+        # Add a string to the image with its baseline at y.
+        if self.embed_fonts and font not in self.embedded_fonts:
+            self._embed_font(font)
+        anchor = {"middle": "middle", "right": "end"}.get(
+            alignment.lower(), "start")
+        # Viewers without the font fall back to a generic family.
+        family = '"{}", sans-serif'.format(font)
+        self._write(
+            '<text x="{}" y="{}" font-family={} font-size="{}" fill="{}" '
+            'text-anchor="{}" xml:space="preserve">{}</text>\n'.format(
+                x, y, quoteattr(family), size, _svg_color(color), anchor,
+                escape(str(string))))
+
+    def draw_line(self, x, y, x1, y1, width, color):
+        # Add a line to the image between (x,y) and (x1,y1).
+        self._write(
+            '<line x1="{}" y1="{}" x2="{}" y2="{}" stroke="{}" '
+            'stroke-width="{}"/>\n'.format(x, y, x1, y1, _svg_color(color),
+                                           width))
+
+    def draw_rectangle(self, x, y, w, h, fill_color, border_color,
+                       border_width):
+        # Draw a rectangle with the upper left corner at (x,y).
+        #
+        # SVG sizes can't be negative, a negative width or height extends
+        # the rectangle left of or above (x,y).
+        if w < 0:
+            x, w = x + w, -w
+        if h < 0:
+            y, h = y + h, -h
+        self._write('<rect x="{}" y="{}" width="{}" height="{}" {}/>\n'.format(
+            x, y, w, h, _svg_paint(fill_color, border_color, border_width)))
+
+    def draw_circle(self, x, y, radius, fill_color, border_color,
+                    border_width):
+        # Draw a circle with the center at (x,y).
+        self._write('<circle cx="{}" cy="{}" r="{}" {}/>\n'.format(
+            x, y, radius, _svg_paint(fill_color, border_color,
+                                     border_width)))
+
+    def draw_polyline(self, points, width, color):
+        # Add a line through the points.
+        self._write(
+            '<polyline points="{}" fill="none" stroke="{}" stroke-width="{}" '
+            'stroke-linejoin="round"/>\n'.format(
+                _svg_points(points), _svg_color(color), width))
+
+    def draw_polygon(self, points, fill_color, border_color, border_width):
+        # Add a closed shape through the points.
+        self._write(
+            '<polygon points="{}" fill-rule="evenodd" stroke-linejoin="round" '
+            '{}/>\n'.format(
+                _svg_points(points),
+                _svg_paint(fill_color, border_color, border_width)))
+
+    def draw_image(self, image, x, y, w, h):
+        # Place an image with the upper left corner at (x,y).
+        if image not in self.embedded_images:
+            self._embed_image(image)
+        self._write('<use xlink:href="#image-{}" x="{}" y="{}" width="{}" '
+                    'height="{}"/>\n'.format(image, x, y, w, h))
+
+    def new_page(self):
+        # Finish the current page and continue in a new numbered file.
+        if self.file_object:
+            raise RuntimeError(
+                "Only one page can be written to a file object.")
+        self._end_page()
+        self.image_count += 1
+        self._start_page("{}_{}.svg".format(self.base_file_name,
+                                            self.image_count))
+
+    def save(self):
+        # Finish the last page.
+        self._end_page()
+
+    def _embed_font(self, font):
+        # Embed a TrueType font the first time it is used on a page.
+        with open(_font_path(font), "rb") as f:
+            data = base64.b64encode(f.read()).decode("ascii")
+        self._write('<style>@font-face{{font-family:"{}";'
+                    'src:url(data:font/ttf;base64,{}) format("truetype");}}'
+                    '</style>\n'.format(font, data))
+        self.embedded_fonts.add(font)
+
+    def _embed_image(self, image):
+        # Define an image the first time it is used on a page.
+        #
+        # Formats browsers can't display are converted to PNG.
+        image_format = self.images.format(image)
+        data = self.images.data(image)
+        if image_format not in _SVG_IMAGE_FORMATS:
+            image_format = "PNG"
+            output = BytesIO()
+            _decoded_image(image, data).save(output, "PNG")
+            data = output.getvalue()
+        w, h = self.images.size(image)
+        self._write(
+            '<defs><symbol id="image-{}" viewBox="0 0 {} {}" '
+            'preserveAspectRatio="none"><image width="{}" height="{}" '
+            'xlink:href="data:{};base64,{}"/></symbol></defs>\n'.format(
+                image, w, h, w, h, _SVG_IMAGE_FORMATS[image_format],
+                base64.b64encode(data).decode("ascii")))
+        self.embedded_images.add(image)
+
+
+def _svg_color(color):
+    # Convert an RGB tuple to an SVG hexadecimal color.
+    return "#{:02x}{:02x}{:02x}".format(*color)
+
+
+def _svg_points(points):
+    # Convert a flat array of coordinates to an SVG points attribute.
+    return " ".join("{:g},{:g}".format(x, y)
+                    for x, y in zip(points[0::2], points[1::2]))
+
+
+def _svg_paint(fill_color, border_color, border_width):
+    # Fill and stroke attributes for shapes with an optional border.
+    if fill_color:
+        paint = 'fill="{}"'.format(_svg_color(fill_color))
+    else:
+        paint = 'fill="none"'
+    if border_color and border_width > 0:
+        paint += ' stroke="{}" stroke-width="{}"'.format(
+            _svg_color(border_color), border_width)
+    return paint
+
+
+register_backend("svg", _SVG)
@@ -0,0 +1,153 @@
+# Copyright 2018 Adam Moller
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+from .metrics import _string_box
+
+
+def _bounds(item):
+    # Bounding box (x0, y0, x1, y1) covering everything an element draws.
+    #
+    # Borders and lines are centered on their path. String boxes are padded
+    # to allow for hinting differences between the PDF and image fonts.
+    element_type = item["type"]
+    if element_type == "string":
+        x0, y0, x1, y1 = _string_box(item)
+        pad = item["size"] * 0.1 + 2
+        return (x0 - pad, y0 - pad, x1 + pad, y1 + pad)
+    elif element_type == "line":
+        half = item["width"] / 2 + 1
+        return (min(item["x"], item["x1"]) - half,
+                min(item["y"], item["y1"]) - half,
+                max(item["x"], item["x1"]) + half,
+                max(item["y"], item["y1"]) + half)
+    elif element_type == "rectangle":
+        half = item["border_width"] / 2 + 1
+        x0, y0, x1, y1 = _box(item)
+        return (x0 - half, y0 - half, x1 + half, y1 + half)
+    elif element_type == "circle":
+        reach = item["radius"] + item["border_width"] / 2 + 1
+        return (item["x"] - reach, item["y"] - reach, item["x"] + reach,
+                item["y"] + reach)
+    elif element_type == "image":
+        return _box(item)
+    elif element_type == "polyline":
+        return _points_bounds(item["points"], item["width"] / 2 + 1)
+    elif element_type == "polygon":
+        return _points_bounds(item["points"], item["border_width"] / 2 + 1)
+    raise KeyError("Element type has no bounds: '{}'".format(element_type))
+
+
+def _opaque_bounds(item):
+    # Area an element covers completely, None if it can be seen through.
+    if item["type"] == "rectangle" and item["fill_color"]:
+        return _box(item)
+    return None
+
+
+def _box(item):
+    # Box (x0, y0, x1, y1) of an element placed by x, y, w and h.
+    #
+    # Widths and heights may be negative, drawing left of or above x, y.
+    x0 = item["x"]
+    y0 = item["y"]
+    x1 = x0 + item["w"]
+    y1 = y0 + item["h"]
+    return (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+
+
+def _intersects(a, b):
+    # True if two boxes overlap.
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _contains(outer, inner):
+    # True if the inner box lies completely within the outer box.
+    return (outer[0] <= inner[0] and outer[1] <= inner[1]
+            and inner[2] <= outer[2] and inner[3] <= outer[3])
+
+
+def _hit(item, x, y):
+    # True if an element draws over the point (x, y).
+    element_type = item["type"]
+    if element_type == "string":
+        return _contains(_string_box(item), (x, y, x, y))
+    elif element_type == "line":
+        return _segment_distance(x, y, item["x"], item["y"], item["x1"],
+                                 item["y1"]) <= item["width"] / 2
+    elif element_type == "rectangle":
+        half = item["border_width"] / 2
+        x0, y0, x1, y1 = _box(item)
+        outer = (x0 - half, y0 - half, x1 + half, y1 + half)
+        if not _contains(outer, (x, y, x, y)):
+            return False
+        if item["fill_color"]:
+            return True
+        inner = (x0 + half, y0 + half, x1 - half, y1 - half)
+        return not (inner[0] < x < inner[2] and inner[1] < y < inner[3])
+    elif element_type == "circle":
+        distance = math.hypot(x - item["x"], y - item["y"])
+        half = item["border_width"] / 2
+        if item["fill_color"]:
+            return distance <= item["radius"] + half
+        return abs(distance - item["radius"]) <= half
+    elif element_type == "polyline":
+        return _path_distance(x, y, item["points"]) <= item["width"] / 2
+    elif element_type == "polygon":
+        if item["fill_color"] and _inside(x, y, item["points"]):
+            return True
+        return _path_distance(x, y, item["points"],
+                              closed=True) <= item["border_width"] / 2
+    return _contains(_bounds(item), (x, y, x, y))
+
+
+def _points_bounds(points, pad):
+    # Bounding box of a flat array of coordinates, padded on every side.
+    xs = points[0::2]
+    ys = points[1::2]
+    return (min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad)
+
+
+def _path_distance(x, y, points, closed=False):
+    # Distance from a point to the segments joining a flat array of points.
+    xs = points[0::2]
+    ys = points[1::2]
+    segments = list(zip(xs, ys, xs[1:], ys[1:]))
+    if closed:
+        segments.append((xs[-1], ys[-1], xs[0], ys[0]))
+    return min(
+        _segment_distance(x, y, x0, y0, x1, y1)
+        for x0, y0, x1, y1 in segments)
+
+
+def _inside(x, y, points):
+    # True if a point lies inside a polygon, by the even-odd rule.
+    xs = points[0::2]
+    ys = points[1::2]
+    inside = False
+    for x0, y0, x1, y1 in zip(xs, ys, xs[-1:] + xs[:-1], ys[-1:] + ys[:-1]):
+        if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            inside = not inside
+    return inside
+
+
+def _segment_distance(x, y, x0, y0, x1, y1):
+    # Distance from a point to the line segment (x0, y0) - (x1, y1).
+    dx = x1 - x0
+    dy = y1 - y0
+    length = dx * dx + dy * dy
+    if length == 0:
+        return math.hypot(x - x0, y - y0)
+    t = max(0, min(1, ((x - x0) * dx + (y - y0) * dy) / length))
+    return math.hypot(x - (x0 + t * dx), y - (y0 + t * dy))
@@ -0,0 +1,165 @@
+# Copyright 2018 Adam Moller
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from PIL import Image as ImagePIL
+from PIL import ImageFont, ImageDraw
+from .font_registry import _font_path
+
+
+class _RunCache:
+    # Rasterized text runs shared by every image renderer.
+    #
+    # A run is the mask of one string in one font, pixel size, subpixel
+    # offset and font mode. Masks hold coverage rather than color, so one
+    # entry serves every color the string is drawn in. The least recently
+    # used runs are dropped once the masks exceed max_bytes, and runs larger
+    # than max_entry_bytes, such as big titles, are never stored. Runs are
+    # rendered outside the lock, so a miss doesn't hold up other threads.
+    def __init__(self, max_bytes=32 * 2**20, max_entry_bytes=None):
+        self.lock = threading.Lock()
+        self.runs = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.resize(max_bytes, max_entry_bytes)
+
+    def __len__(self):
+        return len(self.runs)
+
+    def resize(self, max_bytes, max_entry_bytes=None):
+        # Change the memory limits, evicting runs that no longer fit.
+        with self.lock:
+            self.max_bytes = max_bytes
+            if max_entry_bytes is None:
+                max_entry_bytes = max_bytes // 64
+            self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+            self._evict()
+
+    def clear(self):
+        # Drop all runs and reset the counters.
+        with self.lock:
+            self.runs.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def get(self, key, render):
+        # Cached run for a key, calling render() to create it when missing.
+        with self.lock:
+            run = self.runs.get(key)
+            if run is not None:
+                self.runs.move_to_end(key)
+                self.hits += 1
+                return run
+            self.misses += 1
+        run = render()
+        size = self._size(run)
+        with self.lock:
+            if size <= self.max_entry_bytes and key not in self.runs:
+                self.runs[key] = run
+                self.bytes += size
+                self._evict()
+        return run
+
+    def _evict(self):
+        # Remove least recently used runs until the masks fit max_bytes.
+        while self.bytes > self.max_bytes:
+            _, run = self.runs.popitem(last=False)
+            self.bytes -= self._size(run)
+
+    def _size(self, run):
+        # Memory used by an entry.
+        return _run_bytes(run)
+
+
+# Text runs of all image renderers in this process.
+_run_cache = _RunCache()
+
+
+def set_text_cache_limit(max_bytes):
+    """Limit the memory used by cached text in image output.
+
+    Image renderers rasterize each distinct string once per font and size
+    and reuse the result. Least recently used strings are dropped when the
+    limit is reached, a limit of 0 disables the cache.
+
+    Args:
+        max_bytes: Memory for cached text masks in bytes (Integer)
+    """
+    _run_cache.resize(max_bytes)
+
+
+@lru_cache(maxsize=256)
+def _truetype(font, pixel_size):
+    # Pillow font for a font name at a pixel size, loaded once.
+    return ImageFont.truetype(_font_path(font), pixel_size)
+
+
+@lru_cache(maxsize=65536)
+def _text_size(font, pixel_size, text):
+    # Width and height of a text in pixels, as measured by Pillow.
+    return _truetype(font, pixel_size).getbbox(text)[2:]
+
+
+def _render_run(font, pixel_size, text, start, fontmode):
+    # Rasterize a text to a cropped mask.
+    #
+    # Returns (mask, x, y), the offset of the mask from the pixel the text
+    # is drawn at, or (None, 0, 0) for text without visible glyphs. Coverage
+    # is identical to drawing the text at a position with the fractional
+    # part start, so compositing the mask reproduces ImageDraw.text.
+    image_font = _truetype(font, pixel_size)
+    left, top, right, bottom = image_font.getbbox(text)
+    # Keep the pen position positive so Pillow's rounding matches the page.
+    pen_x = max(0, -left)
+    pen_y = max(0, -top)
+    mask = ImagePIL.new("L", (pen_x + max(right, 0) + 2,
+                              pen_y + max(bottom, 0) + 2), 0)
+    draw = ImageDraw.Draw(mask)
+    draw.fontmode = fontmode
+    draw.text((pen_x + start, pen_y), text, fill=255, font=image_font)
+    box = mask.getbbox()
+    if box is None:
+        return None, 0, 0
+    return mask.crop(box), box[0] - pen_x, box[1] - pen_y
+
+
+def _run_bytes(run):
+    # Memory used by the mask of a run.
+    mask = run[0]
+    if mask is None:
+        return 0
+    return mask.size[0] * mask.size[1]
+
+
+def _draw_text(draw, position, text, font, pixel_size, ink):
+    # Draw a single line of text onto a page through the run cache.
+    #
+    # Falls back to ImageDraw.text for text Pillow lays out differently,
+    # multiple lines, and for negative fractional positions, which Pillow
+    # rounds towards zero.
+    x, y = position
+    start = math.modf(x)[0]
+    if "\n" in text or start < 0 or _run_cache.max_bytes <= 0:
+        draw.text(position, text, fill=ink, font=_truetype(font, pixel_size))
+        return
+    mask, offset_x, offset_y = _run_cache.get(
+        (font, pixel_size, text, start, draw.fontmode),
+        lambda: _render_run(font, pixel_size, text, start, draw.fontmode))
+    if mask is not None:
+        draw.bitmap((int(x) + offset_x, int(y) + offset_y), mask, fill=ink)
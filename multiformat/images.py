@@ -0,0 +1,130 @@
+# Copyright 2018 Adam Moller
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import threading
+from io import BytesIO
+from PIL import Image as ImagePIL
+from .glyphs import _RunCache
+
+
+class _ImageTable:
+    # Encoded images of a document by content hash.
+    #
+    # Elements store the hash, so an image drawn on many pages is kept once.
+    # Each entry is (data, (width, height), format) as read from the header.
+    def __init__(self):
+        self.images = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.images)
+
+    def __contains__(self, key):
+        return key in self.images
+
+    def __getstate__(self):
+        return {"images": self.images}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def add(self, data):
+        # Store encoded image data, returns its key.
+        #
+        # Raises OSError if Pillow can't identify the image.
+        key, entry = self.entry(data)
+        self.store(key, entry)
+        return key
+
+    def entry(self, data):
+        # Key and entry of encoded image data, without storing it.
+        #
+        # Raises OSError if Pillow can't identify the image.
+        key = hashlib.sha1(data).hexdigest()
+        entry = self.images.get(key)
+        if entry is None:
+            with ImagePIL.open(BytesIO(data)) as image:
+                entry = (data, image.size, image.format)
+        return key, entry
+
+    def store(self, key, entry):
+        # Keep an entry read with entry().
+        with self.lock:
+            self.images.setdefault(key, entry)
+
+    def merge(self, table):
+        # Add the images of another table.
+        with self.lock:
+            for key, entry in list(table.images.items()):
+                self.images.setdefault(key, entry)
+
+    def data(self, key):
+        return self.images[key][0]
+
+    def size(self, key):
+        return self.images[key][1]
+
+    def format(self, key):
+        return self.images[key][2]
+
+
+class _ImageCache(_RunCache):
+    # Decoded images shared by every renderer in the process.
+    #
+    # Same policy as the text run cache, sized by pixel memory. Entries are
+    # keyed by content hash and pixel size, so an image drawn on every page
+    # is decoded and resampled once per size.
+    def _size(self, image):
+        return image.size[0] * image.size[1] * len(image.getbands())
+
+
+# Decoded images of all renderers in this process.
+_image_cache = _ImageCache(64 * 2**20, 16 * 2**20)
+
+
+def set_image_cache_limit(max_bytes):
+    """Limit the memory used by decoded images.
+
+    Images are decoded once per output size and reused, by every document
+    that draws them. Least recently used images are dropped when the limit
+    is reached, a limit of 0 disables the cache.
+
+    Args:
+        max_bytes: Memory for decoded images in bytes (Integer)
+    """
+    _image_cache.resize(max_bytes, max_bytes // 4)
+
+
+def _decoded_image(key, data, size=None):
+    # Image decoded to L, LA, RGB or RGBA, resampled to size when defined.
+    return _image_cache.get((key, size), lambda: _decode(data, size))
+
+
+def _decode(data, size):
+    image = ImagePIL.open(BytesIO(data))
+    if size:
+        # JPEG images are decoded at the smallest scale covering the size.
+        image.draft(image.mode, size)
+    if image.mode in ("LA", "RGBA") or "transparency" in image.info:
+        mode = "LA" if image.mode in ("L", "LA") else "RGBA"
+    elif image.mode in ("1", "L"):
+        mode = "L"
+    else:
+        mode = "RGB"
+    image = image.convert(mode)
+    if size and size != image.size:
+        image = image.resize(size, resample=ImagePIL.LANCZOS)
+    return image
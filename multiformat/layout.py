@@ -0,0 +1,96 @@
+# Copyright 2018 Adam Moller
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from .metrics import _font_face, _text_units
+
+
+def _wrap(text, font, size, width):
+    # Break text into lines no wider than width.
+    #
+    # Returns (words, widths, last) for each line, where last marks the end
+    # of a paragraph. Newlines start a new paragraph and words wider than a
+    # line are split between characters.
+    scale = size / 1000
+    space = _text_units(" ", font) * scale
+    lines = []
+    for paragraph in str(text).split("\n"):
+        words = []
+        widths = []
+        line_width = 0
+        for word in paragraph.split():
+            word_width = _text_units(word, font) * scale
+            if word_width > width:
+                pieces = _split_word(word, font, scale, width)
+            else:
+                pieces = [(word, word_width)]
+            for piece, piece_width in pieces:
+                if words and line_width + space + piece_width > width:
+                    lines.append((words, widths, False))
+                    words = []
+                    widths = []
+                    line_width = 0
+                if words:
+                    line_width += space
+                words.append(piece)
+                widths.append(piece_width)
+                line_width += piece_width
+        lines.append((words, widths, True))
+    return lines
+
+
+def _split_word(word, font, scale, width):
+    # Split a word into pieces that fit on a line, at least one character.
+    pieces = []
+    start = 0
+    while start < len(word):
+        end = start + 1
+        while (end < len(word)
+               and _text_units(word[start:end + 1], font) * scale <= width):
+            end += 1
+        piece = word[start:end]
+        pieces.append((piece, _text_units(piece, font) * scale))
+        start = end
+    return pieces
+
+
+def _place(line, font, size, width, alignment):
+    # Strings (text, x offset, alignment) that draw one wrapped line.
+    words, widths, last = line
+    if not words:
+        return []
+    if alignment == "justify":
+        if last or len(words) == 1:
+            alignment = "left"
+        else:
+            gap = (width - sum(widths)) / (len(words) - 1)
+            placed = []
+            offset = 0
+            for word, word_width in zip(words, widths):
+                placed.append((word, offset, "left"))
+                offset += word_width + gap
+            return placed
+    text = " ".join(words)
+    if alignment == "right":
+        return [(text, width, "right")]
+    elif alignment == "middle":
+        return [(text, width / 2, "middle")]
+    return [(text, 0, "left")]
+
+
+def _baseline_offset(font, size, line_height):
+    # Distance from the top of a line box to the baseline of its text.
+    face = _font_face(font)
+    ascent = face.ascent * size / 1000
+    text_height = (face.ascent - face.descent) * size / 1000
+    return (line_height - text_height) / 2 + ascent
@@ -0,0 +1,66 @@
+# Copyright 2018 Adam Moller
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from functools import lru_cache
+from reportlab.pdfbase.ttfonts import TTFontFace
+from .font_registry import _font_path
+
+# Parsed TrueType faces by font name, read once per process.
+_faces = {}
+_faces_lock = threading.Lock()
+
+
+def _font_face(font):
+    # Glyph widths, ascent and descent of a font in 1/1000 em.
+    face = _faces.get(font)
+    if face is None:
+        with _faces_lock:
+            face = _faces.get(font)
+            if face is None:
+                face = TTFontFace(_font_path(font))
+                _faces[font] = face
+    return face
+
+
+@lru_cache(maxsize=65536)
+def _text_units(text, font):
+    # Width of a text in 1/1000 em, cached for repeated words and strings.
+    face = _font_face(font)
+    widths = face.charWidths
+    default = face.defaultWidth
+    return sum(widths.get(ord(char), default) for char in text)
+
+
+def _string_width(string, font, size):
+    # Width of a string in document units, as measured for the PDF.
+    return _text_units(str(string), font) * size / 1000
+
+
+def _string_box(item):
+    # Box (x0, y0, x1, y1) covering the glyphs of a string element.
+    #
+    # The baseline is at y. The box reaches the descent below it and the
+    # full ascent plus descent above it, leaving room for accents.
+    face = _font_face(item["font"])
+    size = item["size"]
+    w = _string_width(item["string"], item["font"], size)
+    x = item["x"]
+    if item["alignment"] == "right":
+        x = x - w
+    elif item["alignment"] == "middle":
+        x = x - w / 2
+    y = item["y"]
+    return (x, y - (face.ascent - face.descent) * size / 1000, x + w,
+            y - face.descent * size / 1000)
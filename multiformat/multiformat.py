@@ -12,9 +12,30 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import importlib
+import math
+import numbers
 import os
+import threading
+import zlib
+from array import array
+from io import BytesIO
+from itertools import chain
 from .generate_pdf import _PDF
-from .generate_image import _Image
+from .generate_image import _Image, _validate_memory_limit
+from .renderer import get_backend, render, _draw_elements, _method_table
+from .colors import _ColorTable, _parse_hex
+from .font_registry import _fonts, font_names
+from .geometry import _bounds, _hit
+from .images import _ImageTable
+from .layout import _baseline_offset, _place, _wrap
+from .pages import _Page, _SharedPage
+from .parallel import _document_characters, _generate_pdf_parallel
+from .pdfmerge import _append_pages, _PDFFile
+from .shared import _SharedElements
+
+# The SVG backend is only used by name, importing it registers "svg".
+importlib.import_module(".generate_svg", __package__)
 
 
 class Document:
@@ -26,13 +47,15 @@ class Document:
     Attributes:
         document_size: A string defining the page size (a4, letter).
         layout: A string defining the page orientation (portrait, landscape).
+        render_stats: Element counts of the last output generated by the
+            calling thread.
     """
 
     def __init__(self, document_size="a4", layout="portrait"):
         """Inits the document with page size, layout, and dimensions.
 
-        Also looks for available fonts in the fonts directory,
-        defines metadata variables, and a list to store the document contents.
+        Also defines metadata variables and the pages that store the document
+        contents. Fonts come from the process-wide font registry.
         """
         self.document_size = document_size.lower()
         if self.document_size not in ["a4", "letter"]:
@@ -63,20 +86,35 @@ class Document:
                 },
             }
         }
-        # Create list of TrueType fonts in fonts directory.
-        self.supported_fonts = []
-        for file in os.listdir(
-                os.path.join(os.path.dirname(__file__), 'fonts')):
-            if file.endswith(".ttf"):
-                self.supported_fonts.append(os.path.splitext(file)[0])
         # Define document width and height based on page size and layout
         self._w = page_dimensions[self.document_size][self.layout]["w"]
         self._h = page_dimensions[self.document_size][self.layout]["h"]
         self.author = None
         self.title = None
         self.subject = None
-        self._document = []
-        self._pages = 1
+        self._pages = [_Page()]
+        # Guards the pages while elements are added from several threads.
+        self._lock = threading.RLock()
+        # Render stats of each thread, outputs can be generated concurrently.
+        self._stats = threading.local()
+        self._colors = _ColorTable()
+        self._images = _ImageTable()
+
+    @property
+    def render_stats(self):
+        """Get element counts of the last output generated by this thread.
+
+        Args:
+            None
+
+        Returns:
+            Dictionary of counts, empty before the first output.
+        """
+        return getattr(self._stats, "value", {})
+
+    @render_stats.setter
+    def render_stats(self, stats):
+        self._stats.value = stats
 
     @property
     def pages(self):
@@ -88,7 +126,21 @@ class Document:
         Returns:
             Pages in the document.
         """
-        return self._pages
+        return len(self._pages)
+
+    @property
+    def supported_fonts(self):
+        """Get the fonts documents can use.
+
+        Fonts are registered once per process, see register_font().
+
+        Args:
+            None
+
+        Returns:
+            Sorted list of font names.
+        """
+        return font_names()
 
     @property
     def w(self):
@@ -132,7 +184,7 @@ class Document:
         Returns:
             None
         """
-        self._document.append({
+        self._add({
             "type":
             "string",
             "string":
@@ -167,7 +219,7 @@ class Document:
         Returns:
             None
         """
-        self._document.append({
+        self._add({
             "type": "line",
             "x": self._validate_x_var(x),
             "y": self._validate_y_var(y),
@@ -209,7 +261,7 @@ class Document:
         if valid_border_width > 0:
             valid_border_color = self._validate_color(border_color)
 
-        self._document.append({
+        self._add({
             "type":
             "rectangle",
             "x":
@@ -257,7 +309,7 @@ class Document:
         valid_border_color = None
         if valid_border_width > 0:
             valid_border_color = self._validate_color(border_color)
-        self._document.append({
+        self._add({
             "type":
             "circle",
             "x":
@@ -274,6 +326,317 @@ class Document:
             valid_border_width,
         })
 
+    def draw_polyline(self, points, width, color):
+        """Add a line through a series of points to the document.
+
+        The points are stored in one compact array and drawn as a single
+        path with round joins, e.g. a data series of a line chart.
+
+        Args:
+            points: (x, y) points, or a flat sequence of x and y values, at
+                least two points (List)
+            width: Width of the line. (Integer)
+            color: Hexadecimal or RGB color code (String or 3-Tuple)
+
+        Returns:
+            None
+        """
+        self._add({
+            "type": "polyline",
+            "points": self._validate_points(points, 2),
+            "width": self._validate_size(width),
+            "color": self._validate_color(color),
+        })
+
+    def draw_polygon(self,
+                     points,
+                     fill_color=(0, 0, 0),
+                     border_color=(0, 0, 0),
+                     border_width=0):
+        """Add a closed shape to the document.
+
+        Add a polygon with fill and optional border, the last point is
+        joined to the first. Points are stored as for draw_polyline().
+
+        Args:
+            points: (x, y) points, or a flat sequence of x and y values, at
+                least three points (List)
+            fill_color: Hexadecimal or RGB color code (String or 3-Tuple)
+            border_color: Hexadecimal or RGB color code (String or 3-Tuple)
+            border_width: Width of the border. Set at 0 for no border (Integer)
+
+        Returns:
+            None
+        """
+        valid_border_width = self._validate_size(border_width)
+        if fill_color is None and (valid_border_width <= 0
+                                   or border_color is None):
+            _error("Polygon requires border or fill")
+        valid_border_color = None
+        if valid_border_width > 0:
+            valid_border_color = self._validate_color(border_color)
+        self._add({
+            "type":
+            "polygon",
+            "points":
+            self._validate_points(points, 3),
+            "fill_color":
+            self._validate_color(fill_color, required=False),
+            "border_color":
+            valid_border_color,
+            "border_width":
+            valid_border_width,
+        })
+
+    def draw_image(self, image, x, y, w, h=None):
+        """Add a raster image to the document.
+
+        Images are stored once per document by content, drawing the same
+        image again only adds a reference. Outputs decode each image once
+        per size, and PDFs embed it once however often it is drawn.
+
+        Args:
+            image: File name, file-like object or bytes of a PNG, JPEG, GIF
+                or other image Pillow can read
+            x: x-axis left of the image. (Integer)
+            y: y-axis top of the image. (Integer)
+            w: Width of the image. (Integer)
+            h: Height of the image, keeps the aspect ratio of the image when
+                not defined. (Integer)
+
+        Returns:
+            None
+        """
+        key, entry = self._validate_image(image)
+        if h is None:
+            image_w, image_h = entry[1]
+            h = int(round(self._validate_positive_integer_var(w) * image_h /
+                          image_w))
+        element = {
+            "type": "image",
+            "image": key,
+            "x": self._validate_x_var(x),
+            "y": self._validate_y_var(y),
+            "w": self._validate_w_var(x, w),
+            "h": self._validate_h_var(y, h),
+        }
+        # Only images of valid elements are kept and embedded.
+        self._images.store(key, entry)
+        self._add(element)
+
+    def draw_paragraph(self,
+                       string,
+                       x,
+                       y,
+                       w,
+                       font,
+                       size,
+                       color,
+                       alignment="left",
+                       line_height=None,
+                       top=None,
+                       bottom=None):
+        """Add wrapped text to the document.
+
+        Wraps the text to lines no wider than w using the metrics of the
+        font and adds a string for each line. Newlines start a new paragraph.
+        When the next line would fall below the bottom of the text area a
+        page break is inserted and the text continues at the top.
+
+        Args:
+            string: Text that will be drawn on the document
+            x: x-axis left of the text. (Integer)
+            y: y-axis bottom of the first line (Integer)
+            w: Width of the text. (Integer)
+            font: TTF file name without extension (String)
+            size: Font size in hundredths of a centimeter (Integer)
+            color: Hexadecimal or RGB color code (String or 3-Tuple)
+            alignment: "left", "right", "middle", "justify" (String)
+            line_height: Distance between lines, 1.2 times size by default
+                (Integer)
+            top: y-axis bottom of the first line on following pages,
+                y by default (Integer)
+            bottom: Lowest y-axis bottom of a line, the page height by
+                default (Integer)
+
+        Returns:
+            y-axis bottom of the line following the text.
+        """
+        x = self._validate_x_var(x)
+        y = self._validate_y_var(y)
+        w = self._validate_w_var(x, w)
+        font = self._validate_font(font)
+        size = self._validate_size(size)
+        color = self._validate_color(color)
+        alignment = str(alignment).lower()
+        if alignment != "justify":
+            alignment = self._validate_alignment(alignment)
+        if line_height is None:
+            line_height = int(size * 1.2)
+        line_height = self._validate_positive_integer_var(line_height)
+        top, bottom = self._validate_text_area(top, bottom, y)
+        # Lines and page breaks of a paragraph are added together.
+        with self._lock:
+            for line in _wrap(string, font, size, w):
+                if y > bottom:
+                    self.insert_page_break()
+                    y = top
+                for text, offset, line_alignment in _place(
+                        line, font, size, w, alignment):
+                    self._add({
+                        "type": "string",
+                        "string": text,
+                        "x": int(x + offset),
+                        "y": y,
+                        "alignment": line_alignment,
+                        "font": font,
+                        "size": size,
+                        "color": color,
+                        "baseline": True,
+                    })
+                y += line_height
+        return y
+
+    def draw_table(self,
+                   rows,
+                   x,
+                   y,
+                   column_widths,
+                   font,
+                   size,
+                   color,
+                   alignments=None,
+                   line_height=None,
+                   padding=10,
+                   header_rows=0,
+                   border_color=None,
+                   border_width=0,
+                   top=None,
+                   bottom=None):
+        """Add a table of wrapped text to the document.
+
+        Each cell is wrapped to its column and rows grow to fit their
+        tallest cell. Rows that don't fit above the bottom of the table area
+        continue on a new page, after the header rows are repeated.
+
+        Args:
+            rows: Rows of cell values (List of Lists)
+            x: x-axis left of the table. (Integer)
+            y: y-axis top of the table (Integer)
+            column_widths: Width of each column (List of Integers)
+            font: TTF file name without extension (String)
+            size: Font size in hundredths of a centimeter (Integer)
+            color: Hexadecimal or RGB color code (String or 3-Tuple)
+            alignments: "left", "right" or "middle" for each column (List)
+            line_height: Distance between lines, 1.2 times size by default
+                (Integer)
+            padding: Space between the cell edges and the text (Integer)
+            header_rows: Leading rows repeated on every page (Integer)
+            border_color: Color of the rule under each row, no rule if
+                None (String or 3-Tuple)
+            border_width: Width of the rule under each row (Integer)
+            top: y-axis top of the table on following pages, y by default
+                (Integer)
+            bottom: Lowest y-axis bottom of a row, the page height by default
+                (Integer)
+
+        Returns:
+            y-axis bottom of the table.
+        """
+        x = self._validate_x_var(x)
+        y = self._validate_y_var(y)
+        try:
+            column_widths = [int(width) for width in column_widths]
+        except:
+            _error("Invalid column widths: {}, Should be integers.".format(
+                column_widths))
+        self._validate_w_var(x, sum(column_widths))
+        font = self._validate_font(font)
+        size = self._validate_size(size)
+        color = self._validate_color(color)
+        if alignments is None:
+            alignments = ["left"] * len(column_widths)
+        alignments = [self._validate_alignment(align) for align in alignments]
+        if len(alignments) != len(column_widths):
+            _error("Table needs an alignment for each column.")
+        if line_height is None:
+            line_height = int(size * 1.2)
+        line_height = self._validate_positive_integer_var(line_height)
+        padding = self._validate_positive_integer_var(padding)
+        header_rows = self._validate_positive_integer_var(header_rows)
+        border_width = self._validate_size(border_width)
+        if border_color is not None and border_width > 0:
+            border_color = self._validate_color(border_color)
+        else:
+            border_color = None
+        top, bottom = self._validate_text_area(top, bottom, y)
+        baseline = _baseline_offset(font, size, line_height)
+        rows = [[str(cell) for cell in row] for row in rows]
+        wrapped = []
+        for row in rows:
+            if len(row) != len(column_widths):
+                _error("Table row has {} cells for {} columns.".format(
+                    len(row), len(column_widths)))
+            wrapped.append([
+                _wrap(cell, font, size, width - 2 * padding)
+                for cell, width in zip(row, column_widths)
+            ])
+        heights = [
+            2 * padding + line_height * max(len(lines) for lines in cells)
+            for cells in wrapped
+        ]
+        header_height = sum(heights[:header_rows])
+        # Rows and page breaks of a table are added together.
+        with self._lock:
+            number = 0
+            while number < len(wrapped):
+                cells = wrapped[number]
+                height = heights[number]
+                if y + height > bottom and y > top:
+                    self.insert_page_break()
+                    y = top
+                    # A row too tall for the page under the header is drawn
+                    # on the new page without it.
+                    if (number >= header_rows and
+                            top + header_height + height <= bottom):
+                        wrapped[number:number] = wrapped[:header_rows]
+                        heights[number:number] = heights[:header_rows]
+                    continue
+                cell_x = x
+                for lines, width, alignment in zip(cells, column_widths,
+                                                   alignments):
+                    line_y = y + padding + baseline
+                    for line in lines:
+                        for text, offset, line_alignment in _place(
+                                line, font, size, width - 2 * padding,
+                                alignment):
+                            self._add({
+                                "type": "string",
+                                "string": text,
+                                "x": int(cell_x + padding + offset),
+                                "y": int(line_y),
+                                "alignment": line_alignment,
+                                "font": font,
+                                "size": size,
+                                "color": color,
+                                "baseline": True,
+                            })
+                        line_y += line_height
+                    cell_x += width
+                y += height
+                if border_color:
+                    self._add({
+                        "type": "line",
+                        "x": x,
+                        "y": y,
+                        "x1": cell_x,
+                        "y1": y,
+                        "width": border_width,
+                        "color": border_color,
+                    })
+                number += 1
+        return y
+
     def insert_page_break(self):
         """Insert page break
 
@@ -286,12 +649,184 @@ class Document:
         Returns:
             None
         """
-        self._pages += 1
-        self._document.append({
-            "type": "page_break",
-        })
+        with self._lock:
+            self._pages.append(_Page())
+
+    def append(self, document):
+        """Append the pages of another document.
+
+        Pages are added after the last page of this document. They are
+        shared with the other document rather than copied, a shared page is
+        only copied when elements are added to it, so appending takes time
+        proportional to the number of pages.
+
+        Args:
+            document: Document with the same size and layout (Document)
+
+        Returns:
+            None
+        """
+        self._validate_document(document)
+        self._share_pages(document, document._pages)
+
+    def slice_pages(self, first, last=None):
+        """Create a document from a range of pages.
+
+        The new document shares the pages with this document, see append().
 
-    def generate_pdf(self, file_name, file_object=None):
+        Args:
+            first: First page of the range (Integer)
+            last: Last page of the range, defaults to the last page (Integer)
+
+        Returns:
+            Document with the pages first to last.
+        """
+        first = self._validate_page_number(first, self.pages)
+        if last is None:
+            last = self.pages
+        last = self._validate_page_number(last, self.pages)
+        if last < first:
+            _error("Invalid page range: {} - {}".format(first, last))
+        document = self._empty_copy()
+        document._share_pages(self, self._pages[first - 1:last])
+        return document
+
+    @classmethod
+    def concatenate(cls, documents):
+        """Create a document from the pages of several documents.
+
+        Size, layout and metadata are taken from the first document. Pages are
+        shared with the source documents, see append().
+
+        Args:
+            documents: Documents with the same size and layout (List)
+
+        Returns:
+            Document with the pages of all documents in order.
+        """
+        documents = list(documents)
+        if not documents:
+            _error("No documents to concatenate.")
+        for document in documents:
+            documents[0]._validate_document(document)
+        result = documents[0]._empty_copy()
+        for document in documents:
+            result._share_pages(document, document._pages)
+        return result
+
+    def share_elements(self):
+        """Copy the elements into shared memory for other processes.
+
+        Elements are stored as fixed-width records with a pool of strings,
+        so other processes can read them in place with attach_elements()
+        instead of receiving a pickled copy. Needs Python 3.8 or later.
+
+        Args:
+            None
+
+        Returns:
+            Shared element store with the name of the shared memory block.
+            Call its unlink() method, or use it as a context manager, once
+            every process is done with it.
+        """
+        return _SharedElements.create(self)
+
+    @classmethod
+    def attach_elements(cls, name):
+        """Open a document shared by share_elements().
+
+        Pages are read from shared memory when they are first used. Pages
+        that elements are added to are copied, the shared memory is never
+        changed.
+
+        Args:
+            name: Name of the shared element store (String)
+
+        Returns:
+            Document with the shared pages.
+        """
+        store = _SharedElements.attach(name)
+        document = cls(store.document_size, store.layout)
+        document.author = store.author
+        document.title = store.title
+        document.subject = store.subject
+        document._pages = [
+            _SharedPage(store, number) for number in range(store.pages)
+        ]
+        for data in store.image_data():
+            document._images.add(data)
+        return document
+
+    def _empty_copy(self):
+        # Document with the size, layout and metadata of this one, no pages.
+        document = type(self)(self.document_size, self.layout)
+        document.author = self.author
+        document.title = self.title
+        document.subject = self.subject
+        document._pages = []
+        return document
+
+    def _share_pages(self, document, pages):
+        # Reference pages of a document, with the colors and images its
+        # elements use.
+        with self._lock:
+            for color in list(document._colors.colors):
+                self._colors.intern(color)
+            self._images.merge(document._images)
+            self._pages.extend([page.share() for page in pages])
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_lock"]
+        del state["_stats"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+        self._stats = threading.local()
+
+    def generate(self,
+                 backend,
+                 file_name,
+                 page=None,
+                 file_object=None,
+                 cull=False,
+                 **options):
+        """Generate the document with a registered backend.
+
+        Generate the document with any backend added with register_backend().
+        Options are passed on to the backend when it is created.
+
+        Element counts are stored in render_stats of the calling thread:
+        elements on the generated pages, elements drawn and, when culling,
+        elements skipped for lying outside the page or under a later filled
+        rectangle.
+
+        Args:
+            backend: Name of a registered backend, e.g. "pdf" (String)
+            file_name: name of the output file, without extension. (String)
+            page: Page to generate on multiple page documents
+            file_object: optional file-like object to write to
+            cull: Skip elements that can't be seen in the output (Boolean)
+            options: backend specific keyword arguments
+
+        Returns:
+            The value returned by the backend, None for file backends.
+        """
+        if page:
+            page = self._validate_page_number(page, self.pages)
+        renderer = get_backend(backend).from_document(
+            self, file_name, file_object=file_object, **options)
+        stats = {}
+        self.render_stats = stats
+        return render(self, renderer, page=page, cull=cull, stats=stats)
+
+    def generate_pdf(self,
+                     file_name,
+                     file_object=None,
+                     workers=1,
+                     invariant=False):
         """Generate the document as a PDF.
 
         Generate the document as a PDF based on the elements defined with other
@@ -300,50 +835,115 @@ class Document:
         PDF will be saved to the current directory if a file-like object is
         not assigned to the file_object parameter.
 
+        With more than one worker, ranges of pages are rendered in separate
+        processes and merged into one PDF that embeds each font once.
+
+        Invariant PDFs use a fixed creation date and file identifier, the
+        same document always produces the same bytes.
+
         Args:
             file_name: name of the pdf file, without extension. (String)
             file_object: optional file-like object to write to
+            workers: Processes rendering the pages (Integer)
+            invariant: Make the output reproducible (Boolean)
         Returns:
             None
         """
-        pdf = _PDF(
-            file_name,
-            self.document_size,
-            self.layout,
-            file_object=file_object)
-        pdf.set_metadata(
-            author=self.author, title=self.title, subject=self.subject)
-        for item in self._document:
-            if item["type"] == "string":
-                pdf.draw_string(item["string"], item["x"], item["y"],
-                                item["alignment"], item["font"], item["size"],
-                                item["color"])
-            elif item["type"] == "line":
-                pdf.draw_line(item["x"], item["y"], item["x1"], item["y1"],
-                              item["width"], item["color"])
-            elif item["type"] == "rectangle":
-                pdf.draw_rectangle(item["x"], item["y"], item["w"], item["h"],
-                                   item["fill_color"], item["border_color"],
-                                   item["border_width"])
-            elif item["type"] == "circle":
-                pdf.draw_circle(item["x"], item["y"], item["radius"],
-                                item["fill_color"], item["border_color"],
-                                item["border_width"])
-            elif item["type"] == "page_break":
-                pdf.new_page()
-        pdf.save()
+        workers = self._validate_range(workers, 1, 1024, "workers")
+        invariant = bool(invariant)
+        if workers == 1 or self.pages == 1:
+            self.generate(
+                "pdf", file_name, file_object=file_object, invariant=invariant)
+            return
+        data, self.render_stats = _generate_pdf_parallel(
+            self, workers, invariant)
+        if file_object:
+            file_object.write(data)
+        else:
+            with open("{}.pdf".format(file_name), "wb") as pdf_file:
+                pdf_file.write(data)
+
+    def update_pdf(self, file_name, file_object=None, first_page=None):
+        """Append pages to a PDF generated earlier.
+
+        The pages from first_page to the end of the document are added to an
+        existing PDF generated by Multiformat as an incremental update, the
+        existing content is neither read nor written again. Fonts and images
+        used by the last existing page are reused by the new pages, fonts are
+        only embedded again when the new pages use new characters.
+
+        By default the pages after the existing ones are appended, so a
+        document that grows can be rebuilt and update the same file. Updates
+        contain no dates, the same pages always append the same bytes.
+
+        Args:
+            file_name: name of the pdf file, without extension. (String)
+            file_object: optional readable, writable and seekable file-like
+                object holding the PDF, e.g. a file opened with "r+b"
+            first_page: First page of the document to append (Integer)
+        Returns:
+            None
+        """
+        if file_object is None:
+            with open("{}.pdf".format(file_name), "r+b") as pdf_file:
+                self.update_pdf(file_name, pdf_file, first_page)
+            return
+        try:
+            existing = _PDFFile(file_object)
+            page_count = existing.page_count()
+            subsets = existing.font_subsets(existing.last_page())
+        except (AttributeError, IndexError, KeyError, ValueError,
+                zlib.error):
+            _error("PDF can't be updated: not generated by Multiformat.")
+        if first_page is None:
+            first_page = page_count + 1
+        first_page = self._validate_range(first_page, 1, self.pages + 1,
+                                          "first page")
+        stats = {}
+        self.render_stats = stats
+        if first_page > self.pages:
+            return
+        document = self.slice_pages(first_page, self.pages)
+        output = BytesIO()
+        pdf = _PDF.from_document(document, None, file_object=output)
+        pdf.continue_fonts(_document_characters(document), subsets)
+        render(document, pdf, stats=stats)
+        try:
+            update = _append_pages(existing, output.getvalue())
+        except (AttributeError, IndexError, KeyError, ValueError,
+                zlib.error):
+            _error("PDF can't be updated: not generated by Multiformat.")
+        file_object.seek(0, 2)
+        file_object.write(update)
 
     def generate_image(self,
                        file_name,
                        image_format,
                        size=None,
                        page=None,
-                       file_object=None):
+                       file_object=None,
+                       compress_level=None,
+                       quality=None,
+                       optimize=False,
+                       progressive=False,
+                       colors=None,
+                       color_mode="RGB",
+                       cull=False,
+                       dpi=None,
+                       memory_limit=None):
         """Generate the document as an image.
 
         Generate the document as an image based on the elements defined with
         other methods. Will create PNG, GIF, or JPEG images.
 
+        By default one pixel is drawn per document unit, a tenth of a
+        millimetre. With dpi the page is drawn directly at that resolution,
+        e.g. 72 for screens or 300 for print, instead of being drawn in full
+        and resized.
+
+        Estimated and measured peak pixel memory are stored in render_stats,
+        see set_memory_limit() in multiformat.generate_image.
+
         Image will be saved to the current directory if a file-like object is
         not assigned to the file_object parameter.
 
@@ -353,11 +953,25 @@ class Document:
             size: Width and height of image in pixels (Integer, Integer)
             page: Page to generate on multiple page documents
             file_object: optional file-like object to write to
+            compress_level: PNG zlib level, 0 (fastest) to 9 (Integer)
+            quality: JPEG quality, 1 to 95 (Integer)
+            optimize: Extra encoder pass for smaller files (Boolean)
+            progressive: Write a progressive JPEG (Boolean)
+            colors: Reduce PNG and GIF images to a palette of at most this
+                many colors with a fast octree quantizer (Integer)
+            color_mode: Canvas mode, RGB, L (grayscale), P (palette of the
+                document colors) or auto to pick the smallest mode that
+                renders the document colors exactly (String)
+            cull: Skip elements that are covered by later filled rectangles
+                or lie outside the page (Boolean)
+            dpi: Pixels per inch, stored in PNG and JPEG files. Can't be
+                combined with size (Number)
+            memory_limit: Largest pixel memory of a page in bytes, the
+                limit of set_memory_limit() by default (Integer)
 
         Returns:
             None
         """
-        image_count = 1
         if image_format.lower() == "png":
             image_format = "png"
         elif image_format.lower() == "gif":
@@ -367,49 +981,450 @@ class Document:
         else:
             _error(
                 "Image format not valid: Supported types are PNG, GIF, JPEG")
-        if size:
-            image = _Image(file_name, image_format, (self.w, self.h), size)
+        if compress_level is not None:
+            compress_level = self._validate_range(compress_level, 0, 9,
+                                                  "compress level")
+        if quality is not None:
+            quality = self._validate_range(quality, 1, 95, "quality")
+        if colors is not None:
+            if image_format == "jpeg":
+                _error("Palette colors are not supported for JPEG images.")
+            colors = self._validate_range(colors, 2, 256, "colors")
+        if str(color_mode).lower() == "auto":
+            color_mode = "auto"
+        elif str(color_mode).upper() in ["RGB", "L", "P"]:
+            color_mode = str(color_mode).upper()
         else:
-            image = _Image(file_name, image_format, (self.w, self.h))
-        # Only print selected page if page paramter defined.
-        print_page = True
-        if page:
-            page = self._validate_page_number(page, self.pages)
-        generated_page = 1
-        for item in self._document:
-            # Only print selected page if page paramter defined.
+            _error("Color mode not valid: Supported modes are RGB, L, P, auto")
+        if color_mode == "P" and image_format == "jpeg":
+            _error("Palette color mode is not supported for JPEG images.")
+        # A file object holds a single image, default to the first page.
+        if file_object and not page:
+            page = 1
+        self.generate(
+            "image",
+            file_name,
+            page=page,
+            file_object=file_object,
+            image_format=image_format,
+            size=size,
+            compress_level=compress_level,
+            quality=quality,
+            optimize=optimize,
+            progressive=progressive,
+            colors=colors,
+            color_mode=color_mode,
+            cull=cull,
+            dpi=self._validate_dpi(dpi, size),
+            memory_limit=_validate_memory_limit(memory_limit))
+
+    def generate_previews(self,
+                          sizes,
+                          page=1,
+                          image_format="png",
+                          compress_level=None,
+                          quality=None,
+                          optimize=False,
+                          progressive=False,
+                          cull=False,
+                          memory_limit=None):
+        """Generate a page as images of several sizes.
+
+        The page is rendered once at the largest size, each smaller size is
+        resampled from the next larger image, e.g. a blurry placeholder and
+        a sharp preview from one call. Sizes are fitted to the page like the
+        size of generate_image().
+
+        Args:
+            sizes: Widths and heights of the images in pixels
+                (List of (Integer, Integer))
+            page: Page to generate (Integer)
+            image_format: JPEG, PNG (String)
+            compress_level: PNG zlib level, 0 (fastest) to 9 (Integer)
+            quality: JPEG quality, 1 to 95 (Integer)
+            optimize: Extra encoder pass for smaller files (Boolean)
+            progressive: Write a progressive JPEG (Boolean)
+            cull: Skip elements that are covered by later filled rectangles
+                or lie outside the page (Boolean)
+            memory_limit: Largest pixel memory of a page in bytes, the
+                limit of set_memory_limit() by default (Integer)
+
+        Returns:
+            List of encoded images, bytes, in the order of sizes.
+        """
+        image_format = str(image_format).lower()
+        if image_format not in ["png", "jpeg"]:
+            _error("Preview format not valid: Supported types are PNG, JPEG")
+        try:
+            sizes = [(self._validate_range(w, 1, 65536, "width"),
+                      self._validate_range(h, 1, 65536, "height"))
+                     for w, h in sizes]
+        except (TypeError, ValueError):
+            _error("Invalid sizes: {}, Sizes should be (width, height) "
+                   "pairs.".format(sizes))
+        if not sizes:
+            _error("Invalid sizes: At least one size is required.")
+        if compress_level is not None:
+            compress_level = self._validate_range(compress_level, 0, 9,
+                                                  "compress level")
+        if quality is not None:
+            quality = self._validate_range(quality, 1, 95, "quality")
+        return self.generate(
+            "previews",
+            None,
+            page=self._validate_page_number(page, self.pages),
+            cull=cull,
+            sizes=sizes,
+            image_format=image_format,
+            compress_level=compress_level,
+            quality=quality,
+            optimize=optimize,
+            progressive=progressive,
+            memory_limit=_validate_memory_limit(memory_limit))
+
+    def generate_animation(self,
+                           file_name,
+                           image_format="gif",
+                           size=None,
+                           file_object=None,
+                           duration=1000,
+                           loop=0,
+                           colors=None,
+                           quality=None,
+                           cull=False,
+                           dpi=None,
+                           memory_limit=None):
+        """Generate the pages of the document as frames of one image.
+
+        Every page is rendered once and becomes a frame of an animated GIF
+        or WebP, or a page of a multi-page TIFF, written in a single call.
+        GIF frames share one palette of at most colors colors, made of the
+        document colors and the most common other colors of the first page.
+
+        Image will be saved to the current directory if a file-like object is
+        not assigned to the file_object parameter.
+
+        Args:
+            file_name: name of the image file, without extension. (String)
+            image_format: GIF, TIFF, WEBP (String)
+            size: Width and height of each frame in pixels (Integer, Integer)
+            file_object: optional file-like object to write to
+            duration: Milliseconds each GIF or WebP frame is shown (Integer)
+            loop: Times a GIF or WebP animation repeats, 0 forever (Integer)
+            colors: Size of the shared GIF palette, or a shared palette for
+                TIFF pages, 2 to 256 (Integer)
+            quality: Lossy WebP quality, 1 to 100. WebP frames are lossless
+                by default (Integer)
+            cull: Skip elements that are covered by later filled rectangles
+                or lie outside the page (Boolean)
+            dpi: Pixels per inch to draw the pages at, see generate_image()
+                (Number)
+            memory_limit: Largest pixel memory of a page in bytes, the
+                limit of set_memory_limit() by default (Integer)
+
+        Returns:
+            None
+        """
+        image_format = str(image_format).lower()
+        if image_format not in ["gif", "tiff", "webp"]:
+            _error("Animation format not valid: Supported types are GIF, "
+                   "TIFF, WEBP")
+        duration = self._validate_range(duration, 1, 600000, "duration")
+        loop = self._validate_range(loop, 0, 65535, "loop")
+        if colors is not None:
+            if image_format == "webp":
+                _error("Palette colors are not supported for WebP images.")
+            colors = self._validate_range(colors, 2, 256, "colors")
+        if quality is not None:
+            if image_format != "webp":
+                _error("Quality is only supported for WebP animations.")
+            quality = self._validate_range(quality, 1, 100, "quality")
+        self.generate(
+            "animation",
+            file_name,
+            file_object=file_object,
+            cull=cull,
+            image_format=image_format,
+            size=size,
+            duration=duration,
+            loop=loop,
+            colors=colors,
+            quality=quality,
+            dpi=self._validate_dpi(dpi, size),
+            memory_limit=_validate_memory_limit(memory_limit))
+
+    def generate_raster(self,
+                        mode="RGB",
+                        size=None,
+                        page=None,
+                        cull=False,
+                        dpi=None,
+                        memory_limit=None):
+        """Generate the document as raw pixel buffers.
+
+        Render the document without encoding it to an image format. Each page
+        is returned as a read-only memoryview of 8-bit pixels shaped
+        (height, width, channels), which supports the buffer protocol, e.g.
+        numpy.asarray(buffer) wraps it without copying.
+
+        Args:
+            mode: Pixel layout, RGB or RGBA (String)
+            size: Width and height of image in pixels (Integer, Integer)
+            page: Page to generate on multiple page documents
+            cull: Skip elements that are covered by later filled rectangles
+                or lie outside the page (Boolean)
+            dpi: Pixels per inch to draw the pages at, see generate_image()
+                (Number)
+            memory_limit: Largest pixel memory of a page in bytes, the
+                limit of set_memory_limit() by default (Integer)
+
+        Returns:
+            List of memoryview objects, one per generated page.
+        """
+        if str(mode).upper() not in ["RGB", "RGBA"]:
+            _error("Raster mode not valid: Supported modes are RGB, RGBA")
+        return self.generate(
+            "raster",
+            None,
+            page=page,
+            cull=cull,
+            mode=str(mode).upper(),
+            size=size,
+            dpi=self._validate_dpi(dpi, size),
+            memory_limit=_validate_memory_limit(memory_limit))
+
+    def generate_svg(self,
+                     file_name,
+                     page=None,
+                     file_object=None,
+                     embed_fonts=False):
+        """Generate the document as an SVG image.
+
+        Generate the document as a vector SVG image based on the elements
+        defined with other methods. Elements are written to the output as
+        they are drawn, each page becomes a new image.
+
+        Image will be saved to the current directory if a file-like object is
+        not assigned to the file_object parameter.
+
+        Args:
+            file_name: name of the image file, without extension. (String)
+            page: Page to generate on multiple page documents
+            file_object: optional file-like object to write to
+            embed_fonts: Embed the TrueType fonts used on each page, text
+                falls back to a sans-serif font if not embedded (Boolean)
+
+        Returns:
+            None
+        """
+        # A file object holds a single image, default to the first page.
+        if file_object and not page:
+            page = 1
+        self.generate(
+            "svg",
+            file_name,
+            page=page,
+            file_object=file_object,
+            embed_fonts=embed_fonts)
+
+    def render_region(self, page, bbox, scale=1, mode="RGB"):
+        """Render part of a page as an image.
+
+        Only the elements that intersect the region are drawn, found with a
+        spatial index over the page, and they are drawn directly at the
+        requested scale.
+
+        Args:
+            page: Page to render (Integer)
+            bbox: Region of the page, (x0, y0, x1, y1) in document units
+            scale: Pixels per document unit (Number)
+            mode: Pixel layout, RGB or RGBA (String)
+
+        Returns:
+            Pillow Image of the region.
+        """
+        page = self._validate_page_number(page, self.pages)
+        bbox = self._validate_bbox(bbox)
+        scale = self._validate_scale(scale)
+        if str(mode).upper() not in ["RGB", "RGBA"]:
+            _error("Image mode not valid: Supported modes are RGB, RGBA")
+        return self._render_region(
+            page, bbox, scale, mode,
+            (math.floor(bbox[0] * scale), math.floor(bbox[1] * scale)))
+
+    def _render_region(self, page, bbox, scale, mode, pixel_origin):
+        # Draw the elements of a page region on a canvas whose top left
+        # corner is pixel_origin of the whole page drawn at scale.
+        image = _Image(
+            None,
+            None, (bbox[2] - bbox[0], bbox[3] - bbox[1]),
+            mode=str(mode).upper(),
+            scale=scale,
+            pixel_origin=pixel_origin,
+            images=self._images)
+        with self._lock:
+            index = self._pages[page - 1].index
+            elements = self._pages[page - 1].elements
+            visible = [elements[key] for key in index.query(bbox)]
+            total = len(elements)
+        stats = {
+            "elements": 0,
+            "drawn": 0,
+            "outside": total - len(visible),
+            "occluded": 0
+        }
+        _draw_elements(_method_table(image), visible, bbox, True, stats)
+        self.render_stats = stats
+        return image.image
+
+    def render_tile(self, page, level, column, row, tile_size=256,
+                    mode="RGB"):
+        """Render one tile of a page's tile pyramid.
+
+        At level 0 the whole page fits in one tile, each level doubles the
+        scale. Tiles on the right and bottom edges are cropped to the page.
+
+        Args:
+            page: Page to render (Integer)
+            level: Zoom level, 0 or greater (Integer)
+            column: Tile column from the left (Integer)
+            row: Tile row from the top (Integer)
+            tile_size: Width and height of a tile in pixels (Integer)
+            mode: Pixel layout, RGB or RGBA (String)
+
+        Returns:
+            Pillow Image of the tile.
+        """
+        level = self._validate_positive_integer_var(level)
+        column = self._validate_positive_integer_var(column)
+        row = self._validate_positive_integer_var(row)
+        tile_size = self._validate_range(tile_size, 1, 65536, "tile size")
+        scale = self._tile_scale(level, tile_size)
+        extent = tile_size / scale
+        bbox = (column * extent, row * extent,
+                min((column + 1) * extent, self.w),
+                min((row + 1) * extent, self.h))
+        if bbox[0] >= self.w or bbox[1] >= self.h:
+            _error("Tile not within document boundaries: {}, {}".format(
+                column, row))
+        page = self._validate_page_number(page, self.pages)
+        if str(mode).upper() not in ["RGB", "RGBA"]:
+            _error("Image mode not valid: Supported modes are RGB, RGBA")
+        # Tiles start at exact pixels of the level, the document units of
+        # their corners may not.
+        return self._render_region(page, bbox, scale, mode,
+                                   (column * tile_size, row * tile_size))
+
+    def generate_tiles(self, page=1, tile_size=256, levels=None, mode="RGB"):
+        """Generate the tile pyramid of a page.
+
+        Yields every tile of the requested levels. By default levels run from
+        0 up to the first level drawn at full resolution or more.
+
+        Args:
+            page: Page to render (Integer)
+            tile_size: Width and height of a tile in pixels (Integer)
+            levels: Number of levels to generate (Integer)
+            mode: Pixel layout, RGB or RGBA (String)
+
+        Returns:
+            Generator of (level, column, row, image) tuples.
+        """
+        tile_size = self._validate_range(tile_size, 1, 65536, "tile size")
+        if levels is None:
+            levels = max(0, math.ceil(math.log2(
+                max(self.w, self.h) / tile_size))) + 1
+        for level in range(self._validate_positive_integer_var(levels)):
+            extent = tile_size / self._tile_scale(level, tile_size)
+            for row in range(math.ceil(self.h / extent)):
+                for column in range(math.ceil(self.w / extent)):
+                    yield (level, column, row,
+                           self.render_tile(page, level, column, row,
+                                            tile_size, mode))
+
+    def _tile_scale(self, level, tile_size):
+        # Pixels per document unit of a tile pyramid level.
+        return tile_size * 2**level / max(self.w, self.h)
+
+    def elements_at(self, page, x, y):
+        """Find the elements drawn over a point.
+
+        Uses the spatial index of the page and the shape of each element,
+        e.g. only the border of a rectangle without fill.
+
+        Args:
+            page: Page to search (Integer)
+            x: x-axis position. (Number)
+            y: y-axis position. (Number)
+
+        Returns:
+            List of element dictionaries in drawing order.
+        """
+        page = self._validate_page_number(page, self.pages)
+        try:
+            x = float(x)
+            y = float(y)
+        except:
+            _error("Invalid point: {}, {}, Should be numbers.".format(x, y))
+        with self._lock:
+            index = self._pages[page - 1].index
+            elements = self._pages[page - 1].elements
+            return [
+                dict(elements[key]) for key in index.query((x, y, x, y))
+                if _hit(elements[key], x, y)
+            ]
+
+    def elements_in(self, page, bbox):
+        """Find the elements that intersect a region.
+
+        Args:
+            page: Page to search (Integer)
+            bbox: Region of the page, (x0, y0, x1, y1) in document units
+
+        Returns:
+            List of element dictionaries in drawing order.
+        """
+        page = self._validate_page_number(page, self.pages)
+        bbox = self._validate_bbox(bbox)
+        with self._lock:
+            index = self._pages[page - 1].index
+            elements = self._pages[page - 1].elements
+            return [dict(elements[key]) for key in index.query(bbox)]
+
+    @property
+    def _document(self):
+        # All elements in drawing order, with a page break between pages.
+        items = []
+        for number, page in enumerate(self._page_elements()):
+            if number:
+                items.append({"type": "page_break"})
+            items.extend(page)
+        return items
+
+    def _page_elements(self, page=None):
+        # Copy of the element lists of all pages, or one page, so they can be
+        # drawn while other threads add elements.
+        with self._lock:
             if page:
-                if generated_page == page:
-                    print_page = True
-                else:
-                    print_page = False
-            if item["type"] == "string" and print_page:
-                image.draw_string(item["string"], item["x"], item["y"],
-                                  item["alignment"], item["font"],
-                                  item["size"], item["color"])
-            elif item["type"] == "line" and print_page:
-                image.draw_line(item["x"], item["y"], item["x1"], item["y1"],
-                                item["width"], item["color"])
-            elif item["type"] == "rectangle" and print_page:
-                image.draw_rectangle(item["x"], item["y"], item["w"],
-                                     item["h"], item["fill_color"],
-                                     item["border_color"],
-                                     item["border_width"])
-            elif item["type"] == "circle":
-                image.draw_circle(item["x"], item["y"], item["radius"],
-                                  item["fill_color"], item["border_color"],
-                                  item["border_width"])
-            elif item["type"] == "page_break":
-                # break if assigning to single file object
-                if file_object:
-                    break
-                if not page:
-                    image.save()
-                    image_count = image_count + 1
-                    image = _Image("{}_{}".format(file_name, image_count),
-                                   image_format, (self.w, self.h), size)
-                generated_page += 1
-        image.save(file_object)
+                return [list(self._pages[page - 1].elements)]
+            return [list(contents.elements) for contents in self._pages]
+
+    def _add(self, element):
+        # Append an element to the last page and its spatial index.
+        bounds = _bounds(element)
+        with self._lock:
+            page = self._pages[-1]
+            if page.shared:
+                page = self._pages[-1] = page.copy()
+            page.add(element, bounds)
+
+    def _validate_document(self, document):
+        # Confirm a document can share pages with this one.
+        if not isinstance(document, Document):
+            _error("Invalid document: {}".format(document))
+        if (document.w, document.h) != (self.w, self.h):
+            _error("Document size and layout should match: {} {}".format(
+                document.document_size, document.layout))
 
     def _validate_x_var(self, x):
         # Confirm x-coordinate is an integer and within document plane.
@@ -472,6 +1487,72 @@ class Document:
         else:
             _error("Value should be >= zero: {}".format(value))
 
+    def _validate_range(self, value, minimum, maximum, name):
+        # Confirm value is an integer within an inclusive range.
+        try:
+            value = int(value)
+        except:
+            _error("Invalid {}: {}, Value should be integer.".format(
+                name, value))
+        if value >= minimum and value <= maximum:
+            return value
+        else:
+            _error("Invalid {}: {}, Value should be {} to {}.".format(
+                name, value, minimum, maximum))
+
+    def _validate_text_area(self, top, bottom, y):
+        # Confirm the top and bottom of flowing text are on the page.
+        if top is None:
+            top = y
+        top = self._validate_y_var(top)
+        if bottom is None:
+            bottom = self.h
+        bottom = self._validate_y_var(bottom)
+        if top <= bottom:
+            return top, bottom
+        else:
+            _error("Text area top should be above the bottom: {}, {}".format(
+                top, bottom))
+
+    def _validate_bbox(self, bbox):
+        # Confirm bbox is (x0, y0, x1, y1) with a positive width and height.
+        try:
+            x0, y0, x1, y1 = [float(value) for value in bbox]
+        except:
+            _error("Invalid bounding box: {}, Should be (x0, y0, x1, y1)."
+                   .format(bbox))
+        if x1 > x0 and y1 > y0:
+            return (x0, y0, x1, y1)
+        else:
+            _error("Bounding box should have a positive width and height: {}"
+                   .format(bbox))
+
+    def _validate_scale(self, scale):
+        # Confirm scale is a number > 0.
+        try:
+            scale = float(scale)
+        except:
+            _error("Invalid scale: {}, Scale should be a number.".format(scale))
+        if scale > 0:
+            return scale
+        else:
+            _error("Invalid scale: {}, Scale should be > 0.".format(scale))
+
+    def _validate_dpi(self, dpi, size):
+        # Confirm dpi is a number from 1 to 2400 and no size is requested.
+        if dpi is None:
+            return None
+        if size:
+            _error("Image size and dpi can't both be defined.")
+        try:
+            dpi = float(dpi)
+        except:
+            _error("Invalid dpi: {}, Dpi should be a number.".format(dpi))
+        if dpi >= 1 and dpi <= 2400:
+            return int(dpi) if dpi.is_integer() else dpi
+        else:
+            _error("Invalid dpi: {}, Value should be 1 to 2400.".format(dpi))
+
     def _validate_alignment(self, alignment):
         # Confirm alignement is string and left, right, or middle.
         valid_alignments = ["left", "right", "middle"]
@@ -483,15 +1564,11 @@ class Document:
 
     def _validate_font(self, font):
         # Confirm font name is valid.
-        font = str(font)
-        try:
-            index = [x.lower() for x in self.supported_fonts].index(
-                font.lower())
-            return self.supported_fonts[index]
-        except:
-            _error(
-                "Font named ({}) not valid. Custom fonts need to be loaded.".
-                format(font))
+        name = _fonts.name(font)
+        if name is None:
+            _error("Font named ({}) not valid. Custom fonts need to be "
+                   "registered with register_font().".format(font))
+        return name
 
     def _validate_size(self, size):
         # Confirm size is an integer >= 0.
@@ -517,6 +1594,52 @@ class Document:
                 "Invalid page number. Page number should within range of pages."
             )
 
+    def _validate_points(self, points, minimum):
+        # Convert points to a flat array of coordinates within the document.
+        try:
+            if not isinstance(points, array):
+                points = list(points)
+            if not points or isinstance(points[0], numbers.Real):
+                # A flat sequence of x and y values.
+                values = array("d", points)
+                pairs = len(values) // 2
+            else:
+                values = array("d", chain.from_iterable(points))
+                pairs = len(points)
+        except:
+            _error("Invalid points, Should be (x, y) pairs of numbers.")
+        if len(values) != pairs * 2 or pairs < minimum:
+            _error("Invalid points, Should be at least {} (x, y) pairs."
+                   .format(minimum))
+        if not all(map(math.isfinite, values)):
+            _error("Invalid points, Coordinates should be finite numbers.")
+        xs = values[0::2]
+        ys = values[1::2]
+        if min(xs) < 0 or max(xs) > self.w:
+            _error("Points not within document boundaries: x {} to {}".format(
+                min(xs), max(xs)))
+        if min(ys) < 0 or max(ys) > self.h:
+            _error("Points not within document boundaries: y {} to {}".format(
+                min(ys), max(ys)))
+        return values
+
+    def _validate_image(self, image):
+        # Read an image source, returns its key and image table entry.
+        try:
+            if isinstance(image, (bytes, bytearray)):
+                data = bytes(image)
+            elif hasattr(image, "read"):
+                data = image.read()
+            elif isinstance(image, (str, os.PathLike)):
+                with open(image, "rb") as image_file:
+                    data = image_file.read()
+            else:
+                raise TypeError(image)
+            return self._images.entry(data)
+        except (OSError, TypeError, ValueError):
+            _error("Invalid image: {}".format(
+                image if isinstance(image, str) else type(image).__name__))
+
     def _validate_string(self, string):
         # Confirm strings are strings.
         return str(string)
@@ -524,7 +1647,15 @@ class Document:
     def _validate_color(self, color, required=True):
         # Convert hexadecimal color if not 3 tuple.
         if isinstance(color, str):
-            return self._hex_to_rgb(color)
+            return self._colors.intern(self._hex_to_rgb(color))
+        # Colors used before are returned from the table without validation.
+        if type(color) is tuple:
+            try:
+                interned = self._colors.lookup(color)
+            except TypeError:
+                interned = None
+            if interned:
+                return interned
         # Confirm RGB colors are tuples of 3 integers 0 to 255.
         if not color and required is False:
             return None
@@ -540,20 +1671,11 @@ class Document:
             _error("Invalid RGB color code green value: {}".format(g))
         if b < 0 or b > 255:
             _error("Invalid RGB color code blue value: {}".format(b))
-        return (r, g, b)
+        return self._colors.intern((r, g, b))
 
     def _hex_to_rgb(self, color):
         # Convert #RGB, RGB, #RRGGBB, RRGGBB to rgb() colors.
-        color = color.strip().strip("#")
-        length = len(color)
-        f = int(length / 3)
-        if length == 3 or length == 6:
-            return tuple(
-                int(color[i:i + f] * int(2 / f), 16)
-                for i in range(0, length, f))
-        else:
-            _error("Color '{}' is not in #RRGGBB or #RGB format".format(color),
-                   "ValueError")
+        return _parse_hex(color)
 
 
 def _error(statement, error_type=""):
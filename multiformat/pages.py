@@ -0,0 +1,87 @@
+# Copyright 2018 Adam Moller
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from .geometry import _bounds
+from .spatial import _GridIndex
+
+
+class _Page:
+    # Elements of one page in drawing order and their spatial index.
+    #
+    # Index keys are positions in the element list. Documents composed from
+    # other documents reference the same pages, a shared page is copied by
+    # the document that changes it so the others keep their content.
+    def __init__(self):
+        self.elements = []
+        self.index = _GridIndex()
+        self.shared = False
+
+    def __len__(self):
+        return len(self.elements)
+
+    def add(self, element, bounds):
+        # Append an element with its bounding box.
+        self.index.insert(len(self.elements), bounds)
+        self.elements.append(element)
+
+    def share(self):
+        # Mark the page as referenced by more than one document.
+        self.shared = True
+        return self
+
+    def copy(self):
+        # Unshared page with the same elements, which are never modified.
+        page = _Page()
+        page.elements = list(self.elements)
+        page.index = self.index.copy()
+        return page
+
+
+class _SharedPage:
+    # Page of an element store in shared memory.
+    #
+    # Elements are decoded and indexed when the page is first used. The page
+    # always counts as shared, a document copies it before adding elements.
+    shared = True
+
+    def __init__(self, store, number):
+        self.store = store
+        self.number = number
+        self._elements = None
+        self._index = None
+
+    def __len__(self):
+        first, last = self.store.page_range(self.number)
+        return last - first
+
+    @property
+    def elements(self):
+        if self._elements is None:
+            self._elements = self.store.page_elements(self.number)
+        return self._elements
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = self.copy().index
+        return self._index
+
+    def share(self):
+        return self
+
+    def copy(self):
+        page = _Page()
+        for element in self.elements:
+            page.add(element, _bounds(element))
+        return page
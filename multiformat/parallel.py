@@ -0,0 +1,119 @@
+# Copyright 2018 Adam Moller
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+import multiprocessing
+from io import BytesIO
+from .font_registry import _fonts, font_names
+from .generate_pdf import _PDF
+from .pdfmerge import _merge_pdfs
+from .renderer import render
+
+# Document and font characters of the worker process.
+_worker_state = {}
+
+
+def _process_context():
+    # Start method set by the application, otherwise the platform default.
+    #
+    # A forked child of a process with other threads can deadlock on locks
+    # those threads held, so forkserver replaces a default of fork where
+    # it's available.
+    method = multiprocessing.get_start_method(allow_none=True)
+    if method is None:
+        methods = multiprocessing.get_all_start_methods()
+        method = methods[0]
+        if method == "fork" and "forkserver" in methods:
+            method = "forkserver"
+    return multiprocessing.get_context(method)
+
+
+def _start_worker(document, characters, fonts):
+    # Fonts registered after the process started aren't known to spawned
+    # workers.
+    for name, path in fonts.items():
+        _fonts.add(path, name)
+    if isinstance(document, str):
+        # Imported here, the document module imports this one.
+        from .multiformat import Document
+        document = Document.attach_elements(document)
+    _worker_state["document"] = document
+    _worker_state["characters"] = characters
+
+
+def _page_chunks(pages, chunks):
+    # Split pages into up to chunks contiguous (first, last) ranges.
+    size = math.ceil(pages / chunks)
+    return [(first, min(first + size - 1, pages))
+            for first in range(1, pages + 1, size)]
+
+
+def _document_characters(document):
+    # Characters drawn in each font of a document.
+    characters = {}
+    for page in document._page_elements():
+        for item in page:
+            if item["type"] == "string":
+                characters.setdefault(item["font"], set()).update(
+                    str(item["string"]))
+    return characters
+
+
+def _render_pdf_pages(first, last, invariant=False):
+    # PDF of a page range of the worker's document and its element counts.
+    document = _worker_state["document"].slice_pages(first, last)
+    output = BytesIO()
+    pdf = _PDF.from_document(
+        document, None, file_object=output, invariant=invariant)
+    pdf.preload_fonts(_worker_state["characters"])
+    stats = {}
+    render(document, pdf, stats=stats)
+    return output.getvalue(), stats
+
+
+def _generate_pdf_parallel(document, workers, invariant=False):
+    # Render a document as PDF in page ranges on worker processes.
+    #
+    # Every range embeds the same font subsets, so the merged file holds
+    # each font once. Returns the PDF data and the summed element counts.
+    chunks = _page_chunks(document.pages, workers * 2)
+    context = _process_context()
+    store = None
+    source = document
+    if context.get_start_method() != "fork":
+        # Forked workers inherit the document, others read the elements in
+        # place instead of unpickling a copy where shared memory is
+        # supported.
+        try:
+            store = document.share_elements()
+            source = store.name
+        except RuntimeError:
+            pass
+    try:
+        with context.Pool(workers, _start_worker,
+                          (source, _document_characters(document),
+                           {name: _fonts.path(name)
+                            for name in font_names()})) as pool:
+            results = pool.starmap(
+                _render_pdf_pages,
+                [(first, last, invariant) for first, last in chunks])
+    finally:
+        if store:
+            store.close()
+            store.unlink()
+    stats = {}
+    for _, chunk_stats in results:
+        for key, value in chunk_stats.items():
+            stats[key] = stats.get(key, 0) + value
+    return _merge_pdfs([data for data, _ in results]), stats
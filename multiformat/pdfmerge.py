@@ -0,0 +1,403 @@
+# Copyright 2018 Adam Moller
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import re
+import zlib
+from io import BytesIO
+
+# Indirect reference, optionally as the parent of a page.
+_REFERENCE = re.compile(rb"(/Parent\s+)?(?<![\d.])(\d+) 0 R")
+_OBJECT_START = re.compile(rb"\d+ 0 obj\r?\n")
+_STREAM = re.compile(rb">>\s*stream\r?\n")
+_STREAM_LENGTH = re.compile(rb"/Length\s+(\d+)")
+_FONT_NAME = re.compile(rb"/Name\s*/F\d+(?:\+\d+)?\s*")
+_SUBSET_TAG = re.compile(rb"/BaseFont\s*/([A-K]{6})\+([^\s/>]+)")
+_FONT_TAG = re.compile(rb"(/(?:BaseFont|FontName)\s*/)([A-K]{6})\+")
+_UNICODE = re.compile(rb"<([0-9A-F]{2})> <([0-9A-F]{4})>")
+
+# Object numbers of the merged catalog, page tree and information.
+_CATALOG = 1
+_PAGES = 2
+_INFO = 3
+
+# Bytes read at a time when looking for the end of an object or section.
+_CHUNK = 4096
+
+# Subset tags are six digits written with the letters reportlab uses. The
+# last three are the subset number, the first three count the updates that
+# embedded the subset again.
+_TAG_DIGITS = bytes.maketrans(b"ABCDEFGIJK", b"0123456789")
+_TAG_LETTERS = bytes.maketrans(b"0123456789", b"ABCDEFGIJK")
+_SUBSETS = 1000
+
+
+class _Objects(dict):
+    # Object bodies by number, read from the file when first used.
+    def __init__(self, pdf):
+        dict.__init__(self)
+        self.pdf = pdf
+
+    def __missing__(self, number):
+        body = self.pdf.read_object(number)
+        self[number] = body
+        return body
+
+
+class _PDFFile:
+    # Objects of a PDF written by reportlab or updated by this module.
+    #
+    # Objects are located through the cross-reference tables, the latest
+    # first and earlier ones through /Prev, and are only read when used, so
+    # a large file can be extended without reading all of it.
+    def __init__(self, source):
+        self.file = BytesIO(source) if isinstance(source, bytes) else source
+        self.file.seek(0, 2)
+        self.size = self.file.tell()
+        tail = self._read(max(0, self.size - 1024), 1024)
+        self.startxref = int(tail[tail.rindex(b"startxref") + 9:].split()[0])
+        self.sections = {}
+        self.trailer = self._section(self.startxref)[1]
+        self.offsets = {}
+        self.previous = self.startxref
+        self.updates = 0
+        self.objects = _Objects(self)
+        header = self._read(0, _CHUNK)
+        self.header = header[:_OBJECT_START.search(header).start()]
+
+    def _read(self, offset, size):
+        self.file.seek(offset)
+        return self.file.read(size)
+
+    def _section(self, offset):
+        # Entries and trailer of the cross-reference section at an offset.
+        # The latest section is kept from __init__ until its entries are
+        # used.
+        if offset in self.sections:
+            return self.sections.pop(offset)
+        size = _CHUNK
+        while True:
+            data = self._read(offset, size)
+            end = data.find(b"startxref")
+            if end >= 0 or offset + size >= self.size:
+                break
+            size *= 4
+        trailer = data.index(b"trailer")
+        self.sections[offset] = data[:trailer], data[trailer:end]
+        return self.sections[offset]
+
+    def offset(self, number):
+        # File offset of an object, reading older sections as needed.
+        while number not in self.offsets and self.previous is not None:
+            self._read_section()
+        return self.offsets[number]
+
+    def _read_section(self):
+        # Add the offsets of the next older cross-reference section.
+        entries, trailer = self._section(self.previous)
+        current = 0
+        for line in entries.splitlines()[1:]:
+            fields = line.split()
+            if len(fields) == 2:
+                current = int(fields[0])
+                continue
+            if fields[2] == b"n":
+                self.offsets.setdefault(current, int(fields[0]))
+            current += 1
+        previous = re.search(rb"/Prev\s+(\d+)", trailer)
+        self.previous = int(previous.group(1)) if previous else None
+        if previous:
+            self.updates += 1
+
+    def update_count(self):
+        # Number of incremental updates appended to the file.
+        while self.previous is not None:
+            self._read_section()
+        return self.updates
+
+    def read_object(self, number):
+        # Body of an object between "N 0 obj" and "endobj".
+        offset = self.offset(number)
+        size = _CHUNK
+        while True:
+            data = self._read(offset, size)
+            start = _OBJECT_START.match(data).end()
+            end = data.find(b"endobj", start)
+            stream = _STREAM.search(data, start)
+            if stream and (end < 0 or stream.start() < end):
+                # Stream data may contain anything, skip it by its length.
+                length = _STREAM_LENGTH.search(data, start, stream.start())
+                end = data.find(b"endobj", stream.end() + int(length.group(1)))
+            if end >= 0 or offset + size >= self.size:
+                return data[start:end].rstrip()
+            size *= 4
+
+    def reference(self, key, body):
+        # Object number a dictionary entry refers to.
+        return int(re.search(key + rb"\s+(\d+) 0 R", body).group(1))
+
+    def root_pages(self):
+        # Object number of the root of the page tree.
+        root = self.objects[self.reference(b"/Root", self.trailer)]
+        return self.reference(b"/Pages", root)
+
+    def page_count(self):
+        # Number of pages, from the root of the page tree.
+        tree = self.objects[self.root_pages()]
+        return int(re.search(rb"/Count\s+(\d+)", tree).group(1))
+
+    def pages(self):
+        # Object numbers of the pages in order.
+        return self._page_tree(self.root_pages())
+
+    def _page_tree(self, number):
+        body = self.objects[number]
+        if re.search(rb"/Type\s*/Page\b(?!s)", body):
+            return [number]
+        pages = []
+        for kid in _kids(body):
+            pages.extend(self._page_tree(kid))
+        return pages
+
+    def last_page(self):
+        # Object number of the last page, found without reading the others.
+        number = self.root_pages()
+        while not re.search(rb"/Type\s*/Page\b(?!s)", self.objects[number]):
+            number = _kids(self.objects[number])[-1]
+        return number
+
+    def resources(self, page):
+        # Numbers of the objects a page's resources use, e.g. its fonts and
+        # images and the objects they refer to.
+        body = self.objects[page]
+        contents = self.reference(b"/Contents", body)
+        found = []
+        pending = [
+            int(match.group(2)) for match in _REFERENCE.finditer(body)
+            if not match.group(1) and int(match.group(2)) != contents
+        ]
+        while pending:
+            number = pending.pop()
+            if number in found:
+                continue
+            found.append(number)
+            body = self.objects[number]
+            stream = _STREAM.search(body)
+            pending.extend(
+                int(match.group(2)) for match in _REFERENCE.finditer(
+                    body[:stream.start()] if stream else body))
+        return found
+
+    def font_subsets(self, page):
+        # Unicode values by code of each TrueType font subset a page uses,
+        # {PostScript name: [subset 0 codes, subset 1 codes, ...]}.
+        subsets = {}
+        for number in self.resources(page):
+            body = self.objects[number]
+            tag = _SUBSET_TAG.search(body)
+            if not tag or b"/ToUnicode" not in body:
+                continue
+            index = int(tag.group(1).translate(_TAG_DIGITS)) % _SUBSETS
+            cmap = _stream_data(self.objects[self.reference(
+                b"/ToUnicode", body)])
+            codes = [int(value, 16) for _, value in _UNICODE.findall(cmap)]
+            font = subsets.setdefault(tag.group(2).decode("latin-1"), [])
+            font.extend([] for _ in range(index + 1 - len(font)))
+            font[index] = codes
+        return subsets
+
+
+def _kids(body):
+    # Object numbers in the /Kids array of a page tree node.
+    kids = re.search(rb"/Kids\s*\[([^\]]*)\]", body).group(1)
+    return [int(kid) for kid in re.findall(rb"(\d+) 0 R", kids)]
+
+
+def _stream_data(body):
+    # Decoded data of a stream object.
+    stream = _STREAM.search(body)
+    data = body[stream.end():body.rindex(b"endstream")].strip()
+    filters = re.search(rb"/Filter\s*\[?([^\]>]*)", body[:stream.start()])
+    for name in re.findall(rb"/(\w+)", filters.group(1) if filters else b""):
+        if name == b"ASCII85Decode":
+            data = base64.a85decode(data, adobe=True)
+        elif name == b"FlateDecode":
+            data = zlib.decompress(data)
+    return data
+
+
+def _merge_pdfs(parts):
+    # Merge PDFs written by reportlab into one document.
+    #
+    # Pages are kept in order under a new page tree. Objects other than
+    # pages that are byte for byte identical after renumbering, such as
+    # fonts embedded with the same subsets, are written once. The header,
+    # information dictionary and file identifier come from the first part.
+    files = [_PDFFile(data) for data in parts]
+    objects = {}
+    merged = {}
+    pages = []
+    for pdf in files:
+        numbers = {}
+        for page in pdf.pages():
+            pages.append(_copy_object(pdf, page, numbers, objects, merged))
+    first = files[0]
+    objects[_CATALOG] = b"<<\n/PageMode /UseNone /Pages 2 0 R /Type /Catalog\n>>"
+    objects[_PAGES] = b"<<\n/Count %d /Kids [ %s ] /Type /Pages\n>>" % (
+        len(pages), b" ".join(b"%d 0 R" % page for page in pages))
+    objects[_INFO] = first.objects[first.reference(b"/Info", first.trailer)]
+    identifier = re.search(rb"/ID\s*\[[^\]]*\]", first.trailer)
+    return _write_pdf(first.header, objects,
+                      identifier.group(0) if identifier else b"")
+
+
+def _copy_object(pdf, number, numbers, objects, merged, parent=_PAGES,
+                 first=_INFO + 1):
+    # Number of an object in the merged file, copying it and what it uses.
+    #
+    # Pages get the parent page tree node, copies are numbered from first.
+    if number in numbers:
+        return numbers[number]
+    body = pdf.objects[number]
+    stream = _STREAM.search(body)
+    split = stream.start() + 2 if stream else len(body)
+
+    def renumber(match):
+        if match.group(1):
+            return b"/Parent %d 0 R" % parent
+        return b"%d 0 R" % _copy_object(pdf, int(match.group(2)), numbers,
+                                        objects, merged, parent, first)
+
+    body = _REFERENCE.sub(renumber, body[:split]) + body[split:]
+    is_page = re.search(rb"/Type\s*/Page\b(?!s)", body[:split])
+    key = _merge_key(body)
+    if not is_page and key in merged:
+        numbers[number] = merged[key]
+        return merged[key]
+    new_number = len(objects) + first
+    objects[new_number] = body
+    if not is_page:
+        merged[key] = new_number
+    numbers[number] = new_number
+    return new_number
+
+
+def _merge_key(body):
+    # Body of an object compared when merging. Font names only matter in
+    # the resources that use them, subsets embedded again by an update
+    # match by their subset number.
+    stream = _STREAM.search(body)
+    split = stream.start() if stream else len(body)
+    return _retag(_FONT_NAME.sub(b"", body[:split]) + body[split:], 0)
+
+
+def _retag(body, update):
+    # Object with the tags of its font subsets set to those of an update,
+    # update 0 gives the tags reportlab writes.
+    stream = _STREAM.search(body)
+    split = stream.start() if stream else len(body)
+
+    def tag(match):
+        index = int(match.group(2).translate(_TAG_DIGITS)) % _SUBSETS
+        number = update % _SUBSETS * _SUBSETS + index
+        return match.group(1) + (b"%06d+" % number).translate(_TAG_LETTERS)
+
+    return _FONT_TAG.sub(tag, body[:split]) + body[split:]
+
+
+def _append_pages(pdf, data):
+    # Incremental update adding the pages of a PDF to the end of another.
+    #
+    # Objects of the new pages that are identical to objects used by the
+    # last existing page, such as fonts embedded with the same subsets and
+    # images, refer to the existing objects. Only the root of the page tree
+    # is written again. Returns the bytes to append to the file.
+    part = _PDFFile(data)
+    parent = pdf.root_pages()
+    size = int(re.search(rb"/Size\s+(\d+)", pdf.trailer).group(1))
+    merged = {
+        _merge_key(pdf.objects[number]): number
+        for number in pdf.resources(pdf.last_page())
+    }
+    objects = {}
+    numbers = {}
+    pages = [
+        _copy_object(part, page, numbers, objects, merged, parent, size)
+        for page in part.pages()
+    ]
+    # Subsets that changed are embedded again under a tag of their own,
+    # viewers may cache fonts by name.
+    update = pdf.update_count() + 1
+    for number, body in objects.items():
+        objects[number] = _retag(body, update)
+    tree = pdf.objects[parent]
+    count = pdf.page_count() + len(pages)
+    kids = b" ".join(b"%d 0 R" % kid for kid in _kids(tree) + pages)
+    tree = re.sub(rb"/Count\s+\d+", b"/Count %d" % count, tree)
+    objects[parent] = re.sub(rb"/Kids\s*\[[^\]]*\]",
+                             b"/Kids [ " + kids + b" ]", tree)
+    return _write_update(pdf, objects, max(size, max(objects) + 1))
+
+
+def _write_update(pdf, objects, size):
+    # Serialize objects as a section appended to a file, with a
+    # cross-reference table that continues the file's table.
+    separator = b"" if pdf._read(pdf.size - 1, 1) == b"\n" else b"\n"
+    output = [separator]
+    length = pdf.size + len(separator)
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = length
+        chunk = b"%d 0 obj\n%s\nendobj\n" % (number, objects[number])
+        output.append(chunk)
+        length += len(chunk)
+    output.append(b"xref\n")
+    numbers = sorted(offsets)
+    while numbers:
+        # Consecutive numbers share a subsection.
+        run = 1
+        while run < len(numbers) and numbers[run] == numbers[0] + run:
+            run += 1
+        output.append(b"%d %d\n" % (numbers[0], run))
+        output.extend(b"%010d 00000 n \n" % offsets[number]
+                      for number in numbers[:run])
+        numbers = numbers[run:]
+    fields = [
+        re.search(pattern, pdf.trailer)
+        for pattern in (rb"/ID\s*\[[^\]]*\]", rb"/Info\s+\d+ 0 R",
+                        rb"/Root\s+\d+ 0 R")
+    ]
+    output.append(b"trailer\n<<\n%s\n/Prev %d\n/Size %d\n>>\nstartxref\n%d\n"
+                  b"%%%%EOF\n" % (b"\n".join(
+                      field.group(0) for field in fields if field),
+                                   pdf.startxref, size, length))
+    return b"".join(output)
+
+
+def _write_pdf(header, objects, identifier):
+    # Serialize numbered objects with a cross-reference table.
+    output = [header]
+    length = len(header)
+    offsets = []
+    for number in range(1, len(objects) + 1):
+        offsets.append(length)
+        chunk = b"%d 0 obj\n%s\nendobj\n" % (number, objects[number])
+        output.append(chunk)
+        length += len(chunk)
+    output.append(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    output.extend(b"%010d 00000 n \n" % offset for offset in offsets)
+    output.append(b"trailer\n<<\n%s\n/Info %d 0 R\n/Root %d 0 R\n/Size %d\n"
+                  b">>\nstartxref\n%d\n%%%%EOF\n" %
+                  (identifier, _INFO, _CATALOG, len(objects) + 1, length))
+    return b"".join(output)
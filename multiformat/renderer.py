@@ -0,0 +1,234 @@
+# Copyright 2018 Adam Moller
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from abc import ABC, abstractmethod
+from .geometry import _bounds, _contains, _intersects, _opaque_bounds
+
+# Element fields passed positionally to the backend's draw_<type> method.
+_ELEMENT_FIELDS = {
+    "string": ("string", "x", "y", "alignment", "font", "size", "color"),
+    "line": ("x", "y", "x1", "y1", "width", "color"),
+    "rectangle": ("x", "y", "w", "h", "fill_color", "border_color",
+                  "border_width"),
+    "circle": ("x", "y", "radius", "fill_color", "border_color",
+               "border_width"),
+    "image": ("image", "x", "y", "w", "h"),
+    "polyline": ("points", "width", "color"),
+    "polygon": ("points", "fill_color", "border_color", "border_width"),
+}
+
+_backends = {}
+
+
+class Renderer(ABC):
+    """Base class for output backends.
+
+    A backend is created for a document with from_document(), receives one
+    draw_<type> call per element with the element's fields, new_page() at
+    each page break and save() once all elements have been drawn. Values
+    returned by stats() are added to the render stats after save().
+
+    Strings of paragraphs and tables are drawn with baseline=True, their
+    baseline is at y whatever glyphs they hold.
+    """
+
+    @classmethod
+    @abstractmethod
+    def from_document(cls, document, file_name, file_object=None, **options):
+        """Create a backend for a document.
+
+        Args:
+            document: Document that will be drawn
+            file_name: name of the output file, without extension. (String)
+            file_object: optional file-like object to write to
+            options: backend specific keyword arguments
+
+        Returns:
+            The backend instance.
+        """
+
+    @abstractmethod
+    def draw_string(self, string, x, y, alignment, font, size, color,
+                    baseline=False):
+        """Draw a string element."""
+
+    @abstractmethod
+    def draw_line(self, x, y, x1, y1, width, color):
+        """Draw a line element."""
+
+    @abstractmethod
+    def draw_rectangle(self, x, y, w, h, fill_color, border_color,
+                       border_width):
+        """Draw a rectangle element."""
+
+    @abstractmethod
+    def draw_circle(self, x, y, radius, fill_color, border_color,
+                    border_width):
+        """Draw a circle element."""
+
+    @abstractmethod
+    def draw_image(self, image, x, y, w, h):
+        """Draw an image element, image is the key of the document's image."""
+
+    @abstractmethod
+    def draw_polyline(self, points, width, color):
+        """Draw a polyline element from a flat array of x and y values."""
+
+    @abstractmethod
+    def draw_polygon(self, points, fill_color, border_color, border_width):
+        """Draw a polygon element from a flat array of x and y values."""
+
+    @abstractmethod
+    def new_page(self):
+        """Start the next page."""
+
+    @abstractmethod
+    def save(self):
+        """Finish the output once all elements are drawn.
+
+        Returns:
+            The value returned by Document.generate(), None for files.
+        """
+
+    def stats(self):
+        """Counts added to the render stats after save().
+
+        Returns:
+            Dictionary of counts, empty by default.
+        """
+        return {}
+
+
+def register_backend(name, backend):
+    """Register an output backend.
+
+    Makes a backend available to Document.generate() under a name. Built-in
+    backends register themselves when the package is imported.
+
+    Args:
+        name: Name used to select the backend (String)
+        backend: Subclass of Renderer implementing the draw methods
+
+    Returns:
+        None
+    """
+    _backends[str(name).lower()] = backend
+
+
+def get_backend(name):
+    """Get a registered output backend.
+
+    Args:
+        name: Name the backend was registered with (String)
+
+    Returns:
+        The backend class.
+    """
+    try:
+        return _backends[str(name).lower()]
+    except KeyError:
+        raise KeyError("Backend not registered: '{}'".format(name))
+
+
+def render(document, backend, page=None, region=None, cull=False,
+           stats=None):
+    """Draw the elements of a document with a backend.
+
+    Element types are resolved to bound backend methods once, before the
+    elements are walked, so each element costs a single dictionary lookup.
+
+    With culling enabled, elements outside the rendered region and elements
+    completely covered by a later filled rectangle are not drawn.
+
+    Args:
+        document: Document to draw
+        backend: Backend instance created with from_document()
+        page: Only draw this page when defined (Integer)
+        region: Area of the page being rendered, (x0, y0, x1, y1) in
+            document units. Defaults to the whole page.
+        cull: Skip elements that can't be seen (Boolean)
+        stats: optional dictionary updated with element counts
+
+    Returns:
+        The value returned by the backend's save method.
+    """
+    methods = _method_table(backend)
+    if stats is None:
+        stats = {}
+    stats.update({"elements": 0, "drawn": 0, "outside": 0, "occluded": 0})
+    if region is None:
+        region = (0, 0, document.w, document.h)
+    for number, items in enumerate(document._page_elements(page)):
+        if number:
+            backend.new_page()
+        _draw_elements(methods, items, region, cull, stats)
+    result = backend.save()
+    stats.update(backend.stats())
+    return result
+
+
+def _method_table(backend):
+    # Map element types to bound backend methods and their fields.
+    return {
+        element_type: (getattr(backend, "draw_" + element_type), fields)
+        for element_type, fields in _ELEMENT_FIELDS.items()
+    }
+
+
+def _draw_elements(methods, items, region, cull, stats):
+    # Draw the elements of one page with a method table.
+    stats["elements"] += len(items)
+    if cull:
+        items = _cull(items, region, stats)
+    for item in items:
+        method, fields = methods[item["type"]]
+        if item.get("baseline"):
+            method(*[item[field] for field in fields], baseline=True)
+        else:
+            method(*[item[field] for field in fields])
+    stats["drawn"] += len(items)
+
+
+# Occluders kept while culling a page, largest first.
+_MAX_OCCLUDERS = 16
+
+
+def _cull(items, region, stats):
+    # Remove elements outside the region or covered by later opaque fills.
+    #
+    # Elements are visited from the last drawn to the first so that every
+    # filled rectangle is known before the elements drawn underneath it.
+    visible = []
+    occluders = []
+    for item in reversed(items):
+        bounds = _bounds(item)
+        if not _intersects(bounds, region):
+            stats["outside"] += 1
+            continue
+        # Only the part inside the region needs to be covered.
+        bounds = (max(bounds[0], region[0]), max(bounds[1], region[1]),
+                  min(bounds[2], region[2]), min(bounds[3], region[3]))
+        if any(_contains(occluder, bounds) for occluder in occluders):
+            stats["occluded"] += 1
+            continue
+        visible.append(item)
+        opaque = _opaque_bounds(item)
+        if opaque:
+            occluders.append(opaque)
+            occluders.sort(
+                key=lambda box: (box[2] - box[0]) * (box[3] - box[1]),
+                reverse=True)
+            del occluders[_MAX_OCCLUDERS:]
+    visible.reverse()
+    return visible
@@ -0,0 +1,270 @@
+# Copyright 2018 Adam Moller
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import multiprocessing
+import struct
+from array import array
+from .renderer import _ELEMENT_FIELDS
+
+# Magic, version, pages, records, strings, pool bytes, images and the string
+# numbers of document size, layout, author, title and subject.
+_HEADER = struct.Struct("<4sHxxIIIII5I")
+_MAGIC = b"MFEL"
+_VERSION = 3
+# Type, alignment, flags of the colors and the baseline, three RGB colors,
+# pooled field, font and numbers.
+_RECORD = struct.Struct("<BBB9BxII6d")
+_NONE = 0xFFFFFFFF
+# Names of the blocks created by this process.
+_created = set()
+
+_TYPES = tuple(_ELEMENT_FIELDS)
+_TYPE_CODES = {element_type: code for code, element_type in enumerate(_TYPES)}
+_ALIGNMENTS = ("left", "right", "middle")
+_ALIGNMENT_CODES = {name: code for code, name in enumerate(_ALIGNMENTS)}
+_COLOR_FIELDS = ("color", "fill_color", "border_color")
+_BASELINE_FLAG = 1 << len(_COLOR_FIELDS)
+# Fields kept in the pool, an element has at most one. Points are stored as
+# the bytes of their array.
+_POOL_FIELDS = ("string", "image", "points")
+_TEXT_FIELDS = _POOL_FIELDS + ("font", "alignment")
+# Fields of each element type stored as numbers, in record order.
+_NUMBER_FIELDS = {
+    element_type: tuple(field for field in fields
+                        if field not in _TEXT_FIELDS + _COLOR_FIELDS)
+    for element_type, fields in _ELEMENT_FIELDS.items()
+}
+
+
+class _SharedElements:
+    # Elements of a document in one shared memory block.
+    #
+    # Elements are fixed-width records, strings and font names are stored
+    # once in a pool of UTF-8 text, which also holds the encoded images and
+    # the points of polylines and polygons.
+    # Other processes attach to the block by name and read records in
+    # place, only decoding the pages they use.
+    def __init__(self, memory, owner):
+        self.memory = memory
+        self.owner = owner
+        self.name = memory.name
+        (magic, version, self.pages, self.records, self.strings, pool_bytes,
+         self.images, *metadata) = _HEADER.unpack_from(memory.buf, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(
+                "Shared memory is not an element store: '{}'".format(
+                    self.name))
+        self.page_offset = _HEADER.size
+        self.record_offset = self.page_offset + (self.pages + 1) * 4
+        self.string_offset = self.record_offset + self.records * _RECORD.size
+        self.image_offset = self.string_offset + (self.strings + 1) * 4
+        self.pool_offset = self.image_offset + self.images * 4
+        self._strings = {}
+        self._colors = {}
+        (self.document_size, self.layout, self.author, self.title,
+         self.subject) = [self.string(number) for number in metadata]
+
+    @classmethod
+    def create(cls, document):
+        # Copy the elements of a document into a new shared memory block.
+        strings = {}
+
+        def string_number(text):
+            if text is None:
+                return _NONE
+            return strings.setdefault(text, len(strings))
+
+        metadata = [
+            string_number(value)
+            for value in (document.document_size, document.layout,
+                          document.author, document.title, document.subject)
+        ]
+        page_starts = [0]
+        records = bytearray()
+        for page in document._page_elements():
+            for item in page:
+                records += _encode(item, string_number)
+            page_starts.append(len(records) // _RECORD.size)
+        # Encoded images are pool entries, listed by string number.
+        images = [
+            string_number(document._images.data(key))
+            for key in list(document._images.images)
+        ]
+        pool = [
+            text.encode("utf-8") if isinstance(text, str) else text
+            for text in strings
+        ]
+        string_starts = [0]
+        for text in pool:
+            string_starts.append(string_starts[-1] + len(text))
+        sections = [
+            _HEADER.pack(_MAGIC, _VERSION, len(page_starts) - 1,
+                         page_starts[-1], len(pool), string_starts[-1],
+                         len(images), *metadata),
+            struct.pack("<{}I".format(len(page_starts)), *page_starts),
+            records,
+            struct.pack("<{}I".format(len(string_starts)), *string_starts),
+            struct.pack("<{}I".format(len(images)), *images),
+        ] + pool
+        size = sum(len(section) for section in sections)
+        memory = _shared_memory(create=True, size=max(1, size))
+        _created.add(memory.name)
+        position = 0
+        for section in sections:
+            memory.buf[position:position + len(section)] = section
+            position += len(section)
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        # Open a block created by another process.
+        tracked = False
+        try:
+            # Only the creating process should remove the block.
+            memory = _shared_memory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching registers the block with the
+            # resource tracker, which removes it when the process exits.
+            # The creator and its child processes share one tracker, which
+            # keeps a single registration per block.
+            memory = _shared_memory(name=name)
+            tracked = (memory.name not in _created
+                       and multiprocessing.parent_process() is None)
+        try:
+            store = cls(memory, owner=False)
+        except ValueError:
+            memory.close()
+            raise
+        if tracked:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(memory._name, "shared_memory")
+        return store
+
+    def string(self, number):
+        # Text of a string pool entry, decoded once.
+        if number == _NONE:
+            return None
+        text = self._strings.get(number)
+        if text is None:
+            text = self.data(number).decode("utf-8")
+            self._strings[number] = text
+        return text
+
+    def data(self, number):
+        # Bytes of a string pool entry.
+        start, end = struct.unpack_from("<II", self.memory.buf,
+                                        self.string_offset + number * 4)
+        position = self.pool_offset + start
+        return bytes(self.memory.buf[position:position + end - start])
+
+    def image_data(self):
+        # Encoded data of the stored images.
+        numbers = struct.unpack_from("<{}I".format(self.images),
+                                     self.memory.buf, self.image_offset)
+        return [self.data(number) for number in numbers]
+
+    def page_range(self, number):
+        # First and last record (exclusive) of a page counted from 0.
+        return struct.unpack_from("<II", self.memory.buf,
+                                  self.page_offset + number * 4)
+
+    def page_elements(self, number):
+        # Element dictionaries of a page counted from 0.
+        first, last = self.page_range(number)
+        buffer = self.memory.buf
+        return [
+            self._decode(
+                _RECORD.unpack_from(buffer,
+                                    self.record_offset + record * _RECORD.size))
+            for record in range(first, last)
+        ]
+
+    def _decode(self, record):
+        element_type = _TYPES[record[0]]
+        item = {"type": element_type}
+        fields = _ELEMENT_FIELDS[element_type]
+        if "string" in fields:
+            item["string"] = self.string(record[12])
+        if "image" in fields:
+            item["image"] = self.string(record[12])
+        if "points" in fields:
+            item["points"] = array("d", self.data(record[12]))
+        if "font" in fields:
+            item["font"] = self.string(record[13])
+        if "alignment" in fields:
+            item["alignment"] = _ALIGNMENTS[record[1]]
+        if record[2] & _BASELINE_FLAG:
+            item["baseline"] = True
+        for position, field in enumerate(_COLOR_FIELDS):
+            if field in fields:
+                item[field] = None
+                if record[2] & 1 << position:
+                    color = record[3 + position * 3:6 + position * 3]
+                    item[field] = self._colors.setdefault(color, color)
+        for field, value in zip(_NUMBER_FIELDS[element_type], record[14:]):
+            item[field] = int(value) if value.is_integer() else value
+        return item
+
+    def close(self):
+        # Detach from the block.
+        self.memory.close()
+
+    def unlink(self):
+        # Remove the block once every process has detached.
+        self.memory.unlink()
+        _created.discard(self.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        if self.owner:
+            self.unlink()
+
+
+def _shared_memory(**options):
+    # Create or open a shared memory block.
+    #
+    # The module is imported when a store is used, it needs Python 3.8.
+    try:
+        from multiprocessing.shared_memory import SharedMemory
+    except ImportError:
+        raise RuntimeError(
+            "Shared element stores need Python 3.8 or later.")
+    return SharedMemory(**options)
+
+
+def _encode(item, string_number):
+    # Fixed-width record of an element.
+    element_type = item["type"]
+    flags = 0
+    colors = [0] * 9
+    for position, field in enumerate(_COLOR_FIELDS):
+        color = item.get(field)
+        if color:
+            flags |= 1 << position
+            colors[position * 3:position * 3 + 3] = color
+    if item.get("baseline"):
+        flags |= _BASELINE_FLAG
+    pooled = next((item[field] for field in _POOL_FIELDS if field in item),
+                  None)
+    if isinstance(pooled, array):
+        pooled = pooled.tobytes()
+    numbers = [item[field] for field in _NUMBER_FIELDS[element_type]]
+    numbers += [0] * (6 - len(numbers))
+    return _RECORD.pack(_TYPE_CODES[element_type],
+                        _ALIGNMENT_CODES.get(item.get("alignment"), 0), flags,
+                        *colors, string_number(pooled),
+                        string_number(item.get("font")), *numbers)
@@ -0,0 +1,73 @@
+# Copyright 2018 Adam Moller
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from .geometry import _intersects
+
+
+class _GridIndex:
+    # Uniform grid over a page mapping cells to the elements they touch.
+    #
+    # Elements are identified by a key, their position in the document, so
+    # query results can be returned in drawing order. Elements covering many
+    # cells, such as page backgrounds, are kept in a separate list that
+    # every query checks instead of being added to each cell.
+    def __init__(self, cell_size=64, max_cells=64):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.cells = {}
+        self.large = []
+        self.bounds = {}
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def insert(self, key, bounds):
+        # Add an element with its bounding box.
+        self.bounds[key] = bounds
+        x0, y0, x1, y1 = self._cell_range(bounds)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > self.max_cells:
+            self.large.append(key)
+            return
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                self.cells.setdefault((x, y), []).append(key)
+
+    def copy(self):
+        # Independent index with the same elements.
+        index = _GridIndex(self.cell_size, self.max_cells)
+        index.cells = {cell: list(keys) for cell, keys in self.cells.items()}
+        index.large = list(self.large)
+        index.bounds = dict(self.bounds)
+        return index
+
+    def query(self, bbox):
+        # Keys of elements whose bounds intersect bbox, in insertion order.
+        found = set()
+        bounds = self.bounds
+        x0, y0, x1, y1 = self._cell_range(bbox)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                for key in self.cells.get((x, y), ()):
+                    if key not in found and _intersects(bounds[key], bbox):
+                        found.add(key)
+        for key in self.large:
+            if _intersects(bounds[key], bbox):
+                found.add(key)
+        return sorted(found)
+
+    def _cell_range(self, bbox):
+        # First and last grid cell (x0, y0, x1, y1) covered by a box.
+        size = self.cell_size
+        return (int(bbox[0] // size), int(bbox[1] // size),
+                int(bbox[2] // size), int(bbox[3] // size))
@@ -1,6 +1,11 @@
 import os
 import sys
+import pytest
 sys.path.insert(0,
                 os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from multiformat.multiformat import Document
+
+# Shared element stores use multiprocessing.shared_memory.
+shared_memory = pytest.mark.skipif(
+    sys.version_info < (3, 8), reason="requires Python 3.8")
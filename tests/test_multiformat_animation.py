@@ -0,0 +1,84 @@
+from io import BytesIO
+import pytest
+from PIL import Image, ImageSequence
+from context import Document
+from test_multiformat_reproducible import new_document
+
+
+def generate(document, image_format, **options):
+    output = BytesIO()
+    document.generate_animation(
+        "animation", image_format, file_object=output, **options)
+    return Image.open(BytesIO(output.getvalue()))
+
+
+def local_color_tables(data):
+    # Whether each frame of a GIF has its own color table.
+    position = 13 + 3 * 2**((data[10] & 7) + 1)
+    tables = []
+    while data[position] != 0x3B:
+        if data[position] == 0x21:
+            position += 2
+        else:
+            flags = data[position + 9]
+            tables.append(bool(flags & 0x80))
+            position += 11
+            if flags & 0x80:
+                position += 3 * 2**((flags & 7) + 1)
+        while data[position]:
+            position += data[position] + 1
+        position += 1
+    return tables
+
+
+class TestAnimation:
+    def test_gif_frames_share_palette(self):
+        output = BytesIO()
+        new_document().generate_animation(
+            "animation", "gif", file_object=output, dpi=72, duration=500,
+            loop=2)
+        assert local_color_tables(output.getvalue()) == [False] * 3
+        image = Image.open(output)
+        assert image.n_frames == 3
+        assert image.info["duration"] == 500
+        assert image.info["loop"] == 2
+        for frame in ImageSequence.Iterator(image):
+            assert frame.size == (595, 842)
+            # Document colors are kept exactly.
+            assert frame.convert("RGB").getpixel((100, 60)) == (41, 128, 185)
+
+    def test_gif_colors(self):
+        image = generate(new_document(), "gif", dpi=72, colors=16)
+        for frame in ImageSequence.Iterator(image):
+            assert len(frame.convert("RGB").getcolors()) <= 16
+
+    @pytest.mark.parametrize("image_format,mode", [("tiff", "RGB"),
+                                                   ("webp", "RGBA")])
+    def test_multi_frame_formats(self, image_format, mode):
+        image = generate(new_document(), image_format, size=(300, 300))
+        assert image.n_frames == 3
+        for frame in ImageSequence.Iterator(image):
+            assert frame.size == (212, 300)
+            assert frame.mode == mode
+            assert frame.convert("RGB").getpixel((40, 20)) == (41, 128, 185)
+
+    def test_single_page_file(self, tmpdir):
+        document = Document("letter", "portrait")
+        document.draw_circle(1000, 1000, 500, "#e67e22")
+        path = str(tmpdir.join("single"))
+        document.generate_animation(path, "GIF", dpi=36)
+        with Image.open(path + ".gif") as image:
+            assert image.n_frames == 1
+
+    @pytest.mark.parametrize("options", [
+        {"image_format": "png"},
+        {"image_format": "webp", "colors": 16},
+        {"image_format": "gif", "quality": 80},
+        {"image_format": "gif", "duration": 0},
+        {"image_format": "gif", "loop": -1},
+        {"image_format": "gif", "size": (100, 100), "dpi": 72},
+    ])
+    def test_invalid_options(self, options):
+        with pytest.raises(RuntimeError):
+            new_document().generate_animation(
+                "animation", file_object=BytesIO(), **options)
@@ -0,0 +1,163 @@
+import io
+import json
+import pytest
+from PIL import Image
+from context import Document
+from multiformat import generate_image
+from multiformat.cli import build_document, main
+from test_multiformat_images import logo
+
+DESCRIPTION = {
+    "name": "statement",
+    "title": "Statement",
+    "document_size": "letter",
+    "elements": [
+        {"type": "rectangle", "x": 100, "y": 100, "w": 400, "h": 200,
+         "fill_color": "#2980b9"},
+        {"type": "string", "string": "Total", "x": 100, "y": 500,
+         "alignment": "left", "font": "OpenSans-Regular", "size": 60,
+         "color": [0, 0, 0]},
+        {"type": "page_break"},
+        {"type": "polyline", "points": [[100, 100], [500, 500]], "width": 10,
+         "color": "#000"},
+        {"type": "table", "rows": [["Item", "1.00"]], "x": 100, "y": 800,
+         "column_widths": [400, 200], "font": "OpenSans-Regular", "size": 40,
+         "color": "#000"},
+    ],
+}
+
+
+def write_lines(path, *descriptions):
+    path.write_text("\n".join(
+        description if isinstance(description, str) else
+        json.dumps(description) for description in descriptions) + "\n",
+                    encoding="utf-8")
+    return str(path)
+
+
+class TestCLI:
+    def test_build_document(self):
+        document = build_document(DESCRIPTION)
+        assert isinstance(document, Document)
+        assert document.pages == 2
+        assert document.title == "Statement"
+        assert document.w == 2159
+        assert [item["type"] for item in document._document][:4] == [
+            "rectangle", "string", "page_break", "polyline"
+        ]
+
+    @pytest.mark.parametrize("element,message", [
+        ({"type": "blob"}, "invalid type"),
+        ({"type": "circle", "x": 100}, "Element 1"),
+        ({"type": "circle", "x": 100, "y": 100, "radius": -1}, "Element 1"),
+    ])
+    def test_build_document_errors(self, element, message):
+        with pytest.raises(ValueError, match=message):
+            build_document({"elements": [element]})
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_render_files(self, tmp_path, capsys, workers):
+        inputs = write_lines(tmp_path / "documents.jsonl", DESCRIPTION,
+                             {"elements": []})
+        output = tmp_path / "out"
+        status = main([
+            inputs, "-o", str(output), "-f", "pdf", "-f", "png", "--dpi",
+            "72", "-w", str(workers)
+        ])
+        assert status == 0
+        assert sorted(path.name for path in output.iterdir()) == [
+            "document_2.pdf", "document_2.png", "statement.pdf",
+            "statement_1.png", "statement_2.png"
+        ]
+        with Image.open(output / "statement_1.png") as image:
+            assert image.size == (612, 792)
+        assert "2 documents, 3 pages" in capsys.readouterr().err
+
+    def test_page_range_and_size(self, tmp_path):
+        inputs = write_lines(tmp_path / "documents.jsonl", DESCRIPTION)
+        status = main([
+            inputs, "-o", str(tmp_path), "-f", "jpeg", "-p", "2", "-s",
+            "200x200", "-q"
+        ])
+        assert status == 0
+        with Image.open(tmp_path / "statement.jpeg") as image:
+            assert image.size == (154, 200)
+
+    def test_standard_input_and_failures(self, tmp_path, capsys,
+                                         monkeypatch):
+        lines = "\n".join(
+            [json.dumps(DESCRIPTION), "not json", "", '{"elements": 5}'])
+        monkeypatch.setattr("sys.stdin", io.StringIO(lines))
+        status = main(["-o", str(tmp_path), "--invariant"])
+        assert status == 1
+        assert (tmp_path / "statement.pdf").exists()
+        errors = capsys.readouterr().err
+        assert "Document 2:" in errors
+        assert "Document 3:" in errors
+        assert "1 documents, 2 pages" in errors
+        assert "2 failed" in errors
+
+    def test_memory_limit(self, tmp_path, capsys):
+        inputs = write_lines(tmp_path / "documents.jsonl", DESCRIPTION)
+        status = main([
+            inputs, "-o", str(tmp_path), "-f", "png", "-p", "1",
+            "--memory-limit", "4"
+        ])
+        assert status == 1
+        assert "memory limit is 4.0 MB" in capsys.readouterr().err
+        status = main([
+            inputs, "-o", str(tmp_path), "-f", "png", "-p", "1", "-s",
+            "500x500", "--memory-limit", "4", "-q"
+        ])
+        assert status == 0
+        with Image.open(tmp_path / "statement.png") as image:
+            assert image.size == (386, 500)
+        # The limit is passed to each render, not set for the process.
+        assert generate_image._memory_limit is None
+
+    @pytest.mark.parametrize("name", ["../escaped", "a/b", "/tmp/absolute",
+                                      "..", ""])
+    def test_name_outside_output(self, tmp_path, capsys, name):
+        output = tmp_path / "out"
+        inputs = write_lines(tmp_path / "documents.jsonl",
+                             dict(DESCRIPTION, name=name), DESCRIPTION)
+        assert main([inputs, "-o", str(output), "-q"]) == 1
+        assert "Document 1: Invalid name" in capsys.readouterr().err
+        assert sorted(path.name for path in tmp_path.rglob("*.pdf")) == [
+            "statement.pdf"
+        ]
+        assert (output / "statement.pdf").exists()
+
+    def test_decompression_bomb(self, tmp_path, capsys, monkeypatch):
+        image_path = tmp_path / "logo.png"
+        image_path.write_bytes(logo())
+        monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 500)
+        bomb = {
+            "name": "bomb",
+            "elements": [{"type": "image", "image": str(image_path),
+                          "x": 100, "y": 100, "w": 600}],
+        }
+        inputs = write_lines(tmp_path / "documents.jsonl", bomb, DESCRIPTION)
+        assert main([inputs, "-o", str(tmp_path), "-q"]) == 1
+        assert "Document 1: Element 1:" in capsys.readouterr().err
+        assert (tmp_path / "statement.pdf").exists()
+
+    def test_missing_input(self, tmp_path, capsys):
+        with pytest.raises(SystemExit) as error:
+            main([str(tmp_path / "missing.jsonl"), "-o", str(tmp_path)])
+        assert error.value.code != 0
+        assert "can't open" in capsys.readouterr().err
+        with pytest.raises(SystemExit):
+            main([str(tmp_path), "-o", str(tmp_path / "out")])
+
+    @pytest.mark.parametrize("arguments", [
+        ["-w", "0"],
+        ["-p", "3-1"],
+        ["-s", "big"],
+        ["-f", "bmp"],
+        ["-s", "200x200", "--dpi", "72"],
+        ["--memory-limit", "0"],
+    ])
+    def test_invalid_arguments(self, arguments, capsys):
+        with pytest.raises(SystemExit):
+            main(arguments)
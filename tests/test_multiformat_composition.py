@@ -0,0 +1,104 @@
+import pytest
+from context import Document
+
+
+class TestComposition:
+    def new_document(self, label, pages, size="letter"):
+        document = Document(size, "portrait")
+        document.title = label
+        for page in range(pages):
+            if page:
+                document.insert_page_break()
+            document.draw_string("{} {}".format(label, page + 1), 100, 100,
+                                 "left", "OpenSans-Regular", 40, "#2980b9")
+        return document
+
+    def labels(self, document):
+        return [
+            [item["string"] for item in page.elements]
+            for page in document._pages
+        ]
+
+    def test_append(self):
+        cover = self.new_document("cover", 1)
+        cover.append(self.new_document("statement", 2))
+        assert cover.pages == 3
+        assert self.labels(cover) == [["cover 1"], ["statement 1"],
+                                      ["statement 2"]]
+
+    def test_append_shares_pages(self):
+        cover = self.new_document("cover", 1)
+        statement = self.new_document("statement", 2)
+        cover.append(statement)
+        assert cover._pages[1] is statement._pages[0]
+        assert cover._pages[2] is statement._pages[1]
+
+    def test_drawing_copies_shared_page(self):
+        cover = self.new_document("cover", 1)
+        statement = self.new_document("statement", 2)
+        cover.append(statement)
+        cover.draw_string("added", 100, 200, "left", "OpenSans-Regular", 40,
+                          "#000")
+        statement.draw_string("other", 100, 200, "left", "OpenSans-Regular",
+                              40, "#000")
+        assert self.labels(cover)[2] == ["statement 2", "added"]
+        assert self.labels(statement)[1] == ["statement 2", "other"]
+        assert [item["string"] for item in cover.elements_at(3, 150, 190)
+                ] == ["added"]
+        assert cover._pages[1] is statement._pages[0]
+
+    def test_append_self(self):
+        document = self.new_document("page", 2)
+        document.append(document)
+        assert self.labels(document) == [["page 1"], ["page 2"], ["page 1"],
+                                         ["page 2"]]
+
+    def test_slice_pages(self):
+        document = self.new_document("page", 5)
+        part = document.slice_pages(2, 4)
+        assert part.pages == 3
+        assert part.title == "page"
+        assert self.labels(part) == [["page 2"], ["page 3"], ["page 4"]]
+        assert self.labels(document.slice_pages(5)) == [["page 5"]]
+
+    @pytest.mark.parametrize("first,last", [(0, 2), (2, 6), (3, 2), ("a", 2)])
+    def test_slice_pages_invalid(self, first, last):
+        document = self.new_document("page", 5)
+        with pytest.raises(RuntimeError):
+            document.slice_pages(first, last)
+
+    def test_concatenate(self):
+        pack = Document.concatenate([
+            self.new_document("cover", 1),
+            self.new_document("statement", 2).slice_pages(2),
+            self.new_document("appendix", 2)
+        ])
+        assert pack.title == "cover"
+        assert self.labels(pack) == [["cover 1"], ["statement 2"],
+                                     ["appendix 1"], ["appendix 2"]]
+
+    def test_concatenate_invalid(self):
+        with pytest.raises(RuntimeError):
+            Document.concatenate([])
+        with pytest.raises(RuntimeError):
+            Document.concatenate([
+                self.new_document("letter", 1),
+                self.new_document("a4", 1, "a4")
+            ])
+        with pytest.raises(RuntimeError):
+            self.new_document("letter", 1).append("document")
+
+    def test_composed_colors(self):
+        pack = Document.concatenate(
+            [Document("letter", "portrait"),
+             self.new_document("page", 1)])
+        assert pack._colors.lookup((41, 128, 185)) == (41, 128, 185)
+
+    def test_generate_composed(self):
+        pack = Document.concatenate(
+            [self.new_document("cover", 1),
+             self.new_document("page", 2)])
+        pages = pack.generate_raster()
+        assert len(pages) == 3
+        single = self.new_document("page", 2).generate_raster(page=2)[0]
+        assert pages[2].tobytes() == single.tobytes()
@@ -0,0 +1,92 @@
+import os
+import shutil
+from io import BytesIO
+import pytest
+from context import Document
+from multiformat.font_registry import (_FontRegistry, _font_path,
+                                       add_font_directory, font_names,
+                                       register_font)
+
+FONTS = os.path.join(os.path.dirname(__file__), "..", "multiformat", "fonts")
+
+
+class TestFonts:
+    def copy_font(self, directory, name):
+        path = str(directory.join("{}.ttf".format(name)))
+        shutil.copy(os.path.join(FONTS, "OpenSans-Bold.ttf"), path)
+        return path
+
+    def test_package_fonts(self):
+        assert {"OpenSans-Bold", "OpenSans-Regular"} <= set(font_names())
+        assert Document().supported_fonts == font_names()
+
+    def test_case_insensitive_names(self):
+        document = Document()
+        document.draw_string("Text", 100, 100, "left", "opensans-BOLD", 40,
+                             "#000")
+        assert document._document[-1]["font"] == "OpenSans-Bold"
+
+    def test_register_font(self, tmpdir):
+        path = self.copy_font(tmpdir, "file")
+        assert register_font(path, "Registered-Heading") == \
+            "Registered-Heading"
+        assert register_font(path, "registered-heading") == \
+            "Registered-Heading"
+        document = Document()
+        document.draw_string("Text", 100, 100, "left", "REGISTERED-heading",
+                             40, "#000")
+        document.generate_pdf("fonts", file_object=BytesIO())
+        document.generate_image("fonts", "png", file_object=BytesIO())
+        document.generate_svg("fonts", file_object=BytesIO())
+        assert _font_path("Registered-Heading") == os.path.abspath(path)
+
+    def test_register_font_conflict(self, tmpdir):
+        with pytest.raises(ValueError):
+            register_font(self.copy_font(tmpdir, "OpenSans-Regular"))
+        with pytest.raises(ValueError):
+            register_font(str(tmpdir.join("missing.ttf")))
+
+    def test_add_font_directory(self, tmpdir):
+        self.copy_font(tmpdir, "Directory-Font")
+        self.copy_font(tmpdir, "OpenSans-Bold")
+        tmpdir.join("notes.txt").write("not a font")
+        assert add_font_directory(str(tmpdir)) == ["Directory-Font"]
+        assert "Directory-Font" in Document().supported_fonts
+        with pytest.raises(ValueError):
+            add_font_directory(str(tmpdir.join("missing")))
+
+    def test_font_path_variable(self, tmpdir, monkeypatch):
+        self.copy_font(tmpdir, "Environment-Font")
+        monkeypatch.setenv("MULTIFORMAT_FONT_PATH", str(tmpdir))
+        registry = _FontRegistry()
+        assert registry.name("environment-font") == "Environment-Font"
+        assert registry.name("OpenSans-Regular") == "OpenSans-Regular"
+
+    def test_font_path_variable_missing_directory(self, tmpdir, monkeypatch):
+        self.copy_font(tmpdir, "Environment-Font")
+        monkeypatch.setenv(
+            "MULTIFORMAT_FONT_PATH",
+            os.pathsep.join([str(tmpdir.join("missing")),
+                             str(tmpdir)]))
+        registry = _FontRegistry()
+        assert registry.name("OpenSans-Regular") == "OpenSans-Regular"
+        assert registry.name("environment-font") == "Environment-Font"
+        assert registry.loaded
+
+    def test_documents_do_not_scan(self, monkeypatch):
+        Document()
+
+        def listdir(path):
+            raise AssertionError("Font directory scanned")
+
+        monkeypatch.setattr(os, "listdir", listdir)
+        document = Document()
+        document.draw_string("Text", 100, 100, "left", "OpenSans-Regular",
+                             40, "#000")
+
+    def test_unknown_font(self):
+        with pytest.raises(RuntimeError):
+            Document().draw_string("Text", 100, 100, "left", "Missing", 40,
+                                   "#000")
+        with pytest.raises(KeyError):
+            _font_path("Missing")
@@ -1,6 +1,7 @@
 import pytest
 from io import BytesIO
 from filecmp import cmp
+from PIL import Image
 from context import Document
 
 
@@ -95,3 +96,273 @@ class TestGenerators:
         document = self.new_populated_document()
         pdf_path = tmpdir.join("pdf_generation_test")
         document.generate_pdf(pdf_path)
+
+    @pytest.mark.parametrize("page,embed_fonts", [
+        (None, True),
+        (2, False),
+    ])
+    def test_generate_svg(self, page, embed_fonts):
+        document = self.new_populated_document()
+        f = BytesIO()
+        document.generate_svg(
+            "svg_test", page=page, file_object=f, embed_fonts=embed_fonts)
+        svg = f.getvalue().decode("utf-8")
+        assert svg.startswith('<?xml version="1.0" encoding="UTF-8"?>')
+        assert svg.endswith("</svg>\n")
+        assert ("@font-face" in svg) == embed_fonts
+        assert "Page {}".format(page or 1) in svg
+
+    def test_generate_svg_default(self):
+        document = Document("a4", "portrait")
+        document.draw_string("One", 100, 100, "left", "OpenSans-Regular", 40,
+                             "#000")
+        document.draw_string("Two", 100, 200, "left", "OpenSans-Bold", 40,
+                             "#000")
+        document.draw_rectangle(500, 600, -200, -100, "#f00")
+        f = BytesIO()
+        document.generate_svg("svg_test", file_object=f)
+        svg = f.getvalue().decode("utf-8")
+        assert "@font-face" not in svg
+        assert len(svg) < 2000
+        assert """font-family='"OpenSans-Bold", sans-serif'""" in svg
+        assert '<rect x="300" y="500" width="200" height="100"' in svg
+
+    def test_generated_svg_files(self, tmpdir):
+        document = self.new_populated_document()
+        document.generate_svg(tmpdir.join("svg_generation_test"))
+        assert tmpdir.join("svg_generation_test.svg").check()
+        assert tmpdir.join("svg_generation_test_2.svg").check()
+
+    @pytest.mark.parametrize("mode,size,page,shape", [
+        ("RGB", None, 1, (2794, 2159, 3)),
+        ("rgba", (500, 500), 2, (500, 386, 4)),
+    ])
+    def test_generate_raster(self, mode, size, page, shape):
+        document = self.new_populated_document()
+        pages = document.generate_raster(mode=mode, size=size, page=page)
+        assert len(pages) == 1
+        assert pages[0].shape == shape
+        assert pages[0].readonly
+
+    def test_generate_raster_matches_image(self):
+        document = self.new_populated_document()
+        pages = document.generate_raster(size=(500, 500))
+        assert len(pages) == 2
+        f = BytesIO()
+        document.generate_image("image_test", "PNG", (500, 500), 2, f)
+        f.seek(0)
+        assert Image.open(f).tobytes() == pages[1].tobytes()
+
+    @pytest.mark.parametrize("dpi,shape", [
+        (72, (792, 612, 3)),
+        (150, (1650, 1275, 3)),
+        (300, (3300, 2550, 3)),
+    ])
+    def test_generate_raster_dpi(self, dpi, shape):
+        document = self.new_populated_document()
+        pages = document.generate_raster(dpi=dpi, page=1)
+        assert pages[0].shape == shape
+
+    @pytest.mark.parametrize("image_format", ["PNG", "JPEG"])
+    def test_generate_image_dpi(self, image_format):
+        document = self.new_populated_document()
+        f = BytesIO()
+        document.generate_image(
+            "image_test", image_format, file_object=f, dpi=150)
+        f.seek(0)
+        image = Image.open(f)
+        assert image.size == (1275, 1650)
+        assert [round(value) for value in image.info["dpi"]] == [150, 150]
+        # The heading is drawn at the font size for the resolution.
+        heading = image.convert("L").crop((540, 300, 1275, 500))
+        assert heading.getextrema()[0] < 64
+
+    @pytest.mark.parametrize("options", [
+        {"dpi": 0},
+        {"dpi": "a"},
+        {"dpi": 300, "size": (500, 500)},
+    ])
+    def test_generate_image_invalid_dpi(self, options):
+        document = self.new_populated_document()
+        with pytest.raises(RuntimeError):
+            document.generate_image(
+                "image_test", "PNG", file_object=BytesIO(), **options)
+
+    def test_generate_raster_invalid_mode(self):
+        document = self.new_populated_document()
+        with pytest.raises(RuntimeError):
+            document.generate_raster(mode="CMYK")
+
+    @pytest.mark.parametrize("image_format,options", [
+        ("PNG", {"compress_level": 1}),
+        ("PNG", {"compress_level": 9, "optimize": True, "colors": 16}),
+        ("JPEG", {"quality": 50, "progressive": True, "optimize": True}),
+        ("GIF", {"colors": 8}),
+    ])
+    def test_generate_image_encoder_options(self, image_format, options):
+        document = self.new_populated_document()
+        f = BytesIO()
+        document.generate_image(
+            "image_test", image_format, size=(500, 500), file_object=f,
+            **options)
+        f.seek(0)
+        image = Image.open(f)
+        assert image.format == image_format
+        if "colors" in options:
+            assert image.mode == "P"
+            assert len(image.getcolors()) <= options["colors"]
+
+    @pytest.mark.parametrize("image_format,options", [
+        ("PNG", {"compress_level": 10}),
+        ("JPEG", {"quality": 0}),
+        ("JPEG", {"colors": 16}),
+        ("GIF", {"colors": 1}),
+        ("GIF", {"colors": "a"}),
+    ])
+    def test_generate_image_invalid_encoder_options(self, image_format,
+                                                    options):
+        document = self.new_populated_document()
+        with pytest.raises(RuntimeError):
+            document.generate_image(
+                "image_test", image_format, file_object=BytesIO(), **options)
+
+    def new_shapes_document(self, gray=False):
+        document = Document("a4", "portrait")
+        colors = ["#333", "#999", "#ccc"] if gray else [
+            "#2980b9", "#27ae60", "#c0392b"
+        ]
+        document.draw_rectangle(100, 100, 400, 400, colors[0], colors[1], 20)
+        document.draw_circle(800, 300, 150, colors[1], colors[2], 20)
+        document.draw_line(0, 800, document.w, 900, 30, colors[2])
+        return document
+
+    @pytest.mark.parametrize("gray,image_format,color_mode,expected_mode", [
+        (False, "PNG", "P", "P"),
+        (False, "PNG", "auto", "P"),
+        (False, "GIF", "auto", "P"),
+        (False, "JPEG", "auto", "RGB"),
+        (True, "PNG", "L", "L"),
+        (True, "JPEG", "auto", "L"),
+    ])
+    def test_generate_image_color_mode(self, gray, image_format, color_mode,
+                                       expected_mode):
+        document = self.new_shapes_document(gray)
+        f = BytesIO()
+        document.generate_image(
+            "image_test", image_format, file_object=f, color_mode=color_mode)
+        f.seek(0)
+        image = Image.open(f)
+        assert image.mode == expected_mode
+        if image_format == "PNG":
+            control = BytesIO()
+            document.generate_image("image_test", "PNG", file_object=control)
+            control.seek(0)
+            assert (image.convert("RGB").tobytes() == Image.open(control)
+                    .tobytes())
+
+    def test_generate_image_auto_color_mode_text(self):
+        document = self.new_populated_document()
+        f = BytesIO()
+        document.generate_image(
+            "image_test", "PNG", file_object=f, color_mode="auto")
+        f.seek(0)
+        assert Image.open(f).mode == "RGB"
+
+    def test_generate_image_palette_resize(self):
+        document = self.new_shapes_document()
+        f = BytesIO()
+        document.generate_image(
+            "image_test", "GIF", (500, 500), file_object=f, color_mode="P")
+        f.seek(0)
+        image = Image.open(f)
+        assert image.size == (353, 500)
+        assert len(image.getcolors()) <= 7
+
+    @pytest.mark.parametrize("image_format,color_mode", [
+        ("JPEG", "P"),
+        ("PNG", "CMYK"),
+    ])
+    def test_generate_image_invalid_color_mode(self, image_format,
+                                               color_mode):
+        document = self.new_shapes_document()
+        with pytest.raises(RuntimeError):
+            document.generate_image(
+                "image_test",
+                image_format,
+                file_object=BytesIO(),
+                color_mode=color_mode)
+
+    def test_generate_image_cull(self):
+        document = self.new_populated_document()
+        document.draw_rectangle(0, 0, document.w, document.h, "#fff")
+        document.draw_string("Covered", 100, 100, "left", "OpenSans-Bold",
+                             50, (0, 0, 0))
+        culled = BytesIO()
+        document.generate_image(
+            "image_test", "PNG", page=2, file_object=culled, cull=True)
+        assert document.render_stats["occluded"] == 7
+        assert document.render_stats["drawn"] == 2
+        control = BytesIO()
+        document.generate_image(
+            "image_test", "PNG", page=2, file_object=control)
+        assert document.render_stats["drawn"] == 9
+        assert culled.getvalue() == control.getvalue()
+
+    @pytest.mark.parametrize("bbox,scale,size", [
+        ((0, 600, 1000, 1000), 0.5, (500, 200)),
+        ((1000, 700, 1400, 1300), 1, (400, 600)),
+        ((1000, 700, 1400, 1300), 2, (800, 1200)),
+    ])
+    def test_render_region(self, bbox, scale, size):
+        document = self.new_populated_document()
+        full = document.render_region(1, (0, 0, document.w, document.h),
+                                      scale)
+        region = document.render_region(1, bbox, scale)
+        assert region.size == size
+        crop = full.crop([int(value * scale) for value in bbox])
+        assert crop.tobytes() == region.tobytes()
+        assert document.render_stats["outside"] > 0
+
+    @pytest.mark.parametrize("page,bbox,scale", [
+        (3, (0, 0, 100, 100), 1),
+        (1, (100, 0, 0, 100), 1),
+        (1, (0, 0, 100), 1),
+        (1, (0, 0, 100, 100), 0),
+    ])
+    def test_render_region_invalid(self, page, bbox, scale):
+        document = self.new_populated_document()
+        with pytest.raises(RuntimeError):
+            document.render_region(page, bbox, scale)
+
+    def test_generate_tiles(self):
+        document = self.new_populated_document()
+        tiles = list(document.generate_tiles(page=2, tile_size=512))
+        levels = [level for level, column, row, image in tiles]
+        assert levels == [0] + [1] * 4 + [2] * 16 + [3] * 56
+        level, column, row, image = tiles[-1]
+        assert (column, row) == (6, 7)
+        assert image.size == (93, 512)
+        tile = document.render_tile(2, 2, 1, 1, tile_size=512)
+        assert tile.tobytes() == tiles[5 + 5][3].tobytes()
+
+    @pytest.mark.parametrize("level", [1, 2, 3])
+    def test_tiles_match_page(self, level):
+        document = self.new_populated_document()
+        document.draw_polyline([(x * 37.3, 1500 + x % 7 * 41.7)
+                                for x in range(57)], 4, "#c0392b")
+        document.draw_polygon([(300.4, 1900.6), (1700.2, 2000.9),
+                               (900.7, 2600.3)], "#27ae60", "#000", 7)
+        scale = document._tile_scale(level, 100)
+        full = document.render_region(2, (0, 0, document.w, document.h),
+                                      scale)
+        stitched = Image.new("RGB", full.size, "black")
+        for tile_level, column, row, image in document.generate_tiles(
+                page=2, tile_size=100, levels=level + 1):
+            if tile_level == level:
+                stitched.paste(image, (column * 100, row * 100))
+        assert stitched.tobytes() == full.tobytes()
+
+    def test_render_tile_invalid(self):
+        document = self.new_populated_document()
+        with pytest.raises(RuntimeError):
+            document.render_tile(1, 0, 1, 0)
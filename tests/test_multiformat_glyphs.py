@@ -0,0 +1,64 @@
+import pytest
+from PIL import Image, ImageDraw
+from context import Document
+from multiformat.glyphs import (_RunCache, _draw_text, _run_cache, _truetype,
+                                set_text_cache_limit)
+
+
+class TestGlyphs:
+    def setup_method(self, method):
+        _run_cache.clear()
+
+    def teardown_method(self, method):
+        set_text_cache_limit(32 * 2**20)
+        _run_cache.clear()
+
+    @pytest.mark.parametrize("mode,ink", [("RGB", (41, 128, 185)),
+                                          ("L", 90), ("P", 1)])
+    @pytest.mark.parametrize("x", [20, 20.5, -10, -10.5])
+    def test_cached_text_matches_draw_text(self, mode, ink, x):
+        direct = Image.new(mode, (200, 80), 0)
+        cached = direct.copy()
+        ImageDraw.Draw(direct).text((x, 10), "gj 1,234.56", fill=ink,
+                                    font=_truetype("OpenSans-Regular", 30))
+        draw = ImageDraw.Draw(cached)
+        for _ in range(2):
+            _draw_text(draw, (x, 10), "gj 1,234.56", "OpenSans-Regular", 30,
+                       ink)
+        ImageDraw.Draw(direct).text((x, 10), "gj 1,234.56", fill=ink,
+                                    font=_truetype("OpenSans-Regular", 30))
+        assert cached.tobytes() == direct.tobytes()
+
+    def test_runs_are_shared_across_colors(self):
+        document = Document("letter", "portrait")
+        for row in range(10):
+            document.draw_string("1.00", 100, 100 + row * 100, "left",
+                                 "OpenSans-Regular", 40,
+                                 "#000" if row % 2 else "#f00")
+        document.generate_raster()
+        assert len(_run_cache) == 1
+        assert _run_cache.misses == 1
+        assert _run_cache.hits == 9
+
+    def test_eviction_respects_limit(self):
+        cache = _RunCache(max_bytes=1000, max_entry_bytes=400)
+        for i in range(10):
+            cache.get(i, lambda: (Image.new("L", (10, 30)), 0, 0))
+        assert cache.bytes <= 1000
+        assert list(cache.runs) == [7, 8, 9]
+        cache.get(7, lambda: None)
+        cache.get(10, lambda: (Image.new("L", (10, 30)), 0, 0))
+        assert list(cache.runs) == [9, 7, 10]
+        cache.get(11, lambda: (Image.new("L", (30, 30)), 0, 0))
+        assert 11 not in cache.runs
+        cache.resize(300)
+        assert list(cache.runs) == [10]
+
+    def test_disabled_cache_draws_text(self):
+        set_text_cache_limit(0)
+        document = Document("letter", "portrait")
+        document.draw_string("Text", 100, 100, "left", "OpenSans-Regular", 40,
+                             "#000")
+        pixels = document.generate_raster(page=1)[0]
+        assert len(_run_cache) == 0
+        assert min(pixels.tobytes()) < 255
@@ -0,0 +1,135 @@
+import pickle
+import re
+from io import BytesIO
+import pytest
+from PIL import Image
+from context import Document, shared_memory
+from multiformat.images import _image_cache, set_image_cache_limit
+
+
+def logo(image_format="PNG", mode="RGB", size=(60, 30)):
+    # Encoded test image, red on the left and blue on the right.
+    image = Image.new(mode, size, (255, 0, 0, 255)[:len(mode)])
+    image.paste((0, 0, 255, 255)[:len(mode)], (size[0] // 2, 0) + size)
+    output = BytesIO()
+    image.save(output, image_format)
+    return output.getvalue()
+
+
+class TestImages:
+    def setup_method(self, method):
+        _image_cache.clear()
+
+    def teardown_method(self, method):
+        set_image_cache_limit(64 * 2**20)
+        _image_cache.clear()
+
+    def test_draw_image_sources(self, tmpdir):
+        path = tmpdir.join("logo.png")
+        path.write_binary(logo())
+        document = Document("letter", "portrait")
+        document.draw_image(str(path), 100, 100, 600)
+        document.draw_image(BytesIO(logo()), 100, 500, 600, 100)
+        document.draw_image(logo(), 100, 900, 600, 100)
+        elements = document._document
+        assert [item["h"] for item in elements] == [300, 100, 100]
+        assert len({item["image"] for item in elements}) == 1
+        assert len(document._images) == 1
+
+    @pytest.mark.parametrize("image", [b"not an image", "missing.png", 5])
+    def test_invalid_image(self, image):
+        document = Document("letter", "portrait")
+        with pytest.raises(RuntimeError, match="Invalid image"):
+            document.draw_image(image, 100, 100, 600)
+
+    def test_image_within_document(self):
+        document = Document("letter", "portrait")
+        with pytest.raises(RuntimeError):
+            document.draw_image(logo(), 2000, 100, 600)
+        with pytest.raises(RuntimeError):
+            document.draw_image(logo(), 100, 100, 600, 5000)
+        assert len(document._images) == 0
+
+    @pytest.mark.parametrize("mode", ["RGB", "auto"])
+    def test_image_pixels(self, mode):
+        document = Document("letter", "portrait")
+        document.draw_image(logo(), 100, 100, 600)
+        output = BytesIO()
+        document.generate_image(
+            "images", "png", file_object=output, color_mode=mode)
+        page = Image.open(output).convert("RGB")
+        assert page.getpixel((200, 200)) == (255, 0, 0)
+        assert page.getpixel((600, 200)) == (0, 0, 255)
+        assert page.getpixel((200, 450)) == (255, 255, 255)
+
+    def test_transparent_image(self):
+        document = Document("letter", "portrait")
+        document.draw_rectangle(0, 0, 1000, 1000, fill_color=(0, 255, 0))
+        image = Image.new("RGBA", (10, 10), (255, 0, 0, 255))
+        image.paste((0, 0, 0, 0), (5, 0, 10, 10))
+        output = BytesIO()
+        image.save(output, "PNG")
+        document.draw_image(output.getvalue(), 100, 100, 600)
+        page = document.render_region(1, (0, 0, 1000, 1000))
+        assert page.getpixel((200, 200)) == (255, 0, 0)
+        assert page.getpixel((600, 200)) == (0, 255, 0)
+
+    def test_decoded_once_per_size(self):
+        document = Document("letter", "portrait")
+        for page in range(5):
+            if page:
+                document.insert_page_break()
+            document.draw_image(logo("JPEG"), 100, 100, 600)
+            document.draw_image(logo("JPEG"), 100, 500, 300)
+        document.generate_raster()
+        document.generate_raster()
+        assert len(_image_cache) == 2
+        assert _image_cache.misses == 2
+        assert _image_cache.hits == 18
+
+    def test_disabled_cache_draws_image(self):
+        set_image_cache_limit(0)
+        document = Document("letter", "portrait")
+        document.draw_image(logo(), 100, 100, 600)
+        page = document.render_region(1, (0, 0, 1000, 1000))
+        assert page.getpixel((200, 200)) == (255, 0, 0)
+        assert len(_image_cache) == 0
+
+    def test_pdf_embeds_image_once(self):
+        document = Document("letter", "portrait")
+        for page in range(4):
+            if page:
+                document.insert_page_break()
+            document.draw_image(logo(), 100, 100, 600)
+            document.draw_image(logo(), 100, 500, 300)
+        output = BytesIO()
+        document.generate_pdf("images", file_object=output)
+        data = output.getvalue()
+        assert len(re.findall(rb"/Subtype /Image", data)) == 1
+        references = re.findall(rb"/FormXob\.\w+ (\d+) 0 R", data)
+        assert len(references) == 4
+        assert len(set(references)) == 1
+
+    def test_svg_defines_image_once_per_page(self):
+        document = Document("letter", "portrait")
+        document.draw_image(logo("BMP"), 100, 100, 600)
+        document.draw_image(logo("BMP"), 100, 500, 300)
+        output = BytesIO()
+        document.generate_svg("images", file_object=output)
+        svg = output.getvalue().decode("utf-8")
+        assert svg.count("<symbol") == 1
+        assert svg.count("<use") == 2
+        assert "data:image/png;base64," in svg
+
+    @shared_memory
+    def test_images_follow_shared_pages(self):
+        document = Document("letter", "portrait")
+        document.draw_image(logo(), 100, 100, 600)
+        copy = Document.concatenate([document])
+        restored = pickle.loads(pickle.dumps(copy))
+        with document.share_elements() as store:
+            attached = Document.attach_elements(store.name)
+            assert attached._document == document._document
+            for result in (copy, restored, attached):
+                page = result.render_region(1, (0, 0, 1000, 1000))
+                assert page.getpixel((200, 200)) == (255, 0, 0)
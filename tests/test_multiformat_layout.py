@@ -0,0 +1,195 @@
+import pytest
+from context import Document
+from multiformat.metrics import _string_width
+
+
+class TestLayout:
+    def setup_method(self, method):
+        self.document = Document("a4", "portrait")
+
+    def strings(self):
+        return [
+            item for item in self.document._document
+            if item["type"] == "string"
+        ]
+
+    def test_draw_paragraph_wrap(self):
+        text = "The quick brown fox jumps over the lazy dog. " * 10
+        y = self.document.draw_paragraph(text, 100, 200, 1000,
+                                         "OpenSans-Regular", 50, "#000")
+        strings = self.strings()
+        assert len(strings) > 1
+        assert [item["y"] for item in strings
+                ] == [200 + 60 * line for line in range(len(strings))]
+        assert y == 200 + 60 * len(strings)
+        for item in strings:
+            assert _string_width(item["string"], item["font"],
+                                 item["size"]) <= 1000
+        assert " ".join(item["string"] for item in strings) == text.strip()
+
+    def test_draw_paragraph_newlines(self):
+        self.document.draw_paragraph("One\n\nTwo", 100, 200, 1000,
+                                     "OpenSans-Regular", 50, "#000",
+                                     line_height=100)
+        assert [(item["string"], item["y"]) for item in self.strings()
+                ] == [("One", 200), ("Two", 400)]
+
+    def test_draw_paragraph_long_word(self):
+        self.document.draw_paragraph("A" * 100, 100, 200, 500,
+                                     "OpenSans-Regular", 50, "#000")
+        strings = self.strings()
+        assert "".join(item["string"] for item in strings) == "A" * 100
+        for item in strings:
+            assert _string_width(item["string"], item["font"],
+                                 item["size"]) <= 500
+
+    @pytest.mark.parametrize("alignment,x,item_alignment", [
+        ("left", 100, "left"),
+        ("right", 1100, "right"),
+        ("middle", 600, "middle"),
+    ])
+    def test_draw_paragraph_alignment(self, alignment, x, item_alignment):
+        self.document.draw_paragraph("Some text", 100, 200, 1000,
+                                     "OpenSans-Regular", 50, "#000",
+                                     alignment)
+        assert self.strings()[0]["x"] == x
+        assert self.strings()[0]["alignment"] == item_alignment
+
+    def test_draw_paragraph_justify(self):
+        text = "word " * 60
+        self.document.draw_paragraph(text, 100, 200, 1000,
+                                     "OpenSans-Regular", 50, "#000",
+                                     "justify")
+        strings = self.strings()
+        first_line = [item for item in strings if item["y"] == 200]
+        assert all(item["string"] == "word" for item in first_line)
+        assert strings[-1]["string"].startswith("word word")
+        last = first_line[-1]
+        right = last["x"] + _string_width("word", "OpenSans-Regular", 50)
+        assert 999 <= right <= 1101
+
+    def test_draw_paragraph_justify_baseline(self):
+        # Words with and without descenders share the line's x-height.
+        self.document.draw_paragraph("max gyp " * 20, 100, 200, 1000,
+                                     "OpenSans-Regular", 50, "#000",
+                                     "justify")
+        line = self.document.render_region(1, (0, 100, 1200, 260))
+        tops = set()
+        for item in self.strings():
+            if item["y"] != 200:
+                continue
+            x = int(item["x"])
+            w = int(_string_width(item["string"], "OpenSans-Regular", 50))
+            # Ink of the first glyph, which is x-height high in both words.
+            ink = line.crop((x, 0, x + w // 3, 160)).convert("L").point(
+                lambda value: 255 if value < 128 else 0)
+            tops.add(ink.getbbox()[1])
+        assert len(tops) == 1
+
+    def test_draw_paragraph_page_flow(self):
+        text = "Flowing text across pages. " * 400
+        self.document.draw_paragraph(text, 100, 300, 1900,
+                                     "OpenSans-Regular", 50, "#000",
+                                     top=200, bottom=2800)
+        assert self.document.pages > 1
+        page = 1
+        for item in self.document._document:
+            if item["type"] == "page_break":
+                page += 1
+            else:
+                assert 200 <= item["y"] <= 2800
+        first_on_page_two = self.document._document[
+            self.document._document.index({"type": "page_break"}) + 1]
+        assert first_on_page_two["y"] == 200
+
+    @pytest.mark.parametrize("args", [
+        ("Text", 100, 200, 3000, "OpenSans-Regular", 50, "#000"),
+        ("Text", 100, 200, 1000, "OpenSans-Regular", 50, "#000", "top"),
+        ("Text", 100, 200, 1000, "Verdana", 50, "#000"),
+    ])
+    def test_draw_paragraph_error(self, args):
+        with pytest.raises(RuntimeError):
+            self.document.draw_paragraph(*args)
+
+    def test_draw_paragraph_error_area(self):
+        with pytest.raises(RuntimeError):
+            self.document.draw_paragraph("Text", 100, 200, 1000,
+                                         "OpenSans-Regular", 50, "#000",
+                                         top=2000, bottom=1000)
+
+    def test_draw_table(self):
+        rows = [["Date", "Description", "Amount"]] + [[
+            "2018-01-01", "Item {}".format(row), "{:.2f}".format(row * 1.5)
+        ] for row in range(200)]
+        y = self.document.draw_table(
+            rows,
+            100,
+            100, [300, 1200, 400],
+            "OpenSans-Regular",
+            40,
+            "#000",
+            alignments=["left", "left", "right"],
+            header_rows=1,
+            border_color="#ccc",
+            border_width=2)
+        assert self.document.pages > 1
+        headers = [
+            item for item in self.strings() if item["string"] == "Date"
+        ]
+        assert len(headers) == self.document.pages
+        lines = [
+            item for item in self.document._document
+            if item["type"] == "line"
+        ]
+        assert len(lines) == 200 + self.document.pages
+        assert lines[-1]["y"] == y
+        amounts = [item for item in self.strings() if item["x"] == 1890]
+        assert all(item["alignment"] == "right" for item in amounts)
+
+    def test_draw_table_row_taller_than_header_space(self):
+        y = self.document.draw_table(
+            [["Header"], ["a\nb\nc\nd\ne\nf\ng"], ["x"]],
+            100,
+            100, [1000],
+            "OpenSans-Regular",
+            40,
+            "#000",
+            header_rows=1,
+            top=100,
+            bottom=500)
+        assert self.document.pages == 3
+        first = self.strings()[0]["y"]
+        assert [(item["string"], item["y"]) for item in self.strings()
+                if item["string"] in ("Header", "a", "x")] == [
+                    ("Header", first),
+                    ("a", first),
+                    ("Header", first),
+                    ("x", first + 68),
+                ]
+        assert y == 100 + 68 * 2
+
+    def test_draw_table_wrapped_cell(self):
+        y = self.document.draw_table([["Short", "A much longer cell " * 5]],
+                                     100,
+                                     100, [300, 500],
+                                     "OpenSans-Regular",
+                                     40,
+                                     "#000",
+                                     padding=10)
+        lines = len([
+            item for item in self.strings() if item["string"] != "Short"
+        ])
+        assert lines > 1
+        assert y == 100 + 20 + 48 * lines
+
+    @pytest.mark.parametrize("rows,widths,alignments", [
+        ([["a", "b"]], [300], None),
+        ([["a"]], ["x"], None),
+        ([["a"]], [3000], None),
+        ([["a"]], [300], ["left", "right"]),
+    ])
+    def test_draw_table_error(self, rows, widths, alignments):
+        with pytest.raises(RuntimeError):
+            self.document.draw_table(rows, 100, 100, widths,
+                                     "OpenSans-Regular", 40, "#000",
+                                     alignments)
@@ -0,0 +1,115 @@
+import weakref
+from io import BytesIO
+import pytest
+from PIL import Image, ImageChops
+from context import Document
+from multiformat.generate_image import _Image, set_memory_limit
+
+
+def new_document(pages=1):
+    document = Document("a4", "portrait")
+    for page in range(pages):
+        if page:
+            document.insert_page_break()
+        document.draw_rectangle(100, 100, 1900, 1200, "#2980b9", "#000", 10)
+        document.draw_circle(1000, 1800, 500, "#e67e22", "#000", 20)
+        document.draw_polyline([(100, 2500), (1000, 2900), (2000, 2400)], 30,
+                               "#27ae60")
+        document.draw_string("Statement", 200, 2200, "left",
+                             "OpenSans-Regular", 120, "#000")
+    return document
+
+
+def generate(document, **options):
+    output = BytesIO()
+    document.generate_image("memory", "png", file_object=output, **options)
+    return Image.open(output).convert("RGB")
+
+
+class TestMemory:
+    def teardown_method(self, method):
+        set_memory_limit(None)
+
+    def test_stats_without_limit(self):
+        document = new_document()
+        generate(document)
+        canvas = document.w * document.h * 4
+        assert document.render_stats["memory_estimate"] == canvas
+        assert document.render_stats["memory_peak"] == canvas
+        assert document.render_stats["bands"] == 0
+
+    @pytest.mark.parametrize("color_mode,colors", [("RGB", None),
+                                                   ("P", None),
+                                                   ("RGB", 16)])
+    def test_downscaled_page_is_drawn_in_bands(self, color_mode, colors):
+        full = generate(
+            new_document(), size=(800, 800), color_mode=color_mode,
+            colors=colors)
+        set_memory_limit(5 * 2**20)
+        document = new_document()
+        banded = generate(
+            document, size=(800, 800), color_mode=color_mode, colors=colors)
+        stats = document.render_stats
+        assert stats["bands"] > 1
+        assert stats["memory_peak"] <= stats["memory_estimate"] <= 5 * 2**20
+        assert banded.size == full.size
+        difference = ImageChops.difference(full, banded).getextrema()
+        assert max(high for low, high in difference) <= 1
+
+    def test_banded_pages_and_raster(self, tmpdir):
+        set_memory_limit(5 * 2**20)
+        document = new_document(pages=2)
+        document.generate_image(
+            str(tmpdir.join("banded")), "png", size=(400, 400))
+        for name in ("banded.png", "banded_2.png"):
+            with Image.open(str(tmpdir.join(name))) as image:
+                assert image.size == (282, 400)
+                assert image.getpixel((100, 50)) == (41, 128, 185)
+        pages = document.generate_raster(size=(400, 400))
+        assert [page.shape for page in pages] == [(400, 282, 3)] * 2
+        assert document.render_stats["bands"] > 2
+
+    @pytest.mark.parametrize("options", [{}, {"size": (4000, 4000)},
+                                         {"dpi": 600}])
+    def test_render_over_limit_is_rejected(self, options):
+        set_memory_limit(5 * 2**20)
+        with pytest.raises(RuntimeError, match="memory limit is 5.0 MB"):
+            generate(new_document(), **options)
+
+    def test_small_render_within_limit(self):
+        set_memory_limit(5 * 2**20)
+        document = new_document()
+        generate(document, dpi=72)
+        assert document.render_stats["bands"] == 0
+        assert document.render_stats["memory_peak"] <= 5 * 2**20
+
+    def test_memory_limit_per_render(self):
+        document = new_document()
+        generate(document, size=(400, 400), memory_limit=5 * 2**20)
+        assert document.render_stats["bands"] > 1
+        generate(document, size=(400, 400))
+        assert document.render_stats["bands"] == 0
+        set_memory_limit(5 * 2**20)
+        generate(document, size=(400, 400), memory_limit=2**30)
+        assert document.render_stats["bands"] == 0
+        previews = document.generate_previews([(400, 400)],
+                                              memory_limit=2**30)
+        assert len(previews) == 1
+
+    @pytest.mark.parametrize("limit", [0, -1, 2.5, "5", True])
+    def test_invalid_memory_limit(self, limit):
+        with pytest.raises(RuntimeError, match="Invalid memory limit"):
+            set_memory_limit(limit)
+        with pytest.raises(RuntimeError, match="Invalid memory limit"):
+            generate(new_document(), memory_limit=limit)
+        with pytest.raises(RuntimeError, match="Invalid memory limit"):
+            new_document().generate_raster(memory_limit=limit)
+
+    def test_page_released_before_next_page(self, tmpdir):
+        renderer = _Image(str(tmpdir.join("page")), "png", (200, 200))
+        renderer.draw_rectangle(0, 0, 100, 100, "#000", None, 0)
+        page = weakref.ref(renderer.image)
+        renderer.new_page()
+        assert page() is None
+        renderer.save()
+        assert renderer.image is None
@@ -0,0 +1,175 @@
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import pytest
+from context import Document, shared_memory
+from multiformat.parallel import _page_chunks, _process_context
+from multiformat.pdfmerge import _PDFFile
+
+
+def attached_strings(name, page):
+    document = Document.attach_elements(name)
+    return [
+        item["string"] for item in document._pages[page - 1].elements
+        if item["type"] == "string"
+    ]
+
+
+class TestParallel:
+    def new_document(self, pages):
+        document = Document("a4", "portrait")
+        document.title = "Pack"
+        for page in range(pages):
+            if page:
+                document.insert_page_break()
+            document.draw_rectangle(100, 100, 400, 200, "#2980b9")
+            document.draw_string("Page {}".format(page + 1), 100, 500, "left",
+                                 "OpenSans-Regular", 40, "#000")
+            document.draw_string("Total €{}".format(page), 100, 600, "left",
+                                 "OpenSans-Bold", 40, "#000")
+        return document
+
+    def generate(self, document, workers):
+        pdf = BytesIO()
+        document.generate_pdf("parallel", file_object=pdf, workers=workers)
+        return pdf.getvalue()
+
+    @pytest.mark.parametrize("pages,chunks,ranges", [
+        (1, 4, [(1, 1)]),
+        (4, 4, [(1, 1), (2, 2), (3, 3), (4, 4)]),
+        (10, 4, [(1, 3), (4, 6), (7, 9), (10, 10)]),
+        (5, 2, [(1, 3), (4, 5)]),
+    ])
+    def test_page_chunks(self, pages, chunks, ranges):
+        assert _page_chunks(pages, chunks) == ranges
+
+    def test_parallel_pdf(self):
+        document = self.new_document(9)
+        data = self.generate(document, 3)
+        assert data.startswith(b"%PDF")
+        pdf = _PDFFile(data)
+        assert len(pdf.pages()) == 9
+        assert document.render_stats["elements"] == 27
+        assert b"/Title (Pack)" in data
+
+    def test_parallel_pdf_shares_fonts(self):
+        data = self.generate(self.new_document(9), 3)
+        assert data.count(b"/FontFile2") == 2
+        assert len(set(re.findall(rb"/Font \d+ 0 R", data))) == 1
+
+    def test_parallel_pdf_cross_reference(self):
+        data = self.generate(self.new_document(5), 2)
+        start = int(data[data.rindex(b"startxref") + 9:].split()[0])
+        offsets = re.findall(rb"(\d{10}) 00000 n", data[start:])
+        for number, offset in enumerate(offsets, 1):
+            assert data[int(offset):].startswith(b"%d 0 obj" % number)
+
+    def test_parallel_pdf_file(self, tmpdir):
+        document = self.new_document(4)
+        document.generate_pdf(str(tmpdir.join("parallel")), workers=2)
+        with open(str(tmpdir.join("parallel.pdf")), "rb") as pdf:
+            assert len(_PDFFile(pdf.read()).pages()) == 4
+
+    def test_single_page_is_serial(self):
+        document = self.new_document(1)
+        assert len(_PDFFile(self.generate(document, 4)).pages()) == 1
+
+    @pytest.mark.parametrize("workers", [0, "a"])
+    def test_invalid_workers(self, workers):
+        with pytest.raises(RuntimeError):
+            self.generate(self.new_document(2), workers)
+
+    @pytest.mark.parametrize("chosen,methods,method", [
+        (None, ["fork", "spawn", "forkserver"], "forkserver"),
+        (None, ["spawn", "fork", "forkserver"], "spawn"),
+        (None, ["fork", "spawn"], "fork"),
+        ("fork", ["fork", "spawn", "forkserver"], "fork"),
+    ])
+    def test_process_context(self, monkeypatch, chosen, methods, method):
+        monkeypatch.setattr(multiprocessing, "get_start_method",
+                            lambda allow_none=False: chosen)
+        monkeypatch.setattr(multiprocessing, "get_all_start_methods",
+                            lambda: methods)
+        monkeypatch.setattr(multiprocessing, "get_context",
+                            lambda method=None: method)
+        assert _process_context() == method
+
+    @shared_memory
+    def test_shared_elements(self):
+        document = self.new_document(3)
+        document.draw_line(10.5, 20, 300, 20.25, 3, "#f00")
+        document.draw_rectangle(10, 10, 100, 100, None, "#0f0", 5)
+        document.draw_circle(500, 500, 50, "#00f")
+        with document.share_elements() as store:
+            attached = Document.attach_elements(store.name)
+            assert attached.pages == 3
+            assert attached.title == "Pack"
+            assert attached.author is None
+            assert attached._document == document._document
+            assert attached.elements_at(3, 500, 500)[-1]["type"] == "circle"
+            attached._pages[0].store.close()
+
+    @shared_memory
+    def test_attached_document_copies_on_write(self):
+        document = self.new_document(2)
+        with document.share_elements() as store:
+            attached = Document.attach_elements(store.name)
+            attached.draw_string("added", 100, 700, "left",
+                                 "OpenSans-Regular", 40, "#000")
+            assert len(attached._pages[1]) == 4
+            assert Document.attach_elements(
+                store.name)._pages[1].store.page_range(1) == (3, 6)
+            assert attached.generate_raster(page=1)[0].tobytes() == \
+                document.generate_raster(page=1)[0].tobytes()
+
+    @shared_memory
+    @pytest.mark.skipif(
+        "fork" not in multiprocessing.get_all_start_methods(),
+        reason="requires fork")
+    def test_attach_in_worker(self):
+        document = self.new_document(3)
+        with document.share_elements() as store:
+            with ProcessPoolExecutor(
+                    1, mp_context=multiprocessing.get_context("fork")) as pool:
+                assert pool.submit(attached_strings, store.name,
+                                   2).result() == ["Page 2", "Total €1"]
+
+    @shared_memory
+    def test_attach_in_independent_process(self):
+        document = self.new_document(2)
+        store = document.share_elements()
+        try:
+            script = ("import sys; from multiformat.multiformat import "
+                      "Document; document = Document.attach_elements("
+                      "sys.argv[1]); print(document.pages); "
+                      "document._pages[0].store.close()")
+            result = subprocess.run(
+                [sys.executable, "-c", script, store.name],
+                cwd=os.path.dirname(os.path.dirname(__file__)),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+                check=True)
+            assert result.stdout == "2\n"
+            assert "leaked" not in result.stderr
+            attached = Document.attach_elements(store.name)
+            assert attached._document == document._document
+            attached._pages[0].store.close()
+        finally:
+            store.close()
+            store.unlink()
+
+    @shared_memory
+    def test_attach_invalid_memory(self):
+        from multiprocessing.shared_memory import SharedMemory
+        memory = SharedMemory(create=True, size=64)
+        try:
+            with pytest.raises(ValueError):
+                Document.attach_elements(memory.name)
+        finally:
+            memory.close()
+            memory.unlink()
@@ -0,0 +1,98 @@
+import pickle
+from array import array
+from io import BytesIO
+import pytest
+from context import Document, shared_memory
+
+ZIGZAG = [(100, 100), (300, 300), (500, 100), (700, 300)]
+TRIANGLE = [(100, 100), (900, 100), (500, 700)]
+
+
+class TestPaths:
+    def test_polyline_stores_points_in_array(self):
+        document = Document("letter", "portrait")
+        document.draw_polyline(ZIGZAG, 10, "#000")
+        document.draw_polyline(array("d", [0, 0, 10.5, 20]), 10, "#000")
+        document.draw_polyline([0, 0, 10.5, 20], 10, "#000")
+        first, second, third = document._document
+        assert first["points"] == array("d", [100, 100, 300, 300, 500, 100,
+                                               700, 300])
+        assert second["points"] == array("d", [0, 0, 10.5, 20])
+        assert third["points"] == second["points"]
+
+    def test_series_is_one_element(self):
+        document = Document("letter", "portrait")
+        points = [(x / 50, 1000 + (x % 200)) for x in range(100000)]
+        document.draw_polyline(points, 5, (41, 128, 185))
+        assert len(document._document) == 1
+        assert len(document._document[0]["points"]) == 200000
+
+    @pytest.mark.parametrize("points", [
+        [(100, 100)],
+        [(100, 100), (200, 200, 300)],
+        [(100, 100), (200, 2800)],
+        [(100, 100), (-1, 200)],
+        [(100, 100), (float("nan"), 200)],
+        [(100, 100), ("a", 200)],
+        array("d", [100, 100, 200]),
+        [100, 100, 200],
+        [100, 100, (200, 200)],
+        5,
+    ])
+    def test_invalid_polyline(self, points):
+        document = Document("letter", "portrait")
+        with pytest.raises(RuntimeError):
+            document.draw_polyline(points, 10, "#000")
+
+    def test_invalid_polygon(self):
+        document = Document("letter", "portrait")
+        with pytest.raises(RuntimeError):
+            document.draw_polygon(ZIGZAG[:2])
+        with pytest.raises(RuntimeError):
+            document.draw_polygon(ZIGZAG, fill_color=None)
+
+    def test_image_output(self):
+        document = Document("letter", "portrait")
+        document.draw_polygon(TRIANGLE, fill_color="#f00",
+                              border_color="#00f", border_width=20)
+        document.draw_polyline(ZIGZAG, 20, "#0f0")
+        page = document.render_region(1, (0, 0, 1000, 1000))
+        assert page.getpixel((500, 400)) == (255, 0, 0)
+        assert page.getpixel((800, 100)) == (0, 0, 255)
+        assert page.getpixel((300, 300)) == (0, 255, 0)
+        assert page.getpixel((900, 700)) == (255, 255, 255)
+
+    def test_hit_testing(self):
+        document = Document("letter", "portrait")
+        document.draw_polyline(ZIGZAG, 20, "#000")
+        document.draw_polygon(TRIANGLE, fill_color=None,
+                              border_color="#000", border_width=20)
+        assert [item["type"] for item in document.elements_at(1, 200, 200)
+                ] == ["polyline"]
+        assert document.elements_at(1, 500, 500) == []
+        assert [item["type"] for item in document.elements_at(1, 900, 105)
+                ] == ["polygon"]
+
+    def test_pdf_and_svg_output(self):
+        document = Document("letter", "portrait")
+        document.draw_polyline(ZIGZAG, 20, "#0f0")
+        document.draw_polygon(TRIANGLE, fill_color="#f00")
+        pdf = BytesIO()
+        document.generate_pdf("paths", file_object=pdf)
+        assert pdf.getvalue().startswith(b"%PDF")
+        svg = BytesIO()
+        document.generate_svg("paths", file_object=svg)
+        svg = svg.getvalue().decode("utf-8")
+        assert '<polyline points="100,100 300,300 500,100 700,300"' in svg
+        assert '<polygon points="100,100 900,100 500,700"' in svg
+
+    @shared_memory
+    def test_points_follow_shared_pages(self):
+        document = Document("letter", "portrait")
+        document.draw_polyline([(0.25, 1), (2000, 2500)], 10, "#000")
+        document.draw_polygon(TRIANGLE, fill_color="#f00")
+        restored = pickle.loads(pickle.dumps(document))
+        assert restored._document == document._document
+        with document.share_elements() as store:
+            attached = Document.attach_elements(store.name)
+            assert attached._document == document._document
@@ -0,0 +1,53 @@
+from io import BytesIO
+import pytest
+from PIL import Image, ImageChops
+from test_multiformat_reproducible import new_document
+
+SIZES = [(100, 100), (1000, 1000), (400, 400)]
+
+
+def open_image(data):
+    return Image.open(BytesIO(data)).convert("RGB")
+
+
+class TestPreviews:
+    def test_sizes_in_order(self):
+        previews = new_document().generate_previews(SIZES)
+        assert [open_image(data).size for data in previews] == [(70, 100),
+                                                                (707, 1000),
+                                                                (282, 400)]
+
+    def test_matches_separate_images(self):
+        document = new_document()
+        previews = document.generate_previews(SIZES, page=2)
+        for size, data in zip(SIZES, previews):
+            output = BytesIO()
+            document.generate_image(
+                "preview", "png", size=size, page=2, file_object=output)
+            difference = ImageChops.difference(
+                open_image(output.getvalue()), open_image(data))
+            assert max(high for low, high in difference.getextrema()) <= 24
+            if size == (1000, 1000):
+                assert difference.getbbox() is None
+
+    def test_upscaled_and_jpeg(self):
+        document = new_document()
+        previews = document.generate_previews([(3000, 3000), (3000, 3000)],
+                                              image_format="jpeg",
+                                              quality=80)
+        assert previews[0] == previews[1]
+        image = Image.open(BytesIO(previews[0]))
+        assert image.format == "JPEG"
+        assert image.size == (2121, 3000)
+
+    @pytest.mark.parametrize("options", [
+        {"sizes": []},
+        {"sizes": [(100, 0)]},
+        {"sizes": [100]},
+        {"sizes": SIZES, "image_format": "gif"},
+        {"sizes": SIZES, "page": 4},
+        {"sizes": SIZES, "quality": 0},
+    ])
+    def test_invalid_options(self, options):
+        with pytest.raises(RuntimeError):
+            new_document().generate_previews(**options)
@@ -0,0 +1,134 @@
+import pytest
+from context import Document
+from multiformat.renderer import (Renderer, get_backend, register_backend,
+                                  render)
+
+
+class _Recorder(Renderer):
+    # Backend that records the calls made by the renderer.
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.calls = []
+
+    @classmethod
+    def from_document(cls, document, file_name, file_object=None):
+        recorder = cls(file_name)
+        _Recorder.last = recorder
+        return recorder
+
+    def draw_string(self, string, x, y, alignment, font, size, color,
+                    baseline=False):
+        self.calls.append(("string", string))
+
+    def draw_line(self, x, y, x1, y1, width, color):
+        self.calls.append(("line", x, y, x1, y1))
+
+    def draw_rectangle(self, x, y, w, h, fill_color, border_color,
+                       border_width):
+        self.calls.append(("rectangle", x, y, w, h))
+
+    def draw_circle(self, x, y, radius, fill_color, border_color,
+                    border_width):
+        self.calls.append(("circle", x, y, radius))
+
+    def draw_image(self, image, x, y, w, h):
+        self.calls.append(("image", x, y, w, h))
+
+    def draw_polyline(self, points, width, color):
+        self.calls.append(("polyline", len(points)))
+
+    def draw_polygon(self, points, fill_color, border_color, border_width):
+        self.calls.append(("polygon", len(points)))
+
+    def new_page(self):
+        self.calls.append(("new_page", ))
+
+    def save(self):
+        self.calls.append(("save", ))
+
+
+class TestRenderer:
+    def setup_method(self, method):
+        register_backend("recorder", _Recorder)
+        self.document = Document("letter", "portrait")
+        self.document.draw_rectangle(0, 0, 200, 200, (0, 0, 0))
+        self.document.draw_string("Page 1", 100, 100, "left",
+                                  "OpenSans-Regular", 12, (0, 0, 0))
+        self.document.insert_page_break()
+        self.document.draw_circle(100, 100, 50, (0, 0, 0))
+        self.document.draw_line(0, 0, 100, 100, 1, (0, 0, 0))
+
+    def test_get_backend(self):
+        assert get_backend("Recorder") is _Recorder
+        with pytest.raises(KeyError):
+            get_backend("unknown")
+
+    def test_incomplete_backend(self):
+        class Partial(Renderer):
+            def save(self):
+                pass
+
+        with pytest.raises(TypeError):
+            Partial()
+
+    def test_render_all_pages(self):
+        self.document.generate("recorder", "test")
+        assert _Recorder.last.calls == [
+            ("rectangle", 0, 0, 200, 200),
+            ("string", "Page 1"),
+            ("new_page", ),
+            ("circle", 100, 100, 50),
+            ("line", 0, 0, 100, 100),
+            ("save", ),
+        ]
+
+    @pytest.mark.parametrize("page,calls", [
+        (1, [("rectangle", 0, 0, 200, 200), ("string", "Page 1"),
+             ("save", )]),
+        (2, [("circle", 100, 100, 50), ("line", 0, 0, 100, 100),
+             ("save", )]),
+    ])
+    def test_render_page(self, page, calls):
+        recorder = _Recorder("test")
+        render(self.document, recorder, page=page)
+        assert recorder.calls == calls
+
+    def test_generate_invalid_page(self):
+        with pytest.raises(RuntimeError):
+            self.document.generate("recorder", "test", page=3)
+
+    def test_render_cull_occluded(self):
+        self.document.draw_rectangle(0, 0, self.document.w, self.document.h,
+                                     (255, 255, 255))
+        self.document.draw_circle(100, 100, 50, (0, 0, 0))
+        self.document.generate("recorder", "test", page=2, cull=True)
+        assert _Recorder.last.calls == [
+            ("rectangle", 0, 0, self.document.w, self.document.h),
+            ("circle", 100, 100, 50),
+            ("save", ),
+        ]
+        assert self.document.render_stats == {
+            "elements": 4,
+            "drawn": 2,
+            "outside": 0,
+            "occluded": 2
+        }
+
+    def test_render_cull_partially_covered(self):
+        self.document.draw_rectangle(0, 0, 80, 80, (255, 255, 255))
+        self.document.generate("recorder", "test", page=2, cull=True)
+        assert len(_Recorder.last.calls) == 4
+        assert self.document.render_stats["occluded"] == 0
+
+    def test_render_cull_region(self):
+        recorder = _Recorder("test")
+        stats = {}
+        render(
+            self.document,
+            recorder,
+            page=1,
+            region=(1000, 1000, 2000, 2000),
+            cull=True,
+            stats=stats)
+        assert recorder.calls == [("save", )]
+        assert stats["outside"] == 2
@@ -0,0 +1,97 @@
+import hashlib
+import os
+import subprocess
+import sys
+from io import BytesIO
+import pytest
+from context import Document
+from multiformat.glyphs import _run_cache
+from multiformat.images import _image_cache
+
+# Builds the test document in a new process and prints its PDF digest.
+SCRIPT = """
+import hashlib, sys
+from io import BytesIO
+sys.path.insert(0, {tests!r})
+from test_multiformat_reproducible import new_document
+output = BytesIO()
+new_document().generate_pdf("r", file_object=output, invariant=True)
+print(hashlib.sha256(output.getvalue()).hexdigest())
+"""
+
+
+def new_document():
+    document = Document("a4", "portrait")
+    document.title = "Reproducible"
+    document.author = "Multiformat"
+    for page in range(3):
+        if page:
+            document.insert_page_break()
+        document.draw_rectangle(100, 100, 800, 300, "#2980b9", "#000", 10)
+        document.draw_circle(1500, 300, 200, "#e67e22")
+        document.draw_polyline([(100, 600), (500, 900), (900, 700)], 10,
+                               "#27ae60")
+        document.draw_string("Page {} €".format(page + 1), 100, 1200, "left",
+                             "OpenSans-Regular", 60, "#000")
+        document.draw_paragraph("Totals are carried over to the next page. " *
+                                5, 100, 1400, 1800, "OpenSans-Bold", 40,
+                                "#333")
+    return document
+
+
+def digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class TestReproducible:
+    def generate_pdf(self, document, **options):
+        output = BytesIO()
+        document.generate_pdf("reproducible", file_object=output, **options)
+        return output.getvalue()
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_invariant_pdf(self, workers):
+        first = self.generate_pdf(
+            new_document(), workers=workers, invariant=True)
+        second = self.generate_pdf(
+            new_document(), workers=workers, invariant=True)
+        assert first == second
+        assert b"/CreationDate (D:20000101000000+00'00')" in first
+
+    def test_invariant_pdf_across_processes(self):
+        script = SCRIPT.format(tests=os.path.dirname(__file__))
+        result = subprocess.run([sys.executable, "-c", script],
+                                capture_output=True,
+                                check=True,
+                                text=True)
+        data = self.generate_pdf(new_document(), invariant=True)
+        assert result.stdout.strip() == digest(data)
+
+    @pytest.mark.parametrize("image_format,options", [
+        ("PNG", {}),
+        ("PNG", {"optimize": True, "colors": 32, "dpi": 72}),
+        ("PNG", {"color_mode": "auto"}),
+        ("GIF", {"colors": 16}),
+        ("JPEG", {"quality": 80, "progressive": True}),
+    ])
+    def test_image_output_is_reproducible(self, image_format, options):
+        outputs = []
+        for _ in range(2):
+            # Cached text and images must not change the pixels.
+            _run_cache.clear()
+            _image_cache.clear()
+            for cached in range(2):
+                output = BytesIO()
+                new_document().generate_image(
+                    "reproducible", image_format, file_object=output,
+                    **options)
+                outputs.append(output.getvalue())
+        assert len(set(outputs)) == 1
+
+    def test_svg_output_is_reproducible(self):
+        outputs = set()
+        for _ in range(2):
+            output = BytesIO()
+            new_document().generate_svg("reproducible", file_object=output)
+            outputs.add(output.getvalue())
+        assert len(outputs) == 1
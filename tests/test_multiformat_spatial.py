@@ -0,0 +1,107 @@
+from io import BytesIO
+import pytest
+from PIL import Image
+from context import Document
+from multiformat.generate_image import set_memory_limit
+
+
+class TestSpatial:
+    def setup_method(self, method):
+        self.document = Document("letter", "portrait")
+        self.document.draw_rectangle(0, 0, self.document.w, self.document.h,
+                                     "#eee")
+        self.document.draw_rectangle(100, 100, 400, 400, None, "#000", 20)
+        self.document.draw_circle(1000, 1000, 100, "#f00")
+        self.document.draw_circle(1500, 1000, 100, None, "#00f", 10)
+        self.document.draw_line(0, 2000, 1000, 2000, 20, "#0f0")
+        self.document.draw_string("Hello", 1000, 1500, "middle",
+                                  "OpenSans-Regular", 100, "#000")
+        self.document.insert_page_break()
+        self.document.draw_circle(1000, 1000, 100, "#f00")
+
+    def types_at(self, x, y, page=1):
+        return [
+            element["type"]
+            for element in self.document.elements_at(page, x, y)
+        ]
+
+    @pytest.mark.parametrize("x,y,types", [
+        (50, 50, ["rectangle"]),
+        (100, 300, ["rectangle", "rectangle"]),
+        (300, 300, ["rectangle"]),
+        (1050, 1050, ["rectangle", "circle"]),
+        (1500, 1000, ["rectangle"]),
+        (1595, 1000, ["rectangle", "circle"]),
+        (500, 2009, ["rectangle", "line"]),
+        (500, 2011, ["rectangle"]),
+        (1000, 1480, ["rectangle", "string"]),
+        (1200, 1480, ["rectangle"]),
+    ])
+    def test_elements_at(self, x, y, types):
+        assert self.types_at(x, y) == types
+
+    def test_elements_at_page(self):
+        assert self.types_at(50, 50, page=2) == []
+        assert self.types_at(1000, 1000, page=2) == ["circle"]
+
+    def test_elements_in(self):
+        elements = self.document.elements_in(1, (900, 900, 1600, 1100))
+        assert [element["type"] for element in elements] == [
+            "rectangle", "circle", "circle"
+        ]
+        elements[0]["x"] = 500
+        assert self.document._document[0]["x"] == 0
+
+    def test_elements_many(self):
+        for i in range(5000):
+            self.document.draw_line(i % 2000, i % 2500, i % 2000 + 10,
+                                    i % 2500, 2, "#000")
+        elements = self.document.elements_at(2, 1005, 1000)
+        assert [(element["type"], element["y"]) for element in elements
+                ] == [("circle", 1000), ("line", 999), ("line", 1000),
+                      ("line", 1001)]
+
+    @pytest.mark.parametrize("page,x,y", [
+        (3, 0, 0),
+        (1, "a", 0),
+    ])
+    def test_elements_at_invalid(self, page, x, y):
+        with pytest.raises(RuntimeError):
+            self.document.elements_at(page, x, y)
+
+
+class TestNegativeSize:
+    def setup_method(self, method):
+        self.document = Document("letter", "portrait")
+        self.document.draw_rectangle(1000, 1000, -400, -300, "#f00")
+
+    def test_elements_at(self):
+        assert [
+            element["w"]
+            for element in self.document.elements_at(1, 800, 850)
+        ] == [-400]
+        assert self.document.elements_at(1, 1100, 850) == []
+
+    def test_elements_in(self):
+        assert len(self.document.elements_in(1, (500, 500, 700, 800))) == 1
+        assert self.document.elements_in(1, (1100, 1100, 1200, 1200)) == []
+
+    def test_render_region(self):
+        image = self.document.render_region(1, (700, 800, 900, 900))
+        assert image.getpixel((50, 50)) == (255, 0, 0)
+        assert self.document.render_stats["drawn"] == 1
+        assert self.document.render_stats["outside"] == 0
+
+    def test_banded_render(self):
+        set_memory_limit(5 * 2**20)
+        try:
+            output = BytesIO()
+            self.document.generate_image(
+                "negative", "png", size=(400, 400), file_object=output)
+        finally:
+            set_memory_limit(None)
+        assert self.document.render_stats["bands"] > 0
+        image = Image.open(output).convert("RGB")
+        scale = image.size[1] / self.document.h
+        assert image.getpixel((int(800 * scale),
+                               int(850 * scale))) == (255, 0, 0)
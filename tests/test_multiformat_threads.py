@@ -0,0 +1,122 @@
+import base64
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from reportlab.pdfbase import pdfmetrics
+from context import Document
+from multiformat.pdfmerge import _PDFFile
+
+
+def new_document(number):
+    document = Document("a4", "portrait")
+    for page in range(3):
+        if page:
+            document.insert_page_break()
+        document.draw_rectangle(0, 0, document.w, 300,
+                                (number * 40 % 256, 80, 120))
+        document.draw_paragraph(
+            "Statement {} page {} ÄÖÜ €".format(number, page) * 5, 100, 500,
+            1800, ["OpenSans-Regular", "OpenSans-Bold"][number % 2], 40,
+            "#000")
+        for row in range(20):
+            document.draw_string("{:,.2f}".format(row * number * 1.5),
+                                 1900, 1200 + row * 60, "right",
+                                 "OpenSans-Regular", 40, "#2c3e50")
+        document.draw_circle(1000, 2500, 100 + number, "#2980b9", "#000", 5)
+    return document
+
+
+def image(document):
+    output = BytesIO()
+    document.generate_image(
+        "thread", "png", size=(525, 742), page=2, file_object=output)
+    return output.getvalue()
+
+
+def pdf_pages(document):
+    # Decoded page content streams, which don't depend on the time.
+    output = BytesIO()
+    document.generate_pdf("thread", file_object=output)
+    pdf = _PDFFile(output.getvalue())
+    pages = []
+    for page in pdf.pages():
+        contents = pdf.objects[pdf.reference(b"/Contents", pdf.objects[page])]
+        stream = contents[contents.index(b"stream") + 6:contents.rindex(
+            b"endstream")].strip()
+        pages.append(zlib.decompress(base64.a85decode(stream, adobe=True)))
+    return pages
+
+
+class TestThreads:
+    def test_concurrent_rendering(self):
+        documents = [new_document(number) for number in range(8)]
+        images = [image(document) for document in documents]
+        pdfs = [pdf_pages(document) for document in documents]
+        with ThreadPoolExecutor(8) as pool:
+            assert list(pool.map(image, documents)) == images
+            assert list(pool.map(pdf_pages, documents)) == pdfs
+            assert list(pool.map(image, documents * 2)) == images * 2
+
+    def test_render_stats_per_thread(self):
+        document = new_document(1)
+
+        def stats(page):
+            document.generate_raster(page=page, dpi=20 * page)
+            counts = document.render_stats
+            document.render_region(page, (0, 0, 1000, 1000 * page))
+            return counts, document.render_stats
+
+        expected = [stats(page) for page in [1, 2, 3]]
+        with ThreadPoolExecutor(6) as pool:
+            assert list(pool.map(stats, [1, 2, 3] * 4)) == expected * 4
+        assert document.render_stats == expected[-1][1]
+
+    def test_fonts_registered_once(self):
+        # Other threads keep their subset state in the registered font.
+        pdf_pages(new_document(1))
+        font = pdfmetrics.getFont("OpenSans-Bold")
+        with ThreadPoolExecutor(4) as pool:
+            list(pool.map(pdf_pages, [new_document(1)] * 4))
+        assert pdfmetrics.getFont("OpenSans-Bold") is font
+
+    def test_concurrent_building(self):
+        with ThreadPoolExecutor(8) as pool:
+            documents = list(pool.map(new_document, range(16)))
+        for number, document in enumerate(documents):
+            assert document._document == new_document(number)._document
+
+    def test_shared_document(self):
+        document = Document("a4", "portrait")
+        document.draw_rectangle(0, 0, 100, 100, "#000")
+        part = document.slice_pages(1)
+
+        def draw(number):
+            for row in range(50):
+                part.draw_string("{}-{}".format(number, row), 200 * number,
+                                 100 + row * 50, "left", "OpenSans-Regular",
+                                 20, (number, 0, 0))
+                if row % 10 == 0:
+                    part.generate_raster(page=1)
+
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(draw, range(8)))
+        assert len(part._pages[0]) == 1 + 8 * 50
+        assert len(part.elements_in(1, (0, 0, part.w, part.h))) == 1 + 8 * 50
+        assert sorted(part._colors.colors) == [(n, 0, 0) for n in range(8)]
+        assert len(document._pages[0]) == 1
+
+    def test_paragraph_lines_stay_together(self):
+        document = Document("a4", "portrait")
+
+        def draw(number):
+            document.draw_paragraph("word{} ".format(number) * 400, 100, 100,
+                                    1900, "OpenSans-Regular", 40, "#000")
+
+        with ThreadPoolExecutor(4) as pool:
+            list(pool.map(draw, range(4)))
+        words = [
+            item["string"].split()[0] for item in document._document
+            if item["type"] == "string"
+        ]
+        changes = sum(1 for a, b in zip(words, words[1:]) if a != b)
+        assert changes == 3
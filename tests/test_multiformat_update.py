@@ -0,0 +1,135 @@
+import os
+import re
+from io import BytesIO
+import pytest
+from context import Document
+from multiformat.pdfmerge import _PDFFile, _stream_data
+from test_multiformat_images import logo
+
+
+def statement(days, first_day=0, currency="USD"):
+    # One page per day, the last day shows the currency.
+    document = Document("a4", "portrait")
+    document.title = "Statement"
+    for day in range(first_day, days):
+        if day > first_day:
+            document.insert_page_break()
+        document.draw_image(logo(), 100, 100, 400)
+        document.draw_string("Day {} balance 1,234.56 {}".format(
+            day, currency if day == days - 1 else ""), 100, 800, "left",
+                             "OpenSans-Regular", 40, "#000")
+        document.draw_paragraph("Transactions of the day. " * 10, 100, 1000,
+                                1800, "OpenSans-Bold", 30, "#333")
+    return document
+
+
+def generate(document, **options):
+    output = BytesIO()
+    document.generate_pdf("statement", file_object=output, **options)
+    return output
+
+
+def page_text(data, page):
+    pdf = _PDFFile(data)
+    body = pdf.objects[pdf.pages()[page - 1]]
+    return _stream_data(pdf.objects[pdf.reference(b"/Contents", body)])
+
+
+class TestUpdatePDF:
+    def test_append_new_pages(self):
+        output = generate(statement(2))
+        original = output.getvalue()
+        statement(4).update_pdf("statement", file_object=output)
+        data = output.getvalue()
+        assert data.startswith(original)
+        update = data[len(original):]
+        # Fonts and the logo are reused, only the pages are written.
+        assert b"/FontFile2" not in update
+        assert b"/Subtype /Image" not in update
+        pdf = _PDFFile(data)
+        assert len(pdf.pages()) == pdf.page_count() == 4
+        assert b"Day 3 balance" in page_text(data, 4)
+        assert re.search(rb"/Prev %d" % _PDFFile(original).startxref, update)
+
+    def test_new_characters_embed_font_subset(self):
+        output = generate(statement(2))
+        size = len(output.getvalue())
+        statement(3, currency="€ Ł").update_pdf(
+            "statement", file_object=output)
+        update = output.getvalue()[size:]
+        assert len(re.findall(rb"/FontFile2", update)) == 1
+        assert len(_PDFFile(output.getvalue()).pages()) == 3
+
+    def test_embedded_subsets_have_new_tags(self):
+        output = generate(statement(2))
+        for days, currency in ((3, "€"), (4, "€ Ł"), (5, "€ Ł")):
+            size = len(output.getvalue())
+            statement(days, currency=currency).update_pdf(
+                "statement", file_object=output)
+        # The last update reuses the subset embedded by the one before.
+        assert b"/FontFile2" not in output.getvalue()[size:]
+        data = output.getvalue()
+        base_fonts = re.findall(rb"/BaseFont\s*/([A-K]{6}\+OpenSans-Regular)",
+                                data)
+        assert len(base_fonts) == len(set(base_fonts)) == 3
+        assert sorted(
+            re.findall(rb"/FontName\s*/([A-K]{6}\+OpenSans-Regular)",
+                       data)) == sorted(base_fonts)
+        assert b"Day 4 balance 1,234.56" in page_text(data, 5)
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_repeated_updates(self, workers):
+        output = generate(statement(2), workers=workers)
+        for days in (3, 5, 6):
+            statement(days).update_pdf("statement", file_object=output)
+        data = output.getvalue()
+        pdf = _PDFFile(data)
+        assert len(pdf.pages()) == 6
+        for number in range(1, int(
+                re.search(rb"/Size (\d+)", pdf.trailer).group(1))):
+            assert data[pdf.offset(number):].startswith(b"%d 0 obj" %
+                                                        number)
+        for page in range(1, 7):
+            assert b"Day %d balance" % (page - 1) in page_text(data, page)
+
+    def test_update_file(self, tmpdir):
+        path = os.path.join(str(tmpdir), "statement")
+        statement(1).generate_pdf(path)
+        statement(2).update_pdf(path)
+        with open(path + ".pdf", "rb") as pdf_file:
+            assert len(_PDFFile(pdf_file.read()).pages()) == 2
+
+    def test_first_page(self):
+        output = generate(statement(2))
+        statement(4, first_day=2).update_pdf(
+            "statement", file_object=output, first_page=1)
+        data = output.getvalue()
+        assert len(_PDFFile(data).pages()) == 4
+        assert b"Day 2 balance" in page_text(data, 3)
+
+    def test_no_new_pages(self):
+        output = generate(statement(2))
+        original = output.getvalue()
+        statement(2).update_pdf("statement", file_object=output)
+        assert output.getvalue() == original
+
+    def test_update_is_reproducible(self):
+        updates = set()
+        for _ in range(2):
+            output = generate(statement(2), invariant=True)
+            statement(3).update_pdf("statement", file_object=output)
+            updates.add(output.getvalue())
+        assert len(updates) == 1
+
+    def test_invalid_update(self):
+        with pytest.raises(RuntimeError, match="not generated by"):
+            statement(2).update_pdf(
+                "statement", file_object=BytesIO(b"not a pdf"))
+        # Read, but without the trailer entries an update needs.
+        data = generate(statement(2)).getvalue().replace(b"/Size", b"/Sizf")
+        with pytest.raises(RuntimeError, match="not generated by"):
+            statement(3).update_pdf("statement", file_object=BytesIO(data))
+        output = generate(statement(2))
+        with pytest.raises(RuntimeError):
+            statement(4).update_pdf(
+                "statement", file_object=output, first_page=6)
@@ -1,5 +1,6 @@
 import pytest
 from context import Document
+from multiformat.colors import parse_colors
 
 
 class TestValidators:
@@ -128,3 +129,20 @@ class TestValidators:
         document = self.new_document()
         with pytest.raises(error):
             document._validate_color(color)
+
+    def test_validate_color_interned(self):
+        document = self.new_document()
+        first = document._validate_color("#2980b9")
+        assert document._validate_color((41, 128, 185)) is first
+        assert document._validate_color(["41", "128", "185"]) is first
+        assert document._validate_color("2980B9") is first
+        document._validate_color("#000")
+        assert document._colors.colors == [(41, 128, 185), (0, 0, 0)]
+        assert document._colors.index[(0, 0, 0)] == 1
+
+    def test_parse_colors(self):
+        assert parse_colors(["#FFF", "000000", "#FFF", "87CEFA"]) == [
+            (255, 255, 255), (0, 0, 0), (255, 255, 255), (135, 206, 250)
+        ]
+        with pytest.raises(ValueError):
+            parse_colors(["#FFF", "#FF"])